@@ -4,6 +4,7 @@ import { QueryClientProvider } from "@tanstack/react-query";
 import { Toaster } from "@/components/ui/toaster";
 import { TooltipProvider } from "@/components/ui/tooltip";
 import { useAuth } from "@/hooks/useAuth";
+import { useNotifications } from "@/hooks/useNotifications";
 import { Layout } from "@/components/Layout";
 import NotFound from "@/pages/not-found";
 import Landing from "@/pages/Landing";
@@ -77,6 +78,7 @@ function AuthenticatedRoute({
 
 function Router() {
   const { isAuthenticated, isLoading } = useAuth();
+  useNotifications(isAuthenticated);
 
   if (isLoading) {
     return (
@@ -1,8 +1,43 @@
 import { useQuery } from "@tanstack/react-query";
+import { getQueryFn, queryClient } from "@/lib/queryClient";
+
+// Query keys filled from the single /api/bootstrap round-trip on first load
+const bootstrapSections: Record<string, string> = {
+  dashboard: "/api/dashboard/stats",
+  leaveTypes: "/api/leave-types",
+  leaveBalances: "/api/leave-balances",
+  leaves: "/api/leaves",
+};
+
+const fetchUser = getQueryFn<unknown>({ on401: "returnNull" });
+
+async function fetchBootstrap(context: Parameters<typeof fetchUser>[0]) {
+  const res = await fetch("/api/bootstrap", { credentials: "include" });
+  if (res.status === 401) {
+    return null;
+  }
+  if (!res.ok) {
+    throw new Error(`${res.status}: ${(await res.text()) || res.statusText}`);
+  }
+
+  const data = await res.json();
+  for (const [section, queryKey] of Object.entries(bootstrapSections)) {
+    // Failed sections come back null; those pages fetch on their own
+    if (data[section] != null) {
+      queryClient.setQueryData([queryKey], data[section]);
+    }
+  }
+  // A failed user section is a backend error, not a logout; ask the user endpoint directly
+  if (data.errors?.user) {
+    return fetchUser(context);
+  }
+  return data.user;
+}
 
 export function useAuth() {
   const { data: user, isLoading } = useQuery({
     queryKey: ["/api/auth/user"],
+    queryFn: fetchBootstrap,
     retry: false,
   });
 
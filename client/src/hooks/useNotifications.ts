@@ -0,0 +1,56 @@
+import { useEffect } from "react";
+import { queryClient } from "@/lib/queryClient";
+
+// Queries to refetch when the server pushes a change
+const invalidations: Record<string, string[]> = {
+  "leave.status": ["/api/leaves", "/api/leave-balances", "/api/dashboard/stats"],
+  "approval.requested": ["/api/approvals/leaves"],
+  "attendance.updated": ["/api/attendance", "/api/attendance/absent-dates", "/api/dashboard/stats"],
+};
+
+export function useNotifications(enabled: boolean) {
+  useEffect(() => {
+    if (!enabled) {
+      return;
+    }
+
+    let socket: WebSocket | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    let retryDelay = 1000;
+    let closed = false;
+
+    const connect = () => {
+      const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
+      socket = new WebSocket(`${protocol}//${window.location.host}/api/ws/notifications`);
+
+      socket.onopen = () => {
+        retryDelay = 1000;
+      };
+
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === "resync") {
+          queryClient.invalidateQueries();
+          return;
+        }
+        for (const queryKey of invalidations[message.type] ?? []) {
+          queryClient.invalidateQueries({ queryKey: [queryKey] });
+        }
+      };
+
+      socket.onclose = () => {
+        if (!closed) {
+          retryTimer = setTimeout(connect, retryDelay);
+          retryDelay = Math.min(retryDelay * 2, 30000);
+        }
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      socket?.close();
+    };
+  }, [enabled]);
+}
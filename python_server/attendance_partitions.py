@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Attendance Partition Maintenance
+Keeps attendance_records split into monthly range partitions, creates upcoming
+partitions ahead of time and archives old months to object storage.
+"""
+
+import argparse
+import gzip
+import os
+import re
+import tempfile
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from config import settings
+from models import AttendanceRecord
+
+PARENT_TABLE = AttendanceRecord.__tablename__
+PARTITION_NAME_RE = re.compile(rf"^{PARENT_TABLE}_y(\d{{4}})m(\d{{2}})$")
+ARCHIVE_PREFIX = "archives/attendance"
+# check_violation, which Postgres raises for a row that no partition accepts
+NO_PARTITION_SQLSTATE = "23514"
+
+
+class AttendanceDateOutOfRange(ValueError):
+    pass
+
+
+def raise_if_no_partition(error: Exception, day):
+    """Translate a "no partition of relation ... found for row" IntegrityError into AttendanceDateOutOfRange."""
+    orig = getattr(error, "orig", error)
+    if getattr(orig, "pgcode", None) == NO_PARTITION_SQLSTATE and "no partition" in str(orig):
+        raise AttendanceDateOutOfRange(
+            f"Attendance for {day} can't be recorded: the month is archived or not open yet"
+        ) from error
+
+
+def _add_months(year: int, month: int, delta: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+
+def partition_name(year: int, month: int) -> str:
+    return f"{PARENT_TABLE}_y{year:04d}m{month:02d}"
+
+
+def partition_bounds(year: int, month: int) -> Tuple[date, date]:
+    next_year, next_month = _add_months(year, month, 1)
+    return date(year, month, 1), date(next_year, next_month, 1)
+
+
+def archive_object_path(year: int, month: int) -> str:
+    return f"{ARCHIVE_PREFIX}/{partition_name(year, month)}.csv.gz"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    return conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace"
+        ),
+        {"name": PARENT_TABLE},
+    ).first() is not None
+
+
+def list_attendance_partitions(conn: Connection) -> List[Tuple[int, int]]:
+    rows = conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :name"
+        ),
+        {"name": PARENT_TABLE},
+    ).scalars()
+
+    partitions = []
+    for name in rows:
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            partitions.append((int(match.group(1)), int(match.group(2))))
+    return sorted(partitions)
+
+
+def create_attendance_partition(conn: Connection, year: int, month: int):
+    start, end = partition_bounds(year, month)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(year, month)} "
+        f"PARTITION OF {PARENT_TABLE} FOR VALUES FROM ('{start}') TO ('{end}')"
+    ))
+
+
+def ensure_attendance_partitions(
+    engine: Engine,
+    months_ahead: Optional[int] = None,
+    months_back: Optional[int] = None,
+    today: Optional[date] = None,
+) -> List[str]:
+    """Create any missing monthly partitions around the current month. Safe to call repeatedly."""
+    with engine.begin() as conn:
+        return create_missing_partitions(conn, months_ahead, months_back, today)
+
+
+def create_missing_partitions(
+    conn: Connection,
+    months_ahead: Optional[int] = None,
+    months_back: Optional[int] = None,
+    today: Optional[date] = None,
+) -> List[str]:
+    """ensure_attendance_partitions() on a connection whose transaction the caller owns."""
+    months_ahead = settings.attendance_partitions_ahead if months_ahead is None else months_ahead
+    months_back = settings.attendance_partitions_back if months_back is None else months_back
+    today = today or date.today()
+
+    created = []
+    if not is_partitioned(conn):
+        print(f"⚠ {PARENT_TABLE} is not partitioned yet; run `alembic upgrade head`")
+        return created
+
+    existing = set(list_attendance_partitions(conn))
+    for delta in range(-months_back, months_ahead + 1):
+        year, month = _add_months(today.year, today.month, delta)
+        if (year, month) not in existing:
+            create_attendance_partition(conn, year, month)
+            created.append(partition_name(year, month))
+    return created
+
+
+def detach_attendance_partition(engine: Engine, year: int, month: int):
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {partition_name(year, month)}"))
+
+
+def attach_attendance_partition(engine: Engine, year: int, month: int):
+    start, end = partition_bounds(year, month)
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {partition_name(year, month)} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+
+
+def archive_attendance_partition(engine: Engine, year: int, month: int, object_storage=None) -> str:
+    """Detach a month, stream it as gzipped CSV to object storage and drop the table."""
+    if object_storage is None:
+        from object_storage import get_object_storage_service
+        object_storage = get_object_storage_service()
+
+    name = partition_name(year, month)
+    detach_attendance_partition(engine, year, month)
+
+    fd, local_path = tempfile.mkstemp(suffix=".csv.gz")
+    os.close(fd)
+    try:
+        raw = engine.raw_connection()
+        try:
+            with gzip.open(local_path, "wb") as archive:
+                raw.cursor().copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER true)", archive)
+            raw.commit()
+        finally:
+            raw.close()
+
+        location = object_storage.upload_private_file(archive_object_path(year, month), local_path, "application/gzip")
+    except Exception:
+        # Leave the data queryable if the upload did not make it
+        attach_attendance_partition(engine, year, month)
+        raise
+    finally:
+        os.unlink(local_path)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {name}"))
+    return location
+
+
+def restore_attendance_partition(engine: Engine, year: int, month: int, object_storage=None):
+    """Re-create an archived month from object storage and attach it back to the parent table."""
+    if object_storage is None:
+        from object_storage import get_object_storage_service
+        object_storage = get_object_storage_service()
+
+    name = partition_name(year, month)
+    fd, local_path = tempfile.mkstemp(suffix=".csv.gz")
+    os.close(fd)
+    try:
+        object_storage.download_private_file(archive_object_path(year, month), local_path)
+
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+
+        raw = engine.raw_connection()
+        try:
+            with gzip.open(local_path, "rb") as archive:
+                raw.cursor().copy_expert(f"COPY {name} FROM STDIN WITH (FORMAT csv, HEADER true)", archive)
+            raw.commit()
+        finally:
+            raw.close()
+    finally:
+        os.unlink(local_path)
+
+    # Attaching builds the partition's indexes from the parent definitions
+    attach_attendance_partition(engine, year, month)
+
+
+def archive_partitions_older_than(engine: Engine, keep_months: Optional[int] = None, object_storage=None) -> List[str]:
+    keep_months = settings.attendance_retention_months if keep_months is None else keep_months
+    today = date.today()
+    cutoff = _add_months(today.year, today.month, -keep_months)
+
+    with engine.connect() as conn:
+        partitions = list_attendance_partitions(conn)
+
+    archived = []
+    for year, month in partitions:
+        if (year, month) < cutoff:
+            archived.append(archive_attendance_partition(engine, year, month, object_storage))
+    return archived
+
+
+def _parse_month(value: str) -> Tuple[int, int]:
+    year, month = value.split("-")
+    return int(year), int(month)
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Manage monthly attendance_records partitions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("ensure", help="create upcoming partitions")
+    subparsers.add_parser("list", help="list attached partitions")
+    archive_parser = subparsers.add_parser("archive", help="archive a month (YYYY-MM) to object storage")
+    archive_parser.add_argument("month", nargs="?")
+    archive_parser.add_argument("--older-than", type=int, help="archive every month older than N months")
+    restore_parser = subparsers.add_parser("restore", help="restore an archived month (YYYY-MM)")
+    restore_parser.add_argument("month")
+    detach_parser = subparsers.add_parser("detach", help="detach a month (YYYY-MM) without archiving it")
+    detach_parser.add_argument("month")
+    attach_parser = subparsers.add_parser("attach", help="re-attach a detached month (YYYY-MM)")
+    attach_parser.add_argument("month")
+    args = parser.parse_args()
+
+    if args.command == "ensure":
+        for name in ensure_attendance_partitions(engine):
+            print(f"✓ Created {name}")
+    elif args.command == "list":
+        with engine.connect() as conn:
+            for year, month in list_attendance_partitions(conn):
+                print(partition_name(year, month))
+    elif args.command == "archive":
+        if args.older_than is not None:
+            locations = archive_partitions_older_than(engine, args.older_than)
+        elif args.month:
+            locations = [archive_attendance_partition(engine, *_parse_month(args.month))]
+        else:
+            parser.error("archive needs a month or --older-than")
+        for location in locations:
+            print(f"✓ Archived to {location}")
+    elif args.command == "restore":
+        restore_attendance_partition(engine, *_parse_month(args.month))
+        print(f"✓ Restored {partition_name(*_parse_month(args.month))}")
+    elif args.command == "detach":
+        detach_attendance_partition(engine, *_parse_month(args.month))
+    elif args.command == "attach":
+        attach_attendance_partition(engine, *_parse_month(args.month))
@@ -1,21 +1,32 @@
 import os
 import time
-from authlib.integrations.starlette_client import OAuth
-from authlib.oidc.core import CodeIDToken
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.requests import Request
+from starlette.websockets import WebSocket
 from starlette.responses import RedirectResponse
 from fastapi import Depends, HTTPException, status
 from typing import Optional
-import httpx
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import User
 
 ISSUER_URL = os.getenv("ISSUER_URL", "https://replit.com/oidc")
 REPL_ID = os.getenv("REPL_ID", "")
 REPLIT_DOMAINS = os.getenv("REPLIT_DOMAINS", "").split(",")
 
-oauth = OAuth()
+_oauth = None
+
+def get_oauth():
+    """The OIDC client, registered on first login; authlib stays out of the startup path."""
+    global _oauth
+    if _oauth is None:
+        from authlib.integrations.starlette_client import OAuth
+        _oauth = OAuth()
+        configure_oauth(_oauth)
+    return _oauth
 
-def configure_oauth():
+def configure_oauth(oauth):
     for domain in REPLIT_DOMAINS:
         if domain:
             # Register with PKCE support (required by Replit OIDC)
@@ -44,6 +55,8 @@ async def get_current_user(request: Request) -> dict:
         if refresh_token:
             try:
                 token_endpoint = f"{ISSUER_URL}/token"
+                import httpx
+                
                 async with httpx.AsyncClient() as client:
                     response = await client.post(
                         token_endpoint,
@@ -85,3 +98,19 @@ def get_user_id(request: Request) -> str:
             detail="Not authenticated"
         )
     return user["claims"].get("sub")
+
+def get_websocket_user_id(websocket: WebSocket) -> Optional[str]:
+    # Same session cookie as HTTP; a WebSocket can only be refused, not answered with a 401
+    user = websocket.session.get("user")
+    if not user or not user.get("claims"):
+        return None
+    return user["claims"].get("sub")
+
+def get_admin_user_id(user_id: str = Depends(get_user_id), db: Session = Depends(get_db)) -> str:
+    is_admin = db.query(User.is_admin).filter(User.id == user_id).scalar()
+    if not is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return user_id
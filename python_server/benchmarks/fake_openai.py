@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI Server
+A local stand-in for the chat completions API with a configurable, seeded latency, so load
+tests exercise the AI endpoints without cost or rate limits. It can also inject 429s (with
+Retry-After) and 500s, to exercise llm_gateway's retries and circuit breaker.
+
+Run from python_server/:  python -m benchmarks.fake_openai --port 8765 --latency-ms 800
+and start the API server with  OPENAI_BASE_URL=http://localhost:8765/v1 OPENAI_API_KEY=fake
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+rng = random.Random(0)
+latency = {"mean": 0.8, "jitter": 0.3}
+faults = {"rate_limit": 0.0, "server_error": 0.0, "retry_after": 1.0}
+
+ANSWER = (
+    "According to the Leave Policy, casual leave can be carried forward up to the annual limit. "
+    "Unused sick leave lapses at the end of the year. Apply through the portal at least two days ahead."
+)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    roll = rng.random()
+    if roll < faults["rate_limit"]:
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after": str(faults["retry_after"])},
+        )
+    if roll < faults["rate_limit"] + faults["server_error"]:
+        await asyncio.sleep(latency["mean"])
+        return JSONResponse({"error": {"message": "The server had an error", "type": "server_error"}}, status_code=500)
+    await asyncio.sleep(max(0.0, rng.gauss(latency["mean"], latency["mean"] * latency["jitter"])))
+
+    prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        content = json.dumps({"chunks": [f"Section {i}: synthetic policy text for load testing." for i in range(8)]})
+    else:
+        content = ANSWER
+    completion_tokens = len(content) // 4
+
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=800, help="mean response latency")
+    parser.add_argument("--jitter", type=float, default=0.3, help="latency standard deviation as a fraction of the mean")
+    parser.add_argument("--rate-limit-rate", type=float, default=0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds sent with each 429")
+    parser.add_argument("--server-error-rate", type=float, default=0, help="fraction of requests answered with 500")
+    args = parser.parse_args()
+
+    latency.update(mean=args.latency_ms / 1000, jitter=args.jitter)
+    faults.update(rate_limit=args.rate_limit_rate, server_error=args.server_error_rate, retry_after=args.retry_after)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
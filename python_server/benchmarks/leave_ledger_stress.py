@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Leave Ledger Stress Test
+Fires thousands of parallel leave applications at one balance in a local Postgres
+and checks the ledger never overdraws it.
+
+Run from python_server/:  python -m benchmarks.leave_ledger_stress --applications 2000 --workers 64
+"""
+
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from leave_ledger import InsufficientLeaveBalanceError
+from models import Leave, LeaveBalance, LeaveLedgerEntry, LeaveType, User, InsertLeaveSchema
+from storage import DatabaseStorage
+
+
+def run(applications: int, workers: int, balance_days: int):
+    engine = create_engine(settings.database_url, pool_size=workers, max_overflow=0)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    year = date.today().year
+    run_id = uuid.uuid4().hex[:8]
+
+    db = SessionLocal()
+    user = User(email=f"ledger-stress-{run_id}@example.com", first_name="Ledger", last_name="Stress")
+    leave_type = LeaveType(name=f"Stress Leave {run_id}", max_days=balance_days)
+    db.add_all([user, leave_type])
+    db.flush()
+    balance = LeaveBalance(user_id=user.id, leave_type_id=leave_type.id, total_days=balance_days, used_days=0, year=year)
+    db.add(balance)
+    db.commit()
+    user_id, leave_type_id, balance_id = user.id, leave_type.id, balance.id
+    db.close()
+
+    def apply(i: int) -> str:
+        session = SessionLocal()
+        try:
+            day = date(year, 1, 1) + timedelta(days=i % 365)
+            DatabaseStorage(session).create_leave(InsertLeaveSchema(
+                userId=user_id,
+                leaveTypeId=leave_type_id,
+                fromDate=str(day),
+                toDate=str(day),
+                reason="ledger stress test",
+                days="0.5",
+            ))
+            return "accepted"
+        except InsufficientLeaveBalanceError:
+            return "rejected"
+        except Exception as e:
+            return type(e).__name__
+        finally:
+            session.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(apply, range(applications)))
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    try:
+        balance = db.query(LeaveBalance).filter(LeaveBalance.id == balance_id).one()
+        pending_days = db.query(func.coalesce(func.sum(Leave.days), 0)).filter(
+            Leave.user_id == user_id, Leave.status == "pending"
+        ).scalar()
+
+        counts = {outcome: outcomes.count(outcome) for outcome in set(outcomes)}
+        print(f"{applications} applications with {workers} workers in {elapsed:.2f}s "
+              f"({applications / elapsed:.0f}/s): {counts}")
+        print(f"balance: total={balance.total_days} reserved={balance.reserved_days} pending leaves={pending_days}")
+
+        assert Decimal(balance.reserved_days) == Decimal(pending_days), "ledger drifted from leave rows"
+        assert Decimal(balance.reserved_days) <= balance.total_days, "balance was overdrawn"
+        print("✓ Ledger invariants hold")
+    finally:
+        db.query(LeaveLedgerEntry).filter(LeaveLedgerEntry.balance_id == balance_id).delete()
+        db.query(Leave).filter(Leave.user_id == user_id).delete()
+        db.query(LeaveBalance).filter(LeaveBalance.id == balance_id).delete()
+        db.query(LeaveType).filter(LeaveType.id == leave_type_id).delete()
+        db.query(User).filter(User.id == user_id).delete()
+        db.commit()
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress the leave ledger with parallel applications")
+    parser.add_argument("--applications", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--balance", type=int, default=20, help="total days on the contended balance")
+    args = parser.parse_args()
+    run(args.applications, args.workers, args.balance)
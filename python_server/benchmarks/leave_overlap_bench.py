@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Leave Overlap Benchmark
+Compares the per-user interval index against a linear scan of the user's leave history for
+employees with decades of leaves, and optionally times the GiST-backed check in Postgres.
+
+Run from python_server/:  python -m benchmarks.leave_overlap_bench --users 1000 --years 40 [--postgres]
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from leave_overlap import LeaveIntervalIndex
+
+
+def generate_history(rng: random.Random, years: int, leaves_per_year: int):
+    intervals = []
+    start_year = date.today().year - years
+    for year in range(start_year, start_year + years):
+        # Spread leaves over the year in disjoint slots so the history is valid
+        slot = 365 // leaves_per_year
+        for i in range(leaves_per_year):
+            start = date(year, 1, 1) + timedelta(days=i * slot + rng.randrange(slot - 5))
+            intervals.append((start, start + timedelta(days=rng.randrange(4)), f"{year}-{i}"))
+    return intervals
+
+
+def linear_overlap(intervals, start, end):
+    for interval in intervals:
+        if interval[0] <= end and interval[1] >= start:
+            return interval
+    return None
+
+
+def bench_in_memory(users: int, years: int, leaves_per_year: int, checks: int):
+    rng = random.Random(42)
+    histories = [generate_history(rng, years, leaves_per_year) for _ in range(users)]
+
+    started = time.perf_counter()
+    indexes = [LeaveIntervalIndex(history) for history in histories]
+    build_seconds = time.perf_counter() - started
+
+    queries = []
+    for _ in range(checks):
+        user = rng.randrange(users)
+        start = date.today() - timedelta(days=rng.randrange(years * 365))
+        queries.append((user, start, start + timedelta(days=rng.randrange(10))))
+
+    started = time.perf_counter()
+    indexed = [indexes[user].find_overlap(start, end) for user, start, end in queries]
+    indexed_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scanned = [linear_overlap(histories[user], start, end) for user, start, end in queries]
+    scan_seconds = time.perf_counter() - started
+
+    assert [hit is None for hit in indexed] == [hit is None for hit in scanned], "index disagrees with scan"
+
+    print(f"{users} users × {years} years × {leaves_per_year} leaves/year "
+          f"({users * years * leaves_per_year} leaves), index build {build_seconds * 1000:.0f}ms")
+    print(f"  interval index: {indexed_seconds / checks * 1e6:.2f}µs/check")
+    print(f"  linear scan:    {scan_seconds / checks * 1e6:.2f}µs/check "
+          f"({scan_seconds / indexed_seconds:.0f}x slower)")
+
+
+def bench_postgres(years: int, leaves_per_year: int, checks: int):
+    from sqlalchemy import text
+    from database import SessionLocal
+    from models import Leave, LeaveType, User
+
+    rng = random.Random(7)
+    db = SessionLocal()
+    user = User(email=f"overlap-bench-{rng.randrange(10**9)}@example.com")
+    leave_type = LeaveType(name="Overlap Bench Leave", max_days=365)
+    db.add_all([user, leave_type])
+    db.flush()
+    try:
+        history = generate_history(rng, years, leaves_per_year)
+        db.bulk_insert_mappings(Leave, [
+            {"user_id": user.id, "leave_type_id": leave_type.id, "from_date": start, "to_date": end,
+             "days": 1, "reason": "benchmark", "status": "approved"}
+            for start, end, _ in history
+        ])
+        db.commit()
+
+        query = text(
+            "SELECT id FROM leaves WHERE user_id = :user_id AND status IN ('pending', 'approved') "
+            "AND daterange(from_date, to_date, '[]') && daterange(:start, :end, '[]') LIMIT 1"
+        )
+        started = time.perf_counter()
+        for _ in range(checks):
+            start = date.today() - timedelta(days=rng.randrange(years * 365))
+            db.execute(query, {"user_id": user.id, "start": start, "end": start + timedelta(days=3)}).first()
+        elapsed = time.perf_counter() - started
+
+        plan = db.execute(text("EXPLAIN " + query.text), {
+            "user_id": user.id, "start": date.today(), "end": date.today()
+        }).scalars().all()
+        print(f"Postgres GiST check over {len(history)} leaves: {elapsed / checks * 1000:.3f}ms/check (round trip)")
+        print("  " + "\n  ".join(plan))
+    finally:
+        db.rollback()
+        db.query(Leave).filter(Leave.user_id == user.id).delete()
+        db.query(LeaveType).filter(LeaveType.id == leave_type.id).delete()
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark leave overlap detection")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=40)
+    parser.add_argument("--leaves-per-year", type=int, default=15)
+    parser.add_argument("--checks", type=int, default=100000)
+    parser.add_argument("--postgres", action="store_true", help="also time the exclusion-constraint index in Postgres")
+    args = parser.parse_args()
+
+    bench_in_memory(args.users, args.years, args.leaves_per_year, args.checks)
+    if args.postgres:
+        bench_postgres(args.years, args.leaves_per_year, min(args.checks, 2000))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+LLM Gateway Stress Test
+Fires a burst of concurrent chat calls through llm_gateway at the fake OpenAI server and
+reports how they ended: answered, retried, or failed fast (queue timeout, token budget,
+open circuit). Pair it with the fake server's fault injection:
+
+    python -m benchmarks.fake_openai --latency-ms 500 --rate-limit-rate 0.3 --retry-after 1 &
+    python -m benchmarks.llm_gateway_stress --calls 500 --concurrency 8 --tokens-per-minute 200000
+
+Run from python_server/; OPENAI_BASE_URL defaults to the fake server.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import List, Tuple
+
+os.environ.setdefault("OPENAI_BASE_URL", "http://localhost:8765/v1")
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+from llm_gateway import LLMGateway, LLMUnavailable
+from metrics import LLM_RETRIES
+
+
+async def one_call(gateway: LLMGateway, i: int) -> Tuple[str, float]:
+    started = time.perf_counter()
+    try:
+        await gateway.chat(
+            "stress",
+            model="gpt-4o",
+            messages=[{"role": "user", "content": f"Question {i}: how many casual leave days carry forward?"}],
+            max_tokens=200,
+        )
+        outcome = "ok"
+    except LLMUnavailable as e:
+        outcome = e.reason
+    except Exception as e:
+        outcome = type(e).__name__
+    return outcome, time.perf_counter() - started
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000 if ordered else 0.0
+
+
+async def run(args):
+    gateway = LLMGateway(
+        max_concurrency=args.concurrency,
+        tokens_per_minute=args.tokens_per_minute,
+        queue_timeout=args.queue_timeout,
+        max_retries=args.max_retries,
+        breaker_failures=args.breaker_failures,
+        breaker_reset_seconds=args.breaker_reset,
+    )
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one_call(gateway, i) for i in range(args.calls)))
+    elapsed = time.perf_counter() - started
+
+    outcomes = Counter(outcome for outcome, _ in results)
+    print(f"{args.calls} calls in {elapsed:.1f}s, circuit {['closed', 'half-open', 'open'][gateway.breaker.state]}")
+    for outcome, count in outcomes.most_common():
+        latencies = sorted(seconds for result, seconds in results if result == outcome)
+        print(f"  {outcome:<16} {count:>6}  p50 {percentile(latencies, 0.5):>8.0f}ms  p95 {percentile(latencies, 0.95):>8.0f}ms")
+    retries = {
+        sample.labels["reason"]: int(sample.value)
+        for metric in LLM_RETRIES.collect() for sample in metric.samples
+        if sample.name.endswith("_total") and sample.labels.get("operation") == "stress"
+    }
+    print(f"  retries by reason: {retries or 'none'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Burst concurrent LLM calls through the gateway")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8, help="gateway concurrency limit")
+    parser.add_argument("--tokens-per-minute", type=int, default=100000)
+    parser.add_argument("--queue-timeout", type=float, default=10)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--breaker-failures", type=int, default=5)
+    parser.add_argument("--breaker-reset", type=float, default=30)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Load Driver
+Replays a realistic employee / manager / admin traffic mix against a running API server and
+reports p50/p95/p99 latency and throughput per endpoint, saved as JSON so runs can be compared.
+
+Every virtual user signs in as a seeded user by carrying a session cookie signed with the
+server's SESSION_SECRET, exactly what the OIDC callback would have stored, so no identity
+provider is involved. Writes clean up after themselves (an applied leave is deleted again), so
+the seeded data stays the same from run to run.
+
+Typical run, from python_server/, against a database seeded by benchmarks.seed_data:
+
+    python -m benchmarks.fake_openai --latency-ms 800 &
+    OPENAI_BASE_URL=http://localhost:8765/v1 OPENAI_API_KEY=fake OBJECT_STORAGE_DRIVER=local \\
+        uvicorn main:app --port 5000 --workers 4 &
+    python -m benchmarks.load_driver --manifest bench_manifest.json --users 200 --duration 120 \\
+        --output results/$(git rev-parse --short HEAD).json [--compare results/baseline.json]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+from itsdangerous import TimestampSigner
+
+# Statuses that are a correct answer for the request, not a failure (e.g. an overlapping leave)
+EXPECTED_STATUSES = {400, 404, 409}
+
+
+def session_cookie(user_id: str, secret: str) -> str:
+    """The cookie Starlette's SessionMiddleware would set after a successful OIDC login."""
+    session = {"user": {"claims": {"sub": user_id}, "expires_at": int(time.time()) + 30 * 24 * 3600}}
+    data = base64.b64encode(json.dumps(session).encode("utf-8"))
+    return TimestampSigner(secret).sign(data).decode("utf-8")
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, user_id: str, role: str, manifest: Dict, rng: random.Random):
+        self.client = client
+        self.user_id = user_id
+        self.role = role
+        self.manifest = manifest
+        self.rng = rng
+        self.sync_tokens: Dict[str, str] = {}
+        self.today = date.today()
+
+    def past_month(self) -> Tuple[int, int]:
+        first = date.fromisoformat(self.manifest["from"])
+        months = (self.today.year - first.year) * 12 + self.today.month - first.month
+        day = self.today.replace(day=1) - timedelta(days=1)
+        for _ in range(self.rng.randint(0, max(months - 1, 0))):
+            day = day.replace(day=1) - timedelta(days=1)
+        return day.month, day.year
+
+    # Each scenario returns (endpoint name, response); the name is the route template
+
+    async def bootstrap(self):
+        return "GET /api/bootstrap", await self.client.get("/api/bootstrap")
+
+    async def auth_user(self):
+        return "GET /api/auth/user", await self.client.get("/api/auth/user")
+
+    async def dashboard(self):
+        return "GET /api/dashboard/stats", await self.client.get("/api/dashboard/stats")
+
+    async def leave_types(self):
+        return "GET /api/leave-types", await self.client.get("/api/leave-types")
+
+    async def leave_balances(self):
+        return "GET /api/leave-balances", await self.client.get("/api/leave-balances")
+
+    async def leaves(self):
+        response = await self.client.get("/api/leaves")
+        if "x-sync-token" in response.headers:
+            self.sync_tokens["leaves"] = response.headers["x-sync-token"]
+        return "GET /api/leaves", response
+
+    async def leaves_delta(self):
+        if "leaves" not in self.sync_tokens:
+            return await self.leaves()
+        response = await self.client.get("/api/leaves", params={"since": self.sync_tokens["leaves"]})
+        if response.status_code == 200:
+            self.sync_tokens["leaves"] = response.json()["syncToken"]
+        return "GET /api/leaves?since", response
+
+    async def leaves_sparse(self):
+        return "GET /api/leaves?fields", await self.client.get("/api/leaves", params={"fields": "fromDate,toDate,status"})
+
+    async def attendance(self):
+        month, year = self.past_month() if self.rng.random() < 0.3 else (self.today.month, self.today.year)
+        return "GET /api/attendance", await self.client.get("/api/attendance", params={"month": month, "year": year})
+
+    async def absent_dates(self):
+        return "GET /api/attendance/absent-dates", await self.client.get("/api/attendance/absent-dates")
+
+    async def working_days(self):
+        start = self.today.replace(day=1)
+        return "GET /api/calendar/working-days", await self.client.get(
+            "/api/calendar/working-days", params={"from": str(start), "to": str(start + timedelta(days=90))}
+        )
+
+    async def salary_slips(self):
+        return "GET /api/salary-slips", await self.client.get("/api/salary-slips")
+
+    async def salary_slip(self):
+        month, year = self.past_month()
+        return "GET /api/salary-slips/{month}/{year}", await self.client.get(f"/api/salary-slips/{month}/{year}")
+
+    async def salary_slip_download(self):
+        month, year = self.past_month()
+        return "GET /api/salary-slips/{month}/{year}/download", await self.client.get(
+            f"/api/salary-slips/{month}/{year}/download"
+        )
+
+    async def apply_and_withdraw_leave(self):
+        start = self.today + timedelta(days=self.rng.randint(7, 120))
+        while start.weekday() >= 5:
+            start += timedelta(days=1)
+        response = await self.client.post("/api/leaves", json={
+            "leaveTypeId": self.rng.choice(self.manifest["leaveTypeIds"]),
+            "fromDate": str(start),
+            "toDate": str(start),
+            "reason": "load test",
+        })
+        if response.status_code == 200:
+            await self.client.delete(f"/api/leaves/{response.json()['id']}")
+        return "POST /api/leaves", response
+
+    async def regularize(self):
+        day = self.today - timedelta(days=self.rng.randint(1, 20))
+        return "POST /api/attendance/regularize", await self.client.post(
+            "/api/attendance/regularize", data={"date": str(day), "status": "present", "reason": "load test"}
+        )
+
+    async def hr_documents(self):
+        return "GET /api/hr-documents", await self.client.get("/api/hr-documents")
+
+    async def conversations(self):
+        return "GET /api/ai/conversations", await self.client.get("/api/ai/conversations")
+
+    async def ask(self):
+        return "POST /api/ai/ask", await self.client.post(
+            "/api/ai/ask", json={"question": "How many casual leaves can I carry forward?"}
+        )
+
+    async def team_calendar(self):
+        start = self.today - timedelta(days=self.today.weekday())
+        return "GET /api/team/calendar", await self.client.get(
+            "/api/team/calendar", params={"from": str(start), "to": str(start + timedelta(days=27))}
+        )
+
+    async def approvals(self):
+        return "GET /api/approvals/leaves", await self.client.get("/api/approvals/leaves")
+
+    async def payroll_components(self):
+        return "GET /api/admin/payroll/analytics/components", await self.client.get(
+            "/api/admin/payroll/analytics/components",
+            params={"from": self.manifest["from"][:7], "to": self.today.strftime("%Y-%m"), "groupBy": "month"},
+        )
+
+    async def payroll_slips(self):
+        return "GET /api/admin/payroll/analytics/slips", await self.client.get(
+            "/api/admin/payroll/analytics/slips", params={"kind": "allowance", "component": "Bonus", "limit": 100}
+        )
+
+    async def upload_document(self):
+        content = b"Leave Policy\n\n" + b"Employees accrue casual leave monthly. " * 200
+        return "POST /api/hr-documents/upload", await self.client.post(
+            "/api/hr-documents/upload",
+            files={"file": ("load-test-policy.txt", content, "text/plain")},
+            data={"category": "policy"},
+        )
+
+
+# Relative weights per role, roughly the mix seen from the web client over a working day
+EMPLOYEE_MIX: List[Tuple[Callable, int]] = [
+    (VirtualUser.bootstrap, 8), (VirtualUser.auth_user, 4), (VirtualUser.dashboard, 8),
+    (VirtualUser.leave_types, 3), (VirtualUser.leave_balances, 6), (VirtualUser.leaves, 6),
+    (VirtualUser.leaves_delta, 8), (VirtualUser.leaves_sparse, 2), (VirtualUser.attendance, 8),
+    (VirtualUser.absent_dates, 3), (VirtualUser.working_days, 2), (VirtualUser.salary_slips, 4),
+    (VirtualUser.salary_slip, 3), (VirtualUser.salary_slip_download, 1), (VirtualUser.apply_and_withdraw_leave, 2),
+    (VirtualUser.regularize, 1), (VirtualUser.hr_documents, 3), (VirtualUser.conversations, 2),
+    (VirtualUser.ask, 1),
+]
+MANAGER_MIX = EMPLOYEE_MIX + [(VirtualUser.team_calendar, 6), (VirtualUser.approvals, 6)]
+ADMIN_MIX = MANAGER_MIX + [
+    (VirtualUser.payroll_components, 3), (VirtualUser.payroll_slips, 2), (VirtualUser.upload_document, 1),
+]
+MIXES = {"employee": EMPLOYEE_MIX, "manager": MANAGER_MIX, "admin": ADMIN_MIX}
+
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.failures: Dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, elapsed_ms: float, status: Optional[int]):
+        self.latencies[name].append(elapsed_ms)
+        if status is None:
+            self.failures[name] += 1
+        else:
+            self.statuses[name][status] += 1
+
+    @staticmethod
+    def percentile(ordered: List[float], p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    def summary(self, duration: float) -> Dict:
+        endpoints = {}
+        for name in sorted(self.latencies):
+            ordered = sorted(self.latencies[name])
+            statuses = self.statuses[name]
+            errors = self.failures[name] + sum(
+                count for status, count in statuses.items() if status >= 500 or (status >= 400 and status not in EXPECTED_STATUSES)
+            )
+            endpoints[name] = {
+                "count": len(ordered),
+                "rps": round(len(ordered) / duration, 2),
+                "p50": round(self.percentile(ordered, 0.50), 2),
+                "p95": round(self.percentile(ordered, 0.95), 2),
+                "p99": round(self.percentile(ordered, 0.99), 2),
+                "max": round(ordered[-1], 2),
+                "errors": errors,
+                "statuses": {str(status): count for status, count in sorted(statuses.items())},
+            }
+        everything = sorted(latency for latencies in self.latencies.values() for latency in latencies)
+        total = {
+            "count": len(everything),
+            "rps": round(len(everything) / duration, 2),
+            "p50": round(self.percentile(everything, 0.50), 2) if everything else None,
+            "p95": round(self.percentile(everything, 0.95), 2) if everything else None,
+            "p99": round(self.percentile(everything, 0.99), 2) if everything else None,
+            "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+        }
+        return {"total": total, "endpoints": endpoints}
+
+
+async def run_virtual_user(vu: VirtualUser, results: Results, measure_from: float, stop_at: float, think_ms: float):
+    mix = MIXES[vu.role]
+    scenarios, weights = [scenario for scenario, _ in mix], [weight for _, weight in mix]
+    while time.monotonic() < stop_at:
+        scenario = vu.rng.choices(scenarios, weights)[0]
+        started = time.perf_counter()
+        try:
+            name, response = await scenario(vu)
+            status = response.status_code
+        except httpx.HTTPError:
+            # Timeouts and refused connections, which never got a status
+            name, status = f"{scenario.__name__} (transport error)", None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if time.monotonic() >= measure_from:
+            results.record(name, elapsed_ms, status)
+        if think_ms:
+            await asyncio.sleep(vu.rng.expovariate(1000 / think_ms))
+
+
+def assign_roles(manifest: Dict, count: int, rng: random.Random) -> List[Tuple[str, str]]:
+    """About 10% of virtual users are managers and one is the admin; the rest are employees."""
+    roles = [(manifest["adminId"], "admin")]
+    for i in range(1, count):
+        if i % 10 == 0 and manifest["managerIds"]:
+            roles.append((rng.choice(manifest["managerIds"]), "manager"))
+        else:
+            roles.append((rng.choice(manifest["employeeIds"] or manifest["managerIds"]), "employee"))
+    return roles
+
+
+async def main(args, manifest: Dict):
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+
+    clients, virtual_users = [], []
+    for i, (user_id, role) in enumerate(assign_roles(manifest, args.users, rng)):
+        client = httpx.AsyncClient(
+            base_url=args.base_url, cookies={"session": session_cookie(user_id, args.session_secret)},
+            timeout=args.timeout, limits=limits,
+        )
+        clients.append(client)
+        virtual_users.append(VirtualUser(client, user_id, role, manifest, random.Random(args.seed + i)))
+
+    results = Results()
+    start = time.monotonic()
+    measure_from, stop_at = start + args.warmup, start + args.warmup + args.duration
+    print(f"Running {args.users} virtual users for {args.warmup}s warm-up + {args.duration}s against {args.base_url} …")
+    await asyncio.gather(*(run_virtual_user(vu, results, measure_from, stop_at, args.think_ms) for vu in virtual_users))
+    await asyncio.gather(*(client.aclose() for client in clients))
+    return results.summary(args.duration)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(summary: Dict, baseline: Optional[Dict]):
+    def delta(name: str, key: str) -> str:
+        if not baseline or name not in baseline["endpoints"] or not baseline["endpoints"][name][key]:
+            return ""
+        before = baseline["endpoints"][name][key]
+        return f" ({(summary['endpoints'][name][key] - before) / before * 100:+.0f}%)"
+
+    print(f"\n{'endpoint':<48} {'count':>7} {'rps':>8} {'p50 ms':>14} {'p95 ms':>14} {'p99 ms':>14} {'errors':>7}")
+    for name, stats in summary["endpoints"].items():
+        print(
+            f"{name:<48} {stats['count']:>7} {stats['rps']:>8.1f} "
+            f"{stats['p50']:>8.1f}{delta(name, 'p50'):>6} {stats['p95']:>8.1f}{delta(name, 'p95'):>6} "
+            f"{stats['p99']:>8.1f}{delta(name, 'p99'):>6} {stats['errors']:>7}"
+        )
+    total = summary["total"]
+    print(f"\nTotal: {total['count']} requests, {total['rps']:.1f} req/s, "
+          f"p50 {total['p50']}ms, p95 {total['p95']}ms, p99 {total['p99']}ms, {total['errors']} errors")
+    if baseline:
+        print(f"Baseline: {baseline['total']['rps']:.1f} req/s, p50 {baseline['total']['p50']}ms, "
+              f"p95 {baseline['total']['p95']}ms, p99 {baseline['total']['p99']}ms ({baseline['meta'].get('revision')})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a realistic traffic mix and report latency per endpoint")
+    parser.add_argument("--manifest", default="bench_manifest.json", help="written by benchmarks.seed_data")
+    parser.add_argument("--base-url", default="http://localhost:5000")
+    parser.add_argument("--users", type=int, default=100, help="concurrent virtual users")
+    parser.add_argument("--duration", type=int, default=60, help="measured seconds")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured seconds before measuring")
+    parser.add_argument("--think-ms", type=float, default=200, help="mean pause between a user's requests; 0 for closed-loop")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--session-secret", default=os.getenv("SESSION_SECRET") or "your-secret-key-here")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="a previous results JSON to compare against")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    summary = asyncio.run(main(args, manifest))
+    summary["meta"] = {
+        "revision": git_revision(),
+        "startedAt": datetime.now(timezone.utc).isoformat(),
+        "users": args.users,
+        "duration": args.duration,
+        "thinkMs": args.think_ms,
+        "seed": args.seed,
+        "manifestSeed": manifest.get("seed"),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_summary(summary, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"✓ Results written to {args.output}")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Notification Load Test
+Opens thousands of idle WebSocket subscriptions against one running worker, holds them, and
+reports connect rate, the worker's memory per connection and (with --notify) how long one
+NOTIFY takes to reach every subscriber.
+
+Start a single worker first, e.g.  uvicorn main:app --port 5000 --workers 1
+then, from python_server/:
+
+    python -m benchmarks.notifications_load --connections 10000 --cookie "session=..." \\
+        --server-pid $(pgrep -f "uvicorn main:app") [--notify --user-id <session user id>]
+
+The session cookie is copied from a logged-in browser; every connection subscribes as that user.
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import time
+from typing import List, Optional
+
+import websockets
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def raise_fd_limit(needed: int):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+        print(f"File descriptor limit {soft} → {min(needed, hard)}")
+
+
+async def open_connections(url: str, cookie: str, count: int, concurrency: int) -> List:
+    connections = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def connect():
+        async with semaphore:
+            connections.append(await websockets.connect(
+                url, additional_headers={"Cookie": cookie}, ping_interval=None, max_queue=16
+            ))
+
+    results = await asyncio.gather(*(connect() for _ in range(count)), return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        print(f"  {len(failures)} connections failed, first: {failures[0]!r}")
+    return connections
+
+
+async def measure_fanout(connections: List, database_url: str, user_id: str):
+    import psycopg2
+    from notifications import CHANNEL
+
+    conn = psycopg2.connect(database_url)
+    conn.autocommit = True
+
+    async def receive(ws):
+        while True:
+            message = json.loads(await ws.recv())
+            if message.get("type") == "loadtest":
+                return time.perf_counter()
+
+    waiters = [asyncio.create_task(receive(ws)) for ws in connections]
+    await asyncio.sleep(0.5)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, json.dumps({"userId": user_id, "type": "loadtest", "data": {}})))
+    sent = time.perf_counter()
+    arrivals = sorted(await asyncio.gather(*waiters))
+    conn.close()
+
+    def pct(p):
+        return (arrivals[min(len(arrivals) - 1, int(len(arrivals) * p))] - sent) * 1000
+
+    print(f"Fan-out of one NOTIFY to {len(arrivals)} subscribers: "
+          f"p50 {pct(0.5):.1f}ms, p99 {pct(0.99):.1f}ms, last {pct(1.0):.1f}ms")
+
+
+async def main(args):
+    raise_fd_limit(args.connections + 1024)
+    baseline = rss_mb(args.server_pid) if args.server_pid else None
+
+    started = time.perf_counter()
+    connections = await open_connections(args.url, args.cookie, args.connections, args.concurrency)
+    elapsed = time.perf_counter() - started
+    print(f"Opened {len(connections)} connections in {elapsed:.1f}s ({len(connections) / elapsed:.0f}/s)")
+
+    if baseline is not None:
+        loaded = rss_mb(args.server_pid)
+        print(f"Worker RSS {baseline:.0f}MB → {loaded:.0f}MB "
+              f"({(loaded - baseline) * 1024 / max(len(connections), 1):.1f}KB per idle connection)")
+
+    print(f"Holding for {args.hold}s …")
+    await asyncio.sleep(args.hold)
+    alive = sum(1 for ws in connections if ws.close_code is None)
+    print(f"{alive}/{len(connections)} connections still open (server heartbeats every 25s)")
+
+    if args.notify:
+        await measure_fanout([ws for ws in connections if ws.close_code is None], args.database_url, args.user_id)
+
+    await asyncio.gather(*(ws.close() for ws in connections), return_exceptions=True)
+
+
+if __name__ == "__main__":
+    import os
+
+    parser = argparse.ArgumentParser(description="Hold many idle notification WebSockets on one worker")
+    parser.add_argument("--url", default="ws://localhost:5000/api/ws/notifications")
+    parser.add_argument("--cookie", required=True, help="Cookie header of a logged-in session")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=200, help="connections being opened at once")
+    parser.add_argument("--hold", type=int, default=60, help="seconds to hold the connections idle")
+    parser.add_argument("--server-pid", type=int, help="worker pid, to report its memory per connection")
+    parser.add_argument("--notify", action="store_true", help="measure fan-out of one NOTIFY to every connection")
+    parser.add_argument("--user-id", help="the session's user id (required with --notify)")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    args = parser.parse_args()
+    if args.notify and not (args.user_id and args.database_url):
+        parser.error("--notify needs --user-id and DATABASE_URL")
+
+    asyncio.run(main(args))
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data Generator
+Seeds a realistic organisation for load tests: managers and their teams, leave balances and
+non-overlapping leaves, weekday attendance, monthly salary slips, HR documents and AI
+conversations. Rows are streamed in with COPY, and the same --seed always produces the same
+data, so runs against different builds compare like with like.
+
+Run from python_server/ against a scratch database:
+
+    python -m benchmarks.seed_data --users 2000 --years 2 --seed 42 --manifest bench_manifest.json
+
+The manifest lists the seeded user ids for benchmarks.load_driver.
+"""
+
+import argparse
+import csv
+import io
+import json
+import random
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from attendance_partitions import ensure_attendance_partitions
+from config import settings
+from database import upgrade_schema
+from init_db import DEFAULT_LEAVE_TYPES
+from models import LeaveType
+from payroll_analytics import refresh_component_totals
+from team_calendar import rebuild_leave_days
+
+DEPARTMENTS = ["Engineering", "Sales", "Finance", "Operations", "Human Resources", "Marketing", "Support"]
+LOCATIONS = ["Bengaluru", "Hyderabad", "Pune", "Chennai", "Remote"]
+DESIGNATIONS = [("Associate", 30000), ("Senior Associate", 55000), ("Lead", 85000), ("Manager", 120000)]
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Ananya", "Vikram", "Sneha", "Arjun", "Kavya", "Rahul", "Meera", "Karthik", "Divya"]
+LAST_NAMES = ["Sharma", "Iyer", "Reddy", "Patel", "Nair", "Gupta", "Rao", "Menon", "Singh", "Das", "Kulkarni", "Joshi"]
+DOCUMENT_CATEGORIES = ["policy", "benefits", "handbook", "forms", "general"]
+# Leave types most people take; the rest stay rare
+COMMON_LEAVE_TYPES = ("Casual Leave", "Sick Leave", "Earned Leave")
+FLUSH_BYTES = 4 * 1024 * 1024
+
+
+class CopyWriter:
+    """Buffers CSV rows and streams them into one table with COPY every few megabytes."""
+
+    def __init__(self, cursor, table: str, columns: Sequence[str]):
+        self.cursor = cursor
+        self.sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.count = 0
+
+    def write(self, row: Sequence):
+        self.writer.writerow(row)
+        self.count += 1
+        if self.buffer.tell() >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self.buffer.tell():
+            self.buffer.seek(0)
+            self.cursor.copy_expert(self.sql, self.buffer)
+            self.buffer = io.StringIO()
+            self.writer = csv.writer(self.buffer)
+
+
+def weekdays(start: date, end: date):
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+
+def month_range(start: date, end: date) -> List[Tuple[int, int]]:
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class OrgGenerator:
+    def __init__(self, seed: int, prefix: str, today: date):
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.today = today
+        self.now = datetime.combine(today, dt_time(12))
+
+    def new_id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def users(self, count: int, team_size: int, period_start: date) -> List[Dict]:
+        manager_count = max(1, count // team_size)
+        users = []
+        for i in range(count):
+            is_manager = i < manager_count
+            designation, base_salary = DESIGNATIONS[3] if is_manager else self.rng.choice(DESIGNATIONS[:3])
+            users.append({
+                "id": self.new_id(),
+                "email": f"{self.prefix}{i}@bench.example.com",
+                "first_name": self.rng.choice(FIRST_NAMES),
+                "last_name": self.rng.choice(LAST_NAMES),
+                "employee_id": f"{self.prefix.upper()}{i:06d}",
+                "department": DEPARTMENTS[i % len(DEPARTMENTS)] if is_manager else None,
+                "location": self.rng.choice(LOCATIONS),
+                "designation": designation,
+                "joining_date": period_start - timedelta(days=self.rng.randint(0, 3 * 365)),
+                "manager_id": None,
+                "is_admin": i == 0,
+                "is_manager": is_manager,
+                "base_salary": base_salary * self.rng.uniform(0.9, 1.2),
+            })
+        managers = users[:manager_count]
+        for i, user in enumerate(users):
+            # The first manager heads the org; everyone else reports to a manager
+            manager = managers[0] if i < manager_count else managers[i % manager_count]
+            if user is not manager:
+                user["manager_id"] = manager["id"]
+            if user["department"] is None:
+                user["department"] = manager["department"]
+        return users
+
+    def leaves(self, user: Dict, year: int, leave_types: List[Dict], period_end: date) -> List[Dict]:
+        """Non-overlapping leaves for one year, within each leave type's allowance."""
+        remaining = {lt["id"]: Decimal(lt["max_days"]) for lt in leave_types}
+        common = [lt for lt in leave_types if lt["name"] in COMMON_LEAVE_TYPES] or leave_types
+        year_end = min(date(year, 12, 31), period_end + timedelta(days=90))
+        cursor = date(year, 1, 1) + timedelta(days=self.rng.randint(0, 40))
+        leaves = []
+        target = self.rng.randint(3, 9)
+        while len(leaves) < target:
+            from_date = cursor + timedelta(days=self.rng.randint(5, 60))
+            to_date = from_date + timedelta(days=self.rng.randint(0, 4))
+            if to_date > year_end:
+                break
+            cursor = to_date + timedelta(days=1)
+            days = Decimal(sum(1 for _ in weekdays(from_date, to_date)))
+            leave_type = self.rng.choice(common) if self.rng.random() < 0.95 else self.rng.choice(leave_types)
+            if days == 0 or days > remaining[leave_type["id"]]:
+                continue
+
+            if from_date > self.today:
+                status = "pending" if self.rng.random() < 0.6 else "approved"
+            else:
+                status = self.rng.choices(["approved", "rejected", "cancelled"], [0.8, 0.1, 0.1])[0]
+            if status in ("pending", "approved"):
+                remaining[leave_type["id"]] -= days
+            applied_at = datetime.combine(from_date, dt_time(10)) - timedelta(days=self.rng.randint(3, 30))
+            leaves.append({
+                "id": self.new_id(),
+                "leave_type_id": leave_type["id"],
+                "from_date": from_date,
+                "to_date": to_date,
+                "days": days,
+                "status": status,
+                "applied_at": applied_at,
+                "reviewed_at": applied_at + timedelta(days=1) if status in ("approved", "rejected") else None,
+            })
+        return leaves
+
+    def attendance(self, day: date, on_leave: bool) -> Tuple[str, Optional[datetime], Optional[datetime], Optional[Decimal]]:
+        if on_leave:
+            return "leave", None, None, None
+        status = self.rng.choices(["present", "wfh", "absent"], [0.85, 0.1, 0.05])[0]
+        if status == "absent":
+            return status, None, None, None
+        check_in = datetime.combine(day, dt_time(9)) + timedelta(minutes=self.rng.randint(-30, 45))
+        hours = Decimal(self.rng.randint(450, 570)) / 60
+        return status, check_in, check_in + timedelta(hours=float(hours)), hours.quantize(Decimal("0.01"))
+
+    def salary(self, base_salary: float) -> Tuple[Decimal, Dict, Dict]:
+        basic = Decimal(base_salary).quantize(Decimal("0.01"))
+        allowances = {
+            "HRA": float((basic * Decimal("0.4")).quantize(Decimal("0.01"))),
+            "Transport": 1600.0,
+            "Special": float((basic * Decimal(self.rng.uniform(0.05, 0.2))).quantize(Decimal("0.01"))),
+        }
+        if self.rng.random() < 0.1:
+            allowances["Bonus"] = float((basic * Decimal("0.5")).quantize(Decimal("0.01")))
+        deductions = {
+            "PF": float((basic * Decimal("0.12")).quantize(Decimal("0.01"))),
+            "Professional Tax": 200.0,
+            "Income Tax": float((basic * Decimal(self.rng.uniform(0.05, 0.15))).quantize(Decimal("0.01"))),
+        }
+        return basic, allowances, deductions
+
+
+def ensure_leave_types(SessionLocal) -> List[Dict]:
+    db = SessionLocal()
+    try:
+        if db.query(LeaveType).count() == 0:
+            db.add_all([LeaveType(**fields) for fields in DEFAULT_LEAVE_TYPES])
+            db.commit()
+        return [
+            {"id": lt.id, "name": lt.name, "max_days": lt.max_days}
+            for lt in db.query(LeaveType).order_by(LeaveType.name)
+        ]
+    finally:
+        db.close()
+
+
+def seed(args):
+    engine = create_engine(args.database_url or settings.database_url)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    today = date.today()
+    period_start = date(today.year - args.years + 1, 1, 1)
+    period_end = today - timedelta(days=1)
+    generator = OrgGenerator(args.seed, args.prefix, today)
+
+    upgrade_schema(args.database_url or settings.database_url)
+    ensure_attendance_partitions(engine, months_back=(today.year - period_start.year) * 12 + today.month)
+    leave_types = ensure_leave_types(SessionLocal)
+
+    with engine.connect() as conn:
+        existing = conn.execute(
+            text("SELECT count(*) FROM users WHERE email LIKE :pattern"),
+            {"pattern": f"{args.prefix}%@bench.example.com"},
+        ).scalar()
+    if existing:
+        raise SystemExit(f"✗ {existing} users with prefix '{args.prefix}' already exist; use another --prefix or a fresh database")
+
+    started = time.perf_counter()
+    users = generator.users(args.users, args.team_size, period_start)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        copy_users = CopyWriter(cursor, "users", [
+            "id", "email", "first_name", "last_name", "employee_id", "department", "location",
+            "designation", "joining_date", "manager_id", "is_admin", "created_at", "updated_at",
+        ])
+        # Managers come first, so every manager_id already exists when its reports are copied
+        for user in users:
+            copy_users.write([
+                user["id"], user["email"], user["first_name"], user["last_name"], user["employee_id"],
+                user["department"], user["location"], user["designation"], user["joining_date"],
+                user["manager_id"], user["is_admin"], generator.now, generator.now,
+            ])
+        copy_users.flush()
+
+        copy_leaves = CopyWriter(cursor, "leaves", [
+            "id", "user_id", "leave_type_id", "from_date", "to_date", "days", "reason", "status",
+            "applied_at", "reviewed_at", "reviewed_by", "created_at", "updated_at",
+        ])
+        copy_balances = CopyWriter(cursor, "leave_balances", [
+            "id", "user_id", "leave_type_id", "total_days", "used_days", "reserved_days",
+            "carried_forward_days", "year", "created_at", "updated_at",
+        ])
+        copy_attendance = CopyWriter(cursor, "attendance_records", [
+            "id", "user_id", "date", "status", "check_in", "check_out", "working_hours", "created_at", "updated_at",
+        ])
+        copy_slips = CopyWriter(cursor, "salary_slips", [
+            "id", "user_id", "month", "year", "basic_salary", "allowances", "deductions",
+            "gross_salary", "net_salary", "payment_date", "created_at",
+        ])
+        copy_conversations = CopyWriter(cursor, "ai_conversations", [
+            "id", "user_id", "question", "answer", "documents_used", "created_at",
+        ])
+        slip_months = month_range(period_start, period_end.replace(day=1) - timedelta(days=1))
+
+        for user in users:
+            leave_dates = set()
+            for year in range(period_start.year, today.year + 1):
+                used = {lt["id"]: Decimal(0) for lt in leave_types}
+                reserved = {lt["id"]: Decimal(0) for lt in leave_types}
+                for leave in generator.leaves(user, year, leave_types, period_end):
+                    copy_leaves.write([
+                        leave["id"], user["id"], leave["leave_type_id"], leave["from_date"], leave["to_date"],
+                        leave["days"], "Synthetic leave", leave["status"], leave["applied_at"], leave["reviewed_at"],
+                        user["manager_id"] if leave["reviewed_at"] else None, leave["applied_at"],
+                        leave["reviewed_at"] or leave["applied_at"],
+                    ])
+                    if leave["status"] == "approved":
+                        used[leave["leave_type_id"]] += leave["days"]
+                        leave_dates.update(weekdays(leave["from_date"], leave["to_date"]))
+                    elif leave["status"] == "pending":
+                        reserved[leave["leave_type_id"]] += leave["days"]
+                for lt in leave_types:
+                    copy_balances.write([
+                        generator.new_id(), user["id"], lt["id"], lt["max_days"], used[lt["id"]],
+                        reserved[lt["id"]], 0, year, generator.now, generator.now,
+                    ])
+
+            for day in weekdays(max(period_start, user["joining_date"]), period_end):
+                status, check_in, check_out, hours = generator.attendance(day, day in leave_dates)
+                stamp = datetime.combine(day, dt_time(19))
+                copy_attendance.write([generator.new_id(), user["id"], day, status, check_in, check_out, hours, stamp, stamp])
+
+            for year, month in slip_months:
+                basic, allowances, deductions = generator.salary(user["base_salary"])
+                gross = basic + Decimal(str(sum(allowances.values())))
+                net = gross - Decimal(str(sum(deductions.values())))
+                payment_date = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+                copy_slips.write([
+                    generator.new_id(), user["id"], month, year, basic, json.dumps(allowances), json.dumps(deductions),
+                    gross, net, payment_date, datetime.combine(payment_date, dt_time(6)),
+                ])
+
+            for _ in range(args.conversations_per_user):
+                asked = generator.now - timedelta(days=generator.rng.randint(0, 180))
+                copy_conversations.write([
+                    generator.new_id(), user["id"], "How many casual leaves can I carry forward?",
+                    "Casual leave carries forward up to the policy limit.", '{"Leave Policy"}', asked,
+                ])
+
+        admin_id = users[0]["id"]
+        copy_documents = CopyWriter(cursor, "hr_documents", [
+            "id", "name", "category", "file_path", "file_size", "mime_type", "uploaded_by",
+            "is_active", "vector_count", "processed_at", "created_at",
+        ])
+        for i in range(args.documents):
+            copy_documents.write([
+                generator.new_id(), f"Policy {i:04d}.pdf", generator.rng.choice(DOCUMENT_CATEGORIES),
+                f"seed/policy-{i:04d}.pdf", generator.rng.randint(20_000, 2_000_000), "application/pdf",
+                admin_id, True, generator.rng.randint(1, 40), generator.now, generator.now,
+            ])
+
+        writers = {
+            "users": copy_users, "leaves": copy_leaves, "leave_balances": copy_balances,
+            "attendance_records": copy_attendance, "salary_slips": copy_slips,
+            "ai_conversations": copy_conversations, "hr_documents": copy_documents,
+        }
+        for writer in writers.values():
+            writer.flush()
+        raw.commit()
+    finally:
+        raw.close()
+    print(f"✓ Copied rows in {time.perf_counter() - started:.1f}s: "
+          + ", ".join(f"{table} {writer.count}" for table, writer in writers.items()))
+
+    print(f"✓ leave_days rebuilt ({rebuild_leave_days(engine)} rows)")
+    if slip_months:
+        db = SessionLocal()
+        try:
+            refreshed = refresh_component_totals(db, slip_months[0], slip_months[-1])
+            print(f"✓ Payroll component totals refreshed ({refreshed} rows)")
+        finally:
+            db.close()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+    if args.manifest:
+        with open(args.manifest, "w") as f:
+            json.dump({
+                "seed": args.seed,
+                "prefix": args.prefix,
+                "from": period_start.isoformat(),
+                "to": period_end.isoformat(),
+                "adminId": admin_id,
+                "managerIds": [u["id"] for u in users if u["is_manager"]],
+                "employeeIds": [u["id"] for u in users if not u["is_manager"]],
+                "leaveTypeIds": [lt["id"] for lt in leave_types if lt["name"] in COMMON_LEAVE_TYPES],
+            }, f, indent=2)
+        print(f"✓ Manifest written to {args.manifest}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a synthetic organisation for load tests")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=2, help="years of attendance, leaves and salary slips")
+    parser.add_argument("--team-size", type=int, default=10, help="direct reports per manager")
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--conversations-per-user", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="bench", help="email and employee id prefix of seeded users")
+    parser.add_argument("--manifest", default="bench_manifest.json", help="where to write seeded ids for the load driver")
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL")
+    seed(parser.parse_args())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Response Serialization Benchmark
+Times the old hand-built dict + jsonable_encoder + json.dumps path against the precompiled
+TypeAdapters in serializers.py for 10k-row leave and attendance lists, from both ORM objects
+and SQLAlchemy Row tuples.
+
+Run from python_server/:  python -m benchmarks.serialization_bench --rows 10000
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.engine.result import result_tuple
+
+import serializers
+from models import AttendanceRecord, Leave
+
+LEAVE_COLUMNS = [
+    "id", "user_id", "leave_type_id", "from_date", "to_date", "days",
+    "reason", "status", "contact_number", "attachment_path", "applied_at",
+]
+ATTENDANCE_COLUMNS = ["id", "user_id", "date", "status", "check_in", "check_out", "working_hours"]
+
+
+def make_leaves(rng: random.Random, count: int):
+    leaves = []
+    for i in range(count):
+        start = date(2000, 1, 1) + timedelta(days=rng.randrange(9000))
+        leaves.append(Leave(
+            id=f"leave-{i:08d}", user_id="user-1", leave_type_id="type-1",
+            from_date=start, to_date=start + timedelta(days=rng.randrange(5)),
+            days=Decimal(rng.randrange(1, 10)) / 2, reason="Family function", status="approved",
+            contact_number="+91 98765 43210", attachment_path=None,
+            applied_at=datetime(2000, 1, 1) + timedelta(seconds=rng.randrange(10**9)),
+        ))
+    return leaves
+
+
+def make_attendance(rng: random.Random, count: int):
+    records = []
+    for i in range(count):
+        day = date(2000, 1, 1) + timedelta(days=i)
+        check_in = datetime.combine(day, datetime.min.time()) + timedelta(hours=9, minutes=rng.randrange(60))
+        records.append(AttendanceRecord(
+            id=f"att-{i:08d}", user_id="user-1", date=day, status=rng.choice(["present", "wfh", "leave"]),
+            check_in=check_in, check_out=check_in + timedelta(hours=9),
+            working_hours=Decimal("9.00"),
+        ))
+    return records
+
+
+def legacy_leaves(leaves):
+    return [
+        {
+            "id": leave.id,
+            "userId": leave.user_id,
+            "leaveTypeId": leave.leave_type_id,
+            "fromDate": str(leave.from_date),
+            "toDate": str(leave.to_date),
+            "days": float(leave.days),
+            "reason": leave.reason,
+            "status": leave.status,
+            "contactNumber": leave.contact_number,
+            "attachmentPath": leave.attachment_path,
+            "appliedAt": leave.applied_at.isoformat() if leave.applied_at else None,
+        }
+        for leave in leaves
+    ]
+
+
+def legacy_attendance(records):
+    return {
+        "records": [
+            {
+                "id": r.id,
+                "userId": r.user_id,
+                "date": str(r.date),
+                "status": r.status,
+                "checkIn": r.check_in.isoformat() if r.check_in else None,
+                "checkOut": r.check_out.isoformat() if r.check_out else None,
+                "workingHours": float(r.working_hours) if r.working_hours else None,
+            }
+            for r in records
+        ],
+        "stats": {"present": 0, "absent": 0, "leave": 0, "wfh": 0},
+    }
+
+
+def starlette_json(content) -> bytes:
+    # What JSONResponse.render does after FastAPI has run jsonable_encoder
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def as_rows(objects, columns):
+    make_row = result_tuple(columns)
+    return [make_row([getattr(obj, column) for column in columns]) for obj in objects]
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def report(label: str, legacy_seconds: float, results):
+    print(f"\n{label}")
+    print(f"  {'hand-built + jsonable_encoder + json':<40}{legacy_seconds * 1000:>9.1f}ms")
+    for name, seconds in results:
+        print(f"  {name:<40}{seconds * 1000:>9.1f}ms  ({legacy_seconds / seconds:.1f}x, "
+              f"{(legacy_seconds - seconds) * 1000:.1f}ms CPU saved per request)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark API response serialization")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    leaves = make_leaves(rng, args.rows)
+    leave_rows = as_rows(leaves, LEAVE_COLUMNS)
+    records = make_attendance(rng, args.rows)
+    attendance_rows = as_rows(records, ATTENDANCE_COLUMNS)
+    stats = {"present": 0, "absent": 0, "leave": 0, "wfh": 0}
+
+    # Same document either way
+    assert json.loads(serializers.dump_json(serializers.LEAVES, leave_rows)) == json.loads(starlette_json(legacy_leaves(leaves)))
+
+    report(f"Leaves, {args.rows} rows", timed(lambda: starlette_json(legacy_leaves(leaves)), args.repeat), [
+        ("TypeAdapter from ORM objects", timed(lambda: serializers.dump_json(serializers.LEAVES, leaves), args.repeat)),
+        ("TypeAdapter from Row tuples", timed(lambda: serializers.dump_json(serializers.LEAVES, leave_rows), args.repeat)),
+    ])
+    report(f"Attendance, {args.rows} rows", timed(lambda: starlette_json(legacy_attendance(records)), args.repeat), [
+        ("TypeAdapter from ORM objects", timed(
+            lambda: serializers.dump_json(serializers.ATTENDANCE_MONTH, {"records": records, "stats": stats}), args.repeat)),
+        ("TypeAdapter from Row tuples", timed(
+            lambda: serializers.dump_json(serializers.ATTENDANCE_MONTH, {"records": serializers.row_dicts(attendance_rows), "stats": stats}), args.repeat)),
+    ])
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Measures how quickly a new worker can take traffic: the time to `import main` in a fresh
+interpreter, and the time from spawning a uvicorn process to its first answered request.
+Each run uses a new process, so nothing is cached in memory between runs (the OS page cache
+still is - run once and discard it for a truly cold number).
+
+Run from python_server/ against a migrated database:
+
+    python -m benchmarks.startup_bench --runs 10 [--warmup] --output results/startup.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_driver import git_revision
+
+# Answers 401 without a session, so it proves the app is up without touching the database
+PROBE_PATH = "/api/auth/user"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_import() -> float:
+    """Seconds for a fresh interpreter to import the app, measured inside that interpreter."""
+    code = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def time_first_response(warmup: bool, timeout: float) -> float:
+    """Seconds from spawning a uvicorn worker until it answers PROBE_PATH."""
+    port = free_port()
+    env = dict(os.environ, STARTUP_WARMUP="true" if warmup else "false")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited during startup:\n{process.stderr.read().decode()}")
+            try:
+                httpx.get(f"http://127.0.0.1:{port}{PROBE_PATH}", timeout=1)
+                return time.perf_counter() - start
+            except httpx.TransportError:
+                time.sleep(0.01)
+        raise RuntimeError(f"Server did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summarize(samples: List[float]) -> Dict:
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "min": round(ordered[0] * 1000, 1),
+        "median": round(statistics.median(ordered) * 1000, 1),
+        "max": round(ordered[-1] * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-response of a new worker")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", action="store_true", help="start the server with STARTUP_WARMUP=true")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds to wait for each server to answer")
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+
+    imports = [time_import() for _ in range(args.runs)]
+    first_responses = [time_first_response(args.warmup, args.timeout) for _ in range(args.runs)]
+    summary = {
+        "import": summarize(imports),
+        "firstResponse": summarize(first_responses),
+        "meta": {
+            "revision": git_revision(),
+            "startedAt": datetime.now(timezone.utc).isoformat(),
+            "warmup": args.warmup,
+        },
+    }
+
+    for name, label in (("import", "import main"), ("firstResponse", "first response")):
+        stats = summary[name]
+        print(f"{label:<16} min {stats['min']:>7.1f}ms  median {stats['median']:>7.1f}ms  max {stats['max']:>7.1f}ms")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"✓ Results written to {args.output}")
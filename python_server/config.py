@@ -3,13 +3,56 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str = os.getenv("DATABASE_URL", "")
+    # Direct (non-pgbouncer) URL for session-level features such as LISTEN; defaults to DATABASE_URL
+    database_direct_url: str = os.getenv("DATABASE_DIRECT_URL", "")
+    # Per worker process: keep pool_size * workers under the server's (or pgbouncer's) connection limit
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+    db_pool_warm: int = int(os.getenv("DB_POOL_WARM", "5"))
+    db_pgbouncer: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+    # Comma-separated streaming replica URLs for read-only queries
+    database_replica_urls: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    replica_pool_size: int = int(os.getenv("REPLICA_POOL_SIZE", "10"))
+    # Must stay well under sync.SYNC_OVERLAP so delta sync never skips a lagging row
+    replica_max_lag_seconds: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    replica_sticky_seconds: float = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+    replica_check_seconds: float = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
+    # llm_gateway limits, per worker process: divide the account's tokens-per-minute by the worker count
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    llm_tokens_per_minute: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))
+    llm_queue_timeout_seconds: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+    llm_request_timeout_seconds: float = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "60"))
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    llm_breaker_failures: int = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    llm_breaker_reset_seconds: float = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+    # prompt_builder: the model's context window, and the most of it document context may use
+    llm_context_window_tokens: int = int(os.getenv("LLM_CONTEXT_WINDOW_TOKENS", "128000"))
+    llm_context_budget_tokens: int = int(os.getenv("LLM_CONTEXT_BUDGET_TOKENS", "6000"))
     issuer_url: str = os.getenv("ISSUER_URL", "https://replit.com/oidc")
     repl_id: str = os.getenv("REPL_ID", "")
     replit_domains: str = os.getenv("REPLIT_DOMAINS", "")
     session_secret: str = os.getenv("SESSION_SECRET", "")
     public_object_search_paths: str = os.getenv("PUBLIC_OBJECT_SEARCH_PATHS", "")
     private_object_dir: str = os.getenv("PRIVATE_OBJECT_DIR", "")
+    # Holiday calendars are cached per worker; edits to the holidays table show up within this long
+    holiday_calendar_ttl_seconds: float = float(os.getenv("HOLIDAY_CALENDAR_TTL_SECONDS", "300"))
+    attendance_partitions_ahead: int = int(os.getenv("ATTENDANCE_PARTITIONS_AHEAD", "3"))
+    attendance_partitions_back: int = int(os.getenv("ATTENDANCE_PARTITIONS_BACK", "12"))
+    attendance_retention_months: int = int(os.getenv("ATTENDANCE_RETENTION_MONTHS", "36"))
+    # Workers only check the schema revision at startup; set this where a single process may migrate
+    migrate_on_startup: bool = os.getenv("MIGRATE_ON_STARTUP", "false").lower() == "true"
+    # Open pool connections and import the OpenAI/GCS/PDF SDKs before accepting traffic (main.py --warmup)
+    startup_warmup: bool = os.getenv("STARTUP_WARMUP", "false").lower() == "true"
+    # runner.py: worker processes (0 = one per available CPU), and how a worker stops on SIGTERM:
+    # fail /readyz for the drain period so load balancers stop routing to it, then finish in-flight requests
+    web_concurrency: int = int(os.getenv("WEB_CONCURRENCY", "0"))
+    shutdown_drain_seconds: float = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "5"))
+    shutdown_timeout_seconds: int = int(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", "30"))
+    metrics_token: str = os.getenv("METRICS_TOKEN", "")
     
     class Config:
         env_file = ".env"
@@ -1,14 +1,60 @@
+"""
+Database
+The application's engine and session factory.
+
+Pool sizing, recycling and checkout timeout come from Settings (DB_POOL_* env vars). Instead of
+a pre-ping round-trip on every checkout, connections are recycled after DB_POOL_RECYCLE seconds
+and a connection found dead on use invalidates the pool. With DB_PGBOUNCER=true the engine is
+safe behind pgbouncer in transaction pooling mode: no server-side prepared statements and no
+session state that outlives a transaction; LISTEN goes to DATABASE_DIRECT_URL instead.
+"""
+
 import os
-from sqlalchemy import create_engine
+import re
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.orm import sessionmaker
-from models import Base
+from sqlalchemy.pool import NullPool
+from config import settings
+from metrics import InstrumentedQueuePool
+from sql_profiler import SQL_PROFILING, install as install_sql_profiler
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL must be set. Did you forget to provision a database?")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# LISTEN holds session state, so it needs a real server connection rather than a pgbouncer one
+DATABASE_DIRECT_URL = settings.database_direct_url or DATABASE_URL
+
+def make_engine(url: str = DATABASE_URL, name: str = "primary", **overrides) -> Engine:
+    """An engine for `url`; `name` labels its pool's metrics."""
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        # Reuse the most recently returned connection so surplus ones go idle and get recycled
+        "pool_use_lifo": True,
+    }
+    if settings.db_pgbouncer and make_url(url).get_driver_name() == "psycopg":
+        # psycopg 3 prepares repeated statements server-side; a pgbouncer backend may not have them
+        options["connect_args"] = {"prepare_threshold": None}
+    options.update(overrides)
+    engine = create_engine(url, **options)
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.set_name(name)
+    return engine
+
+engine = make_engine()
+
+if SQL_PROFILING:
+    install_sql_profiler(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -19,5 +65,102 @@ def get_db():
     finally:
         db.close()
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+MIGRATIONS_DIR = Path(__file__).parent / "migrations" / "versions"
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+def migration_head() -> str:
+    """
+    The newest revision in migrations/versions. Read from the files directly: importing
+    alembic's script machinery would cost more than the rest of the API's startup.
+    """
+    revisions, parents = set(), set()
+    for path in MIGRATIONS_DIR.glob("*.py"):
+        source = path.read_text()
+        revision = re.search(r'^revision = "([^"]+)"', source, re.M)
+        down_revision = re.search(r'^down_revision = "([^"]+)"', source, re.M)
+        if revision:
+            revisions.add(revision.group(1))
+        if down_revision:
+            parents.add(down_revision.group(1))
+    heads = revisions - parents
+    if len(heads) != 1:
+        raise SchemaOutOfDate(f"Expected one migration head, found {sorted(heads)}")
+    return heads.pop()
+
+def current_revision(target: Engine = engine) -> Optional[str]:
+    with target.connect() as conn:
+        if not conn.execute(text("SELECT to_regclass('alembic_version') IS NOT NULL")).scalar():
+            return None
+        return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+def check_schema(target: Engine = engine) -> str:
+    """Fail fast unless the database is at the latest migration; replaces create_all() at startup."""
+    head, current = migration_head(), current_revision(target)
+    if current != head:
+        raise SchemaOutOfDate(
+            f"Database schema is at {current or 'no revision'}, expected {head}; "
+            "run `alembic upgrade head` from python_server/"
+        )
+    return current
+
+def upgrade_schema(url: Optional[str] = None):
+    """Apply pending migrations in-process; alembic is only imported here. Defaults to DATABASE_DIRECT_URL."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(Path(__file__).parent / "alembic.ini"))
+    if url:
+        config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    command.upgrade(config, "head")
+
+class LeaderLock:
+    """Session advisory lock `key`, kept on its own DATABASE_DIRECT_URL connection once won.
+
+    Of the processes calling acquire(), the first keeps the lock until it exits or its connection
+    drops; the others get False until then and one of them takes over.
+    """
+
+    def __init__(self, key: int):
+        self.key = key
+        self._engine: Optional[Engine] = None
+        self._connection = None
+
+    def acquire(self) -> bool:
+        if self._connection is not None:
+            try:
+                self._connection.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                # The server session, and the lock with it, is gone
+                self.release()
+        if self._engine is None:
+            self._engine = create_engine(DATABASE_DIRECT_URL, poolclass=NullPool, isolation_level="AUTOCOMMIT")
+        connection = self._engine.connect()
+        try:
+            won = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+        except Exception:
+            connection.close()
+            raise
+        if not won:
+            connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    def release(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+def warm_pool(target: Engine = engine, connections: int = settings.db_pool_warm) -> int:
+    """Open connections up front so the first requests after a deploy don't pay for connecting."""
+    connections = min(connections, target.pool.size())
+    opened = [target.raw_connection() for _ in range(connections)]
+    for connection in opened:
+        connection.close()
+    return len(opened)
@@ -5,22 +5,36 @@ Adds sample leave types and initial data for the HR portal
 """
 
 import os
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from database import Base
+from database import make_engine, upgrade_schema
 from models import LeaveType
-from config import settings
+
+# LeaveType has no description column; the descriptions here document the defaults only
+DEFAULT_LEAVE_TYPES = [
+    # For personal reasons, family functions, or other casual purposes
+    {"name": "Casual Leave", "max_days": 12, "carry_forward": True},
+    # For medical reasons or illness
+    {"name": "Sick Leave", "max_days": 10, "carry_forward": False},
+    # Annual leave earned through continuous service
+    {"name": "Earned Leave", "max_days": 20, "carry_forward": True},
+    # For expecting mothers
+    {"name": "Maternity Leave", "max_days": 180, "carry_forward": False},
+    # For new fathers
+    {"name": "Paternity Leave", "max_days": 15, "carry_forward": False},
+    # Compensation for working on weekends or holidays
+    {"name": "Compensatory Off", "max_days": 12, "carry_forward": False},
+]
 
 def init_database():
     """Initialize database with sample data"""
     
     # Create database engine
-    engine = create_engine(settings.database_url, echo=True)
+    engine = make_engine(name="init_db", echo=True, pool_size=1, max_overflow=0)
     
-    # Create all tables
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    print("✓ Tables created successfully")
+    # Create or upgrade the schema (tables, indexes, attendance partitions)
+    print("Applying migrations...")
+    upgrade_schema()
+    print("✓ Schema up to date")
     
     # Create session
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -35,44 +49,7 @@ def init_database():
         
         # Add default leave types
         print("Adding default leave types...")
-        leave_types = [
-            LeaveType(
-                name="Casual Leave",
-                max_days=12,
-                carry_forward=True,
-                description="For personal reasons, family functions, or other casual purposes"
-            ),
-            LeaveType(
-                name="Sick Leave",
-                max_days=10,
-                carry_forward=False,
-                description="For medical reasons or illness"
-            ),
-            LeaveType(
-                name="Earned Leave",
-                max_days=20,
-                carry_forward=True,
-                description="Annual leave earned through continuous service"
-            ),
-            LeaveType(
-                name="Maternity Leave",
-                max_days=180,
-                carry_forward=False,
-                description="For expecting mothers"
-            ),
-            LeaveType(
-                name="Paternity Leave",
-                max_days=15,
-                carry_forward=False,
-                description="For new fathers"
-            ),
-            LeaveType(
-                name="Compensatory Off",
-                max_days=12,
-                carry_forward=False,
-                description="Compensation for working on weekends or holidays"
-            ),
-        ]
+        leave_types = [LeaveType(**fields) for fields in DEFAULT_LEAVE_TYPES]
         
         db.add_all(leave_types)
         db.commit()
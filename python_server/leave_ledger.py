@@ -0,0 +1,221 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, insert, literal, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models import Leave, LeaveBalance, LeaveLedgerEntry, LeaveType
+
+# Which balance column holds a leave's days while it is in a given status.
+# Rejected and cancelled leaves hold nothing.
+STATUS_BUCKETS = {
+    "pending": "reserved_days",
+    "approved": "used_days",
+}
+
+# Statuses a reviewer can move a pending leave to
+REVIEW_STATUSES = ("approved", "rejected")
+
+BalanceKey = Tuple[str, str, int]
+
+
+class InsufficientLeaveBalanceError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class LeaveState:
+    user_id: str
+    leave_type_id: str
+    from_date: date
+    to_date: date
+    status: str
+    days: Decimal
+
+    @property
+    def key(self) -> BalanceKey:
+        return (self.user_id, self.leave_type_id, self.from_date.year)
+
+    @property
+    def bucket(self) -> Optional[str]:
+        return STATUS_BUCKETS.get(self.status)
+
+    @classmethod
+    def of(cls, leave: Leave) -> "LeaveState":
+        return cls(
+            user_id=leave.user_id,
+            leave_type_id=leave.leave_type_id,
+            from_date=_as_date(leave.from_date),
+            to_date=_as_date(leave.to_date),
+            status=leave.status or "pending",
+            days=Decimal(str(leave.days)),
+        )
+
+
+def _as_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def available_days(balance: LeaveBalance) -> Decimal:
+    return Decimal(balance.total_days) - Decimal(balance.used_days or 0) - Decimal(balance.reserved_days or 0)
+
+
+class LeaveLedger:
+    """
+    Keeps LeaveBalance.reserved_days/used_days in step with leave status changes.
+
+    Every movement locks the affected balance rows with SELECT ... FOR UPDATE, so concurrent
+    applications against the same balance serialize in Postgres and cannot overdraw it.
+    Callers own the transaction and commit once the leave row and the ledger move are both staged.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def ensure_balance(self, key: BalanceKey):
+        """Create the year's balance with the leave type's full allowance if there is none yet."""
+        user_id, leave_type_id, year = key
+        entitlement = select(literal(user_id), LeaveType.id, LeaveType.max_days, literal(year)).where(LeaveType.id == leave_type_id)
+        self.db.execute(
+            pg_insert(LeaveBalance)
+            .from_select(["user_id", "leave_type_id", "total_days", "year"], entitlement)
+            .on_conflict_do_nothing(constraint="UQ_leave_balance_user_type_year")
+        )
+
+    def lock_balance(self, key: BalanceKey) -> LeaveBalance:
+        self.ensure_balance(key)
+        user_id, leave_type_id, year = key
+        balance = self.db.query(LeaveBalance).filter(
+            and_(
+                LeaveBalance.user_id == user_id,
+                LeaveBalance.leave_type_id == leave_type_id,
+                LeaveBalance.year == year
+            )
+        ).with_for_update().populate_existing().first()
+        if not balance:
+            raise InsufficientLeaveBalanceError(f"Unknown leave type {leave_type_id}")
+        return balance
+
+    def move(self, leave_id: str, old: Optional[LeaveState], new: Optional[LeaveState]):
+        deltas = _move_deltas(old, new)
+
+        # Lock in a fixed order so two moves touching the same pair of balances cannot deadlock
+        for key in sorted(deltas):
+            balance = self.lock_balance(key)
+            reserved_delta, used_delta = deltas[key]
+
+            balance.reserved_days = Decimal(balance.reserved_days or 0) + reserved_delta
+            balance.used_days = Decimal(balance.used_days or 0) + used_delta
+            balance.updated_at = datetime.utcnow()
+
+            if reserved_delta + used_delta > 0 and available_days(balance) < 0:
+                raise InsufficientLeaveBalanceError(
+                    f"Insufficient leave balance: {available_days(balance) + reserved_delta + used_delta} "
+                    f"day(s) available, {reserved_delta + used_delta} requested"
+                )
+
+            self.db.add(LeaveLedgerEntry(
+                balance_id=balance.id,
+                leave_id=leave_id,
+                from_status=old.status if old else None,
+                to_status=new.status if new else None,
+                reserved_delta=reserved_delta,
+                used_delta=used_delta,
+            ))
+
+    def move_many(self, moves: List[Tuple[str, Optional[LeaveState], Optional[LeaveState]]]):
+        """
+        Set-based variant of move() for batches such as bulk approvals: all affected balances
+        are locked and updated with two statements however many leaves are in the batch.
+        """
+        per_leave = [(leave_id, old, new, _move_deltas(old, new)) for leave_id, old, new in moves]
+        totals: Dict[BalanceKey, List[Decimal]] = {}
+        for _, _, _, deltas in per_leave:
+            for key, (reserved_delta, used_delta) in deltas.items():
+                total = totals.setdefault(key, [Decimal(0), Decimal(0)])
+                total[0] += reserved_delta
+                total[1] += used_delta
+        if not totals:
+            return
+
+        keys = sorted(totals)
+        for key in keys:
+            self.ensure_balance(key)
+        params = {
+            "user_ids": [key[0] for key in keys],
+            "leave_type_ids": [key[1] for key in keys],
+            "years": [key[2] for key in keys],
+            "reserved": [totals[key][0] for key in keys],
+            "used": [totals[key][1] for key in keys],
+            "now": datetime.utcnow(),
+        }
+        batch = (
+            "unnest(CAST(:user_ids AS varchar[]), CAST(:leave_type_ids AS varchar[]), CAST(:years AS integer[]), "
+            "CAST(:reserved AS numeric[]), CAST(:used AS numeric[])) "
+            "AS d(user_id, leave_type_id, year, reserved_delta, used_delta)"
+        )
+
+        # Same lock order as move(): byte-wise on (user_id, leave_type_id, year)
+        self.db.execute(text(
+            f"SELECT b.id FROM leave_balances b JOIN {batch} "
+            "ON b.user_id = d.user_id AND b.leave_type_id = d.leave_type_id AND b.year = d.year "
+            'ORDER BY b.user_id COLLATE "C", b.leave_type_id COLLATE "C", b.year FOR UPDATE OF b'
+        ), params)
+        rows = self.db.execute(text(
+            "UPDATE leave_balances AS b "
+            "SET reserved_days = COALESCE(b.reserved_days, 0) + d.reserved_delta, "
+            "used_days = COALESCE(b.used_days, 0) + d.used_delta, updated_at = :now "
+            f"FROM {batch} "
+            "WHERE b.user_id = d.user_id AND b.leave_type_id = d.leave_type_id AND b.year = d.year "
+            "RETURNING b.id, b.user_id, b.leave_type_id, b.year, "
+            "b.total_days - b.used_days - b.reserved_days AS available"
+        ), params).all()
+
+        balance_ids = {}
+        for row in rows:
+            key = (row.user_id, row.leave_type_id, row.year)
+            balance_ids[key] = row.id
+            if sum(totals[key]) > 0 and row.available < 0:
+                raise InsufficientLeaveBalanceError(f"Insufficient leave balance for leave type {row.leave_type_id} in {row.year}")
+        missing = [key for key in keys if key not in balance_ids]
+        if missing:
+            raise InsufficientLeaveBalanceError(f"Unknown leave type {missing[0][1]}")
+
+        self.db.execute(insert(LeaveLedgerEntry), [
+            {
+                "balance_id": balance_ids[key],
+                "leave_id": leave_id,
+                "from_status": old.status if old else None,
+                "to_status": new.status if new else None,
+                "reserved_delta": reserved_delta,
+                "used_delta": used_delta,
+            }
+            for leave_id, old, new, deltas in per_leave
+            for key, (reserved_delta, used_delta) in deltas.items()
+        ])
+
+
+def _move_deltas(old: Optional[LeaveState], new: Optional[LeaveState]) -> Dict[BalanceKey, Tuple[Decimal, Decimal]]:
+    """(reserved_days, used_days) change per balance when a leave goes from `old` to `new`."""
+    old_bucket = old.bucket if old else None
+    new_bucket = new.bucket if new else None
+    if old_bucket is None and new_bucket is None:
+        return {}
+    if old_bucket == new_bucket and old.key == new.key and old.days == new.days:
+        return {}
+
+    deltas: Dict[BalanceKey, Dict[str, Decimal]] = {}
+    if old_bucket:
+        bucket_deltas = deltas.setdefault(old.key, {})
+        bucket_deltas[old_bucket] = bucket_deltas.get(old_bucket, Decimal(0)) - old.days
+    if new_bucket:
+        bucket_deltas = deltas.setdefault(new.key, {})
+        bucket_deltas[new_bucket] = bucket_deltas.get(new_bucket, Decimal(0)) + new.days
+
+    return {
+        key: (bucket_deltas.get("reserved_days", Decimal(0)), bucket_deltas.get("used_days", Decimal(0)))
+        for key, bucket_deltas in deltas.items()
+    }
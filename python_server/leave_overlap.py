@@ -0,0 +1,116 @@
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Only these statuses hold a date range; matches the EX_leave_no_overlap constraint predicate
+ACTIVE_LEAVE_STATUSES = ("pending", "approved")
+OVERLAP_CONSTRAINT = "EX_leave_no_overlap"
+
+MAX_CACHED_USERS = 10000
+
+Interval = Tuple[date, date, str]
+IntervalLoader = Callable[[str], Iterable[Interval]]
+
+
+class LeaveOverlapError(ValueError):
+    def __init__(self, message: str, conflicting_leave_id: Optional[str] = None):
+        super().__init__(message)
+        self.conflicting_leave_id = conflicting_leave_id
+
+
+class LeaveIntervalIndex:
+    """
+    One user's active leaves as disjoint inclusive date ranges sorted by start date.
+
+    Because the ranges never overlap they are also sorted by end date, so the only range that
+    can intersect [start, end] is the last one starting on or before `end`: one bisect.
+    """
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        self._intervals: List[Interval] = sorted(intervals)
+        self._starts: List[date] = [interval[0] for interval in self._intervals]
+        self._by_id: Dict[str, Interval] = {interval[2]: interval for interval in self._intervals}
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def find_overlap(self, start: date, end: date, ignore_leave_id: Optional[str] = None) -> Optional[Interval]:
+        i = bisect_right(self._starts, end) - 1
+        while i >= 0 and self._intervals[i][1] >= start:
+            if self._intervals[i][2] != ignore_leave_id:
+                return self._intervals[i]
+            # Skipping the leave being edited: the range before it may still reach `start`
+            i -= 1
+        return None
+
+    def add(self, start: date, end: date, leave_id: str):
+        interval = (start, end, leave_id)
+        i = bisect_left(self._intervals, interval)
+        self._intervals.insert(i, interval)
+        self._starts.insert(i, start)
+        self._by_id[leave_id] = interval
+
+    def remove(self, leave_id: str):
+        interval = self._by_id.pop(leave_id, None)
+        if interval is not None:
+            i = bisect_left(self._intervals, interval)
+            del self._intervals[i]
+            del self._starts[i]
+
+
+class LeaveOverlapRegistry:
+    """
+    Per-process cache of LeaveIntervalIndex objects, loaded on a user's first application.
+
+    Other workers can change leaves behind this cache, so it is only a fast path: a hit is
+    re-checked against the database before rejecting, and misses are caught by the exclusion
+    constraint when the row is inserted.
+    """
+
+    def __init__(self, max_users: int = MAX_CACHED_USERS):
+        self._indexes: "OrderedDict[str, LeaveIntervalIndex]" = OrderedDict()
+        self._max_users = max_users
+        self._lock = Lock()
+
+    def get(self, user_id: str, load_intervals: IntervalLoader) -> LeaveIntervalIndex:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+
+        index = LeaveIntervalIndex(load_intervals(user_id))
+        with self._lock:
+            self._indexes[user_id] = index
+            while len(self._indexes) > self._max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def update(self, user_id: str, leave_id: str, interval: Optional[Tuple[date, date]]):
+        """Record a committed change; `interval` is None when the leave no longer holds dates."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return
+            index.remove(leave_id)
+            if interval is not None:
+                index.add(interval[0], interval[1], leave_id)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+
+leave_overlaps = LeaveOverlapRegistry()
+
+
+def overlap_message(conflict: Interval) -> str:
+    return f"Leave overlaps an existing leave from {conflict[0]} to {conflict[1]}"
+
+
+def raise_if_overlap_violation(error: Exception):
+    """Translate an EX_leave_no_overlap IntegrityError into a LeaveOverlapError."""
+    if OVERLAP_CONSTRAINT in str(getattr(error, "orig", error)):
+        raise LeaveOverlapError("Leave overlaps an existing pending or approved leave") from error
@@ -0,0 +1,263 @@
+"""
+LLM Gateway
+Every OpenAI call goes through here, so a burst of AI requests can't turn into a 429 storm:
+
+- at most LLM_MAX_CONCURRENCY calls per worker are in flight; the rest queue
+- a token bucket keeps estimated usage under LLM_TOKENS_PER_MINUTE, reconciled with the real
+  usage each response reports
+- 429s, timeouts, connection errors and 5xx are retried with jittered exponential backoff,
+  waiting at least as long as the server's Retry-After
+- after LLM_BREAKER_FAILURES calls in a row fail, the circuit opens and calls fail fast for
+  LLM_BREAKER_RESET_SECONDS; then a single probe call decides whether it closes again
+
+Anything that can't be served within the queue timeout, or while the circuit is open, raises
+LLMUnavailable with a retry_after hint instead of waiting on a struggling upstream.
+"""
+
+import asyncio
+import random
+import time
+from typing import Optional
+
+from config import settings
+from metrics import LLM_CIRCUIT_STATE, LLM_IN_FLIGHT, LLM_QUEUE_WAIT, LLM_REJECTED, LLM_RETRIES, observe_openai
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8
+CHARS_PER_TOKEN = 4
+
+
+class LLMUnavailable(Exception):
+    def __init__(self, message: str, reason: str, retry_after: float):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Tokens refill continuously at tokens_per_minute / 60 per second. A call takes its tokens
+    up front, possibly into debt, and waits until the debt is repaid, so callers are served in
+    arrival order without a lock (everything runs on the worker's event loop).
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, tokens: float) -> float:
+        self._refill()
+        return max(0.0, (min(tokens, self.capacity) - self.tokens) / self.rate)
+
+    async def acquire(self, tokens: float, timeout: float):
+        if self.rate <= 0:
+            return  # LLM_TOKENS_PER_MINUTE=0 turns the budget off
+        tokens = min(tokens, self.capacity)
+        wait = self.wait_time(tokens)
+        if wait > timeout:
+            raise LLMUnavailable("The AI service is at its usage limit", "rate_limited", wait)
+        self.tokens -= tokens
+        if wait:
+            await asyncio.sleep(wait)
+
+    def adjust(self, tokens: float):
+        """Settle the difference between the estimate taken up front and the tokens really used."""
+        if self.rate <= 0:
+            return
+        self._refill()
+        self.tokens -= tokens
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        LLM_CIRCUIT_STATE.set(self.state)
+
+    def _set_state(self, state: int):
+        self.state = state
+        LLM_CIRCUIT_STATE.set(state)
+
+    def raise_if_open(self):
+        remaining = self.opened_at + self.reset_seconds - time.monotonic()
+        if self.state == self.OPEN and remaining > 0:
+            raise LLMUnavailable("The AI service is temporarily unavailable", "circuit_open", remaining)
+
+    def before_call(self) -> bool:
+        """Raises while open; returns True when this call is the half-open probe."""
+        self.raise_if_open()
+        if self.state == self.OPEN:
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self.probing:
+                raise LLMUnavailable("The AI service is temporarily unavailable", "circuit_open", 1)
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.probing = False
+        if self.state != self.CLOSED:
+            print("✓ OpenAI circuit closed")
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                print(f"✗ OpenAI circuit opened after {self.failures} failed calls")
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def release_probe(self):
+        """A probe that ended without an upstream verdict (a 400, a timeout in our queue, a
+        cancelled request) lets the next call probe instead."""
+        self.probing = False
+
+
+def estimate_tokens(messages, max_tokens: int) -> int:
+    prompt = sum(len(message.get("content") or "") for message in messages)
+    return prompt // CHARS_PER_TOKEN + max_tokens
+
+
+def retry_after_seconds(error) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # an HTTP date; fall back to our own backoff
+    return None
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        max_concurrency: int = settings.llm_max_concurrency,
+        tokens_per_minute: int = settings.llm_tokens_per_minute,
+        queue_timeout: float = settings.llm_queue_timeout_seconds,
+        request_timeout: float = settings.llm_request_timeout_seconds,
+        max_retries: int = settings.llm_max_retries,
+        breaker_failures: int = settings.llm_breaker_failures,
+        breaker_reset_seconds: float = settings.llm_breaker_reset_seconds,
+    ):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(tokens_per_minute)
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset_seconds)
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self._client = None
+
+    def client(self):
+        # The SDK takes a few hundred ms to import, so it is loaded on the first AI request.
+        # Retries are ours, so the SDK's own are turned off.
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=settings.openai_api_key, max_retries=0, timeout=self.request_timeout)
+        return self._client
+
+    async def chat(self, operation: str, **request):
+        """chat.completions.create() under the gateway's limits; returns the SDK response."""
+        try:
+            probe = self.breaker.before_call()
+        except LLMUnavailable as e:
+            LLM_REJECTED.labels(operation, e.reason).inc()
+            raise
+        try:
+            return await self._limited_call(operation, request)
+        finally:
+            if probe:
+                self.breaker.release_probe()
+
+    async def _limited_call(self, operation: str, request: dict):
+        queued = time.monotonic()
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            LLM_REJECTED.labels(operation, "queue_timeout").inc()
+            raise LLMUnavailable("The AI service is busy", "queue_timeout", self.queue_timeout)
+        LLM_IN_FLIGHT.inc()
+        try:
+            try:
+                # The circuit may have opened while this call was queued
+                self.breaker.raise_if_open()
+            except LLMUnavailable as e:
+                LLM_REJECTED.labels(operation, e.reason).inc()
+                raise
+            estimate = estimate_tokens(request.get("messages", []), request.get("max_tokens", 0))
+            try:
+                await self.bucket.acquire(estimate, self.queue_timeout - (time.monotonic() - queued))
+            except LLMUnavailable as e:
+                LLM_REJECTED.labels(operation, e.reason).inc()
+                raise
+            LLM_QUEUE_WAIT.labels(operation).observe(time.monotonic() - queued)
+
+            response = await self._call_with_retries(operation, request)
+            usage = getattr(response, "usage", None)
+            if usage is not None and usage.total_tokens:
+                self.bucket.adjust(usage.total_tokens - estimate)
+            return response
+        finally:
+            LLM_IN_FLIGHT.dec()
+            self.semaphore.release()
+
+    async def _call_with_retries(self, operation: str, request: dict):
+        import openai
+
+        deadline = time.monotonic() + self.request_timeout
+        attempt = 0
+        while True:
+            try:
+                with observe_openai(operation) as record_usage:
+                    response = await self.client().chat.completions.create(**request)
+                    record_usage(response)
+                self.breaker.record_success()
+                return response
+            except openai.RateLimitError as error:
+                if error.code == "insufficient_quota":
+                    # Retrying can't help and every other caller will hit the same wall
+                    self.breaker.record_failure()
+                    raise LLMUnavailable("The AI service quota is exhausted", "quota", self.breaker.reset_seconds) from error
+                failure, reason, retry_after = error, "rate_limited", retry_after_seconds(error)
+            except (openai.APITimeoutError, openai.APIConnectionError) as error:
+                failure, reason, retry_after = error, "connection", None
+            except openai.InternalServerError as error:
+                failure, reason, retry_after = error, "server_error", retry_after_seconds(error)
+            # Anything else (bad request, auth) propagates: the upstream is fine, the call is not
+
+            delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+            if retry_after is not None:
+                delay = retry_after * random.uniform(1, 1.2)
+            if attempt >= self.max_retries or time.monotonic() + delay > deadline:
+                self.breaker.record_failure()
+                raise LLMUnavailable(
+                    "The AI service is not responding", reason, retry_after or BACKOFF_MAX_SECONDS
+                ) from failure
+            LLM_RETRIES.labels(operation, reason).inc()
+            attempt += 1
+            await asyncio.sleep(delay)
+            self.breaker.raise_if_open()
+
+
+llm_gateway = LLMGateway()
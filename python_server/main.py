@@ -1,4 +1,6 @@
 import os
+import asyncio
+import importlib
 import subprocess
 from pathlib import Path
 from fastapi import FastAPI, Request
@@ -6,21 +8,35 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.responses import RedirectResponse, JSONResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
-from authlib.integrations.starlette_client import OAuth
-import uvicorn
 from datetime import datetime
-import httpx
+from sqlalchemy import text
 
 from routes import router
-from database import init_db
 from config import settings
-from auth import configure_oauth, oauth
+from auth import get_oauth
 from storage import DatabaseStorage
-from database import SessionLocal
+from database import DATABASE_DIRECT_URL, LeaderLock, SessionLocal, check_schema, engine, upgrade_schema, warm_pool
+from attendance_partitions import ensure_attendance_partitions
+from payroll_analytics import refresh_recent_component_totals
+from sync import prune_tombstones
+from notifications import notification_hub
+from metrics import METRICS_CONTENT_TYPE, MetricsMiddleware, render_metrics, start_access_log, stop_access_log
+from profiler import loop_lag_monitor
+from prompt_builder import encoding as tokenizer_encoding
+from read_replicas import ReadYourWritesMiddleware, mark_write, replica_set
+from sql_profiler import SQL_PROFILING, SqlProfilerMiddleware
 from models import UpsertUserSchema
 
 app = FastAPI(title="HR Employee Self-Service Portal")
+# Set by startup_event once the worker can serve, and by runner.py when a worker starts draining
+app.state.ready = False
+app.state.draining = False
 
+# Served by the API itself, so neither proxied to Vite nor answered with the SPA
+SERVER_PATHS = {"/metrics", "/healthz", "/readyz"}
+
+# Added before SessionMiddleware so it runs inside it and its session stamp reaches the cookie
+app.add_middleware(ReadYourWritesMiddleware)
 app.add_middleware(SessionMiddleware, secret_key=settings.session_secret or "your-secret-key-here")
 
 app.add_middleware(
@@ -29,31 +45,128 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Sync-Token", "X-SQL-Count", "X-SQL-Time-Ms", "X-SQL-Repeated"],
 )
 
-configure_oauth()
-
 # Check if we're in production mode (based on NODE_ENV only)
 DIST_DIR = Path(__file__).parent.parent / "dist" / "public"
 IS_PRODUCTION = os.getenv("NODE_ENV") == "production"
 
+MAINTENANCE_INTERVAL_SECONDS = 12 * 60 * 60
+# Every worker (and every replica of the app) runs the loop; only the holder of this lock does the work
+maintenance_lock = LeaderLock(key=0x48520001)
+
+async def periodic_maintenance():
+    while True:
+        await asyncio.sleep(MAINTENANCE_INTERVAL_SECONDS)
+        try:
+            if not await asyncio.to_thread(maintenance_lock.acquire):
+                continue
+        except Exception as e:
+            print(f"✗ Maintenance lock unavailable: {e}")
+            continue
+        try:
+            created = await asyncio.to_thread(ensure_attendance_partitions, engine)
+            for name in created:
+                print(f"✓ Created attendance partition {name}")
+        except Exception as e:
+            print(f"✗ Attendance partition maintenance failed: {e}")
+        try:
+            db = SessionLocal()
+            try:
+                pruned = await asyncio.to_thread(prune_tombstones, db)
+            finally:
+                db.close()
+            if pruned:
+                print(f"✓ Pruned {pruned} sync tombstones")
+        except Exception as e:
+            print(f"✗ Sync tombstone pruning failed: {e}")
+        try:
+            db = SessionLocal()
+            try:
+                refreshed = await asyncio.to_thread(refresh_recent_component_totals, db)
+            finally:
+                db.close()
+            print(f"✓ Refreshed {refreshed} payroll component totals")
+        except Exception as e:
+            print(f"✗ Payroll component totals refresh failed: {e}")
+
+# Imported lazily by the code paths that use them; --warmup loads them before traffic instead
+LAZY_SDK_MODULES = [
+    "openai",
+    "authlib.integrations.starlette_client",
+    "google.cloud.storage",
+    "reportlab.pdfgen.canvas",
+    "httpx",
+]
+
+async def warm_up():
+    opened = await asyncio.to_thread(warm_pool)
+    print(f"✓ Database pool warmed ({opened} connections)")
+    for replica in replica_set.replicas:
+        try:
+            opened = await asyncio.to_thread(warm_pool, replica.engine)
+            print(f"✓ {replica.name} pool warmed ({opened} connections)")
+        except Exception as e:
+            print(f"✗ {replica.name} pool warm-up failed: {e}")
+    if settings.startup_warmup:
+        for module in LAZY_SDK_MODULES:
+            await asyncio.to_thread(importlib.import_module, module)
+        await asyncio.to_thread(tokenizer_encoding)
+        if replica_set.replicas:
+            await asyncio.to_thread(replica_set.check)
+
+async def monitor_replicas():
+    while True:
+        try:
+            await asyncio.to_thread(replica_set.check)
+        except Exception as e:
+            print(f"✗ Replica health check failed: {e}")
+        await asyncio.sleep(settings.replica_check_seconds)
+
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    start_access_log()
+    # Schema changes are applied by `alembic upgrade head` at deploy time, not by every worker
+    if settings.migrate_on_startup:
+        await asyncio.to_thread(upgrade_schema)
+    print(f"✓ Database schema at revision {await asyncio.to_thread(check_schema)}")
+    if settings.startup_warmup:
+        await warm_up()
+    else:
+        # Serve straight away; the first requests open whatever connections they need themselves
+        asyncio.create_task(warm_up())
+    asyncio.create_task(periodic_maintenance())
+    if replica_set.replicas:
+        asyncio.create_task(monitor_replicas())
+    loop_lag_monitor.start()
+    try:
+        await notification_hub.start(DATABASE_DIRECT_URL)
+    except Exception as e:
+        # The API works without push; clients fall back to refetching
+        print(f"✗ Notification listener failed to start: {e}")
+    app.state.ready = True
     if IS_PRODUCTION:
         print(f"✓ Running in PRODUCTION mode, serving static files from {DIST_DIR}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await notification_hub.stop()
+    await asyncio.to_thread(maintenance_lock.release)
+    loop_lag_monitor.stop()
+    stop_access_log()
+
 @app.get("/api/auth/login")
 async def login(request: Request):
     # Use the configured domain to build the correct redirect URI
     domain = os.getenv("REPLIT_DOMAINS", "").split(",")[0]
     redirect_uri = f"https://{domain}/api/auth/callback"
-    return await oauth.replit.authorize_redirect(request, redirect_uri)
+    return await get_oauth().replit.authorize_redirect(request, redirect_uri)
 
 @app.get("/api/auth/callback")
 async def auth_callback(request: Request):
     try:
-        token = await oauth.replit.authorize_access_token(request)
+        token = await get_oauth().replit.authorize_access_token(request)
         claims = token.get('userinfo') or {}
         
         user_data = {
@@ -64,6 +177,7 @@ async def auth_callback(request: Request):
         }
         
         request.session['user'] = user_data
+        mark_write(request.session)
         
         db = SessionLocal()
         try:
@@ -90,6 +204,35 @@ async def logout(request: Request):
 
 app.include_router(router)
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if settings.metrics_token and request.headers.get("authorization") != f"Bearer {settings.metrics_token}":
+        return JSONResponse({"detail": "Unauthorized"}, status_code=401)
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+def ping_database():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: this worker's event loop is answering."""
+    return {"status": "ok", "pid": os.getpid()}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: started, not draining, and the primary database answers."""
+    if not app.state.ready or app.state.draining:
+        status = "draining" if app.state.draining else "starting"
+        return JSONResponse({"status": status, "pid": os.getpid()}, status_code=503)
+    try:
+        await asyncio.to_thread(ping_database)
+    except Exception as e:
+        # The probe is unauthenticated; the cause stays in the worker's log
+        print(f"✗ Readiness check failed: {e}")
+        return JSONResponse({"status": "database unavailable", "pid": os.getpid()}, status_code=503)
+    return {"status": "ready", "pid": os.getpid()}
+
 # Serve static files in production, proxy to Vite in development
 if IS_PRODUCTION:
     # Mount static files
@@ -98,7 +241,7 @@ if IS_PRODUCTION:
     @app.get("/{full_path:path}")
     async def serve_spa(full_path: str):
         # Skip API routes
-        if full_path.startswith("api/") or full_path.startswith("docs") or full_path.startswith("openapi.json"):
+        if full_path.startswith("api/") or full_path.startswith("docs") or full_path.startswith("openapi.json") or f"/{full_path}" in SERVER_PATHS:
             return JSONResponse({"detail": "Not Found"}, status_code=404)
         
         # Try to serve the requested file
@@ -110,6 +253,8 @@ if IS_PRODUCTION:
         return FileResponse(DIST_DIR / "index.html")
 else:
     # Development: Proxy to Vite dev server for frontend
+    import httpx
+    
     @app.middleware("http")
     async def proxy_to_vite(request: Request, call_next):
         # Skip websocket requests (for Vite HMR)
@@ -117,7 +262,7 @@ else:
             return await call_next(request)
         
         # Only proxy non-API HTTP requests
-        if not request.url.path.startswith("/api") and not request.url.path.startswith("/docs") and not request.url.path.startswith("/openapi.json"):
+        if not request.url.path.startswith("/api") and not request.url.path.startswith("/docs") and not request.url.path.startswith("/openapi.json") and request.url.path not in SERVER_PATHS:
             try:
                 async with httpx.AsyncClient() as client:
                     vite_url = f"http://localhost:5173{request.url.path}"
@@ -142,21 +287,24 @@ else:
         
         return await call_next(request)
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = datetime.now()
-    response = await call_next(request)
-    duration = (datetime.now() - start_time).total_seconds() * 1000
-    
-    if request.url.path.startswith("/api"):
-        log_line = f"{request.method} {request.url.path} {response.status_code} in {duration:.0f}ms"
-        if len(log_line) > 80:
-            log_line = log_line[:79] + "…"
-        print(log_line)
-    
-    return response
+if SQL_PROFILING:
+    app.add_middleware(SqlProfilerMiddleware, headers=not IS_PRODUCTION)
 
+# Outermost, so latency includes every other middleware; writes the JSON access log too
+app.add_middleware(MetricsMiddleware)
+
+# Development server with auto-reload; production runs `python runner.py` (see README)
 if __name__ == "__main__":
+    import argparse
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description="HR portal API server")
+    parser.add_argument("--warmup", action="store_true", help="warm pools and import SDKs before serving")
+    args = parser.parse_args()
+    if args.warmup:
+        # uvicorn re-imports main:app, which reads settings from the environment again
+        os.environ["STARTUP_WARMUP"] = "true"
+    
     port = int(os.getenv("PORT", 5000))
     uvicorn.run(
         "main:app",
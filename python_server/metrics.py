@@ -0,0 +1,261 @@
+"""
+Metrics
+Prometheus metrics for HTTP routes, the DB connection pool, OpenAI calls and object storage,
+plus a JSON access log written from a background thread.
+
+Request latency is labelled by route template (`/api/leaves/{leave_id}`), never the raw path,
+so label cardinality stays bounded. With PROMETHEUS_MULTIPROC_DIR set, /metrics aggregates
+every worker process.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import exc as sqlalchemy_exc
+from sqlalchemy.pool import QueuePool
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"])
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served", multiprocess_mode="livesum")
+
+# Every engine's pool is labelled with the engine's name: primary, replicaN, migrations, init_db
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection", ["pool"], buckets=POOL_WAIT_BUCKETS
+)
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "DB connections currently checked out", ["pool"], multiprocess_mode="livesum")
+DB_POOL_OPEN = Gauge("db_pool_open", "DB connections currently open, idle or checked out", ["pool"], multiprocess_mode="livesum")
+DB_POOL_CAPACITY = Gauge("db_pool_capacity", "Pool size plus max overflow", ["pool"], multiprocess_mode="livesum")
+DB_POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts_total", "Checkouts that gave up waiting for a connection", ["pool"])
+REPLICA_LAG = Gauge("db_replica_lag_seconds", "Replay lag of each read replica", ["replica"], multiprocess_mode="max")
+REPLICA_HEALTHY = Gauge("db_replica_healthy", "1 while a read replica is in rotation", ["replica"], multiprocess_mode="min")
+
+OPENAI_LATENCY = Histogram(
+    "openai_request_duration_seconds", "OpenAI API call latency", ["operation", "outcome"], buckets=LATENCY_BUCKETS
+)
+OPENAI_TOKENS = Counter("openai_tokens_total", "OpenAI tokens used", ["operation", "kind"])
+LLM_IN_FLIGHT = Gauge("llm_requests_in_flight", "OpenAI calls holding a concurrency slot", multiprocess_mode="livesum")
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for a concurrency slot and token budget", ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_RETRIES = Counter("llm_retries_total", "OpenAI attempts retried", ["operation", "reason"])
+LLM_REJECTED = Counter("llm_rejected_total", "LLM calls failed fast without reaching OpenAI", ["operation", "reason"])
+LLM_CIRCUIT_STATE = Gauge(
+    "llm_circuit_state", "OpenAI circuit breaker: 0 closed, 1 half-open, 2 open", multiprocess_mode="max"
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer scheduled to fire", buckets=POOL_WAIT_BUCKETS
+)
+
+OBJECT_STORAGE_LATENCY = Histogram(
+    "object_storage_duration_seconds", "Object storage call latency", ["operation", "outcome"], buckets=LATENCY_BUCKETS
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records checkout waits and timeouts and keeps saturation gauges current:
+    checked_out / capacity near 1 with rising waits means the pool, not Postgres, is the limit.
+    create_engine() can't pass the pool a name, so make_engine() sets it with set_name().
+    """
+
+    name = "unnamed"
+
+    def set_name(self, name: str):
+        self.name = name
+        DB_POOL_CAPACITY.labels(name).set(self.size() + max(self._max_overflow, 0))
+        self._update_gauges()
+
+    def recreate(self):
+        # dispose() and invalidation swap in a new pool; it reports under the same name
+        pool = super().recreate()
+        pool.set_name(self.name)
+        return pool
+
+    def _update_gauges(self):
+        DB_POOL_CHECKED_OUT.labels(self.name).set(self.checkedout())
+        DB_POOL_OPEN.labels(self.name).set(self.size() + self.overflow())
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sqlalchemy_exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(self.name).inc()
+            raise
+        finally:
+            DB_POOL_WAIT.labels(self.name).observe(time.perf_counter() - started)
+            self._update_gauges()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+
+@contextmanager
+def observe_openai(operation: str):
+    """Times an OpenAI call; the yielded callback records token usage from the response."""
+    started = time.perf_counter()
+    outcome = "error"
+
+    def record_usage(response):
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            OPENAI_TOKENS.labels(operation, "prompt").inc(usage.prompt_tokens or 0)
+            OPENAI_TOKENS.labels(operation, "completion").inc(usage.completion_tokens or 0)
+
+    try:
+        yield record_usage
+        outcome = "ok"
+    finally:
+        OPENAI_LATENCY.labels(operation, outcome).observe(time.perf_counter() - started)
+
+
+def timed_object_storage(operation: str):
+    """Decorator recording the latency of an object storage method, sync or async."""
+
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started, outcome = time.perf_counter(), "error"
+                try:
+                    result = await fn(*args, **kwargs)
+                    outcome = "ok"
+                    return result
+                finally:
+                    OBJECT_STORAGE_LATENCY.labels(operation, outcome).observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started, outcome = time.perf_counter(), "error"
+            try:
+                result = fn(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                OBJECT_STORAGE_LATENCY.labels(operation, outcome).observe(time.perf_counter() - started)
+        return wrapper
+
+    return decorate
+
+
+# Access log: the request path only enqueues a record; a listener thread formats and writes it
+access_logger = logging.getLogger("hr.access")
+access_logger.propagate = False
+_access_log_listener: Optional[QueueListener] = None
+
+
+class JsonLogFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat()}
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, separators=(",", ":"))
+
+
+class DroppingQueueHandler(QueueHandler):
+    # Under a log backlog drop lines rather than block the event loop
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def prepare(self, record):
+        # Formatting happens in the listener thread
+        return record
+
+
+def start_access_log(stream=None):
+    global _access_log_listener
+    if _access_log_listener is not None:
+        return
+    log_queue: queue.Queue = queue.Queue(maxsize=10000)
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonLogFormatter())
+    access_logger.addHandler(DroppingQueueHandler(log_queue))
+    access_logger.setLevel(logging.INFO)
+    _access_log_listener = QueueListener(log_queue, handler)
+    _access_log_listener.start()
+
+
+def stop_access_log():
+    global _access_log_listener
+    if _access_log_listener is not None:
+        _access_log_listener.stop()
+        _access_log_listener = None
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight requests per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            duration = time.perf_counter() - started
+            route, method = route_template(scope), scope["method"]
+            HTTP_LATENCY.labels(method, route).observe(duration)
+            HTTP_REQUESTS.labels(method, route, str(status["code"])).inc()
+            if scope["path"].startswith("/api"):
+                access_logger.info("", extra={"fields": {
+                    "method": method,
+                    "path": scope["path"],
+                    "route": route,
+                    "status": status["code"],
+                    "durationMs": round(duration * 1000, 2),
+                    "client": scope["client"][0] if scope.get("client") else None,
+                }})
+
+
+def render_metrics() -> bytes:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
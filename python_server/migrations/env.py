@@ -0,0 +1,42 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from database import make_engine
+from models import Base
+
+config = context.config
+if config.config_file_name is not None:
+    # Keep the app's own loggers (access log) alive when migrating in-process
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    from database import DATABASE_URL
+
+    context.configure(url=config.get_main_option("sqlalchemy.url") or DATABASE_URL, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # A direct connection: migrations take locks and run DDL that pgbouncer's transaction mode may not pass through
+    from database import DATABASE_DIRECT_URL
+
+    url = config.get_main_option("sqlalchemy.url") or DATABASE_DIRECT_URL
+    engine = make_engine(url, name="migrations", pool_size=1, max_overflow=0)
+    try:
+        with engine.connect() as connection:
+            context.configure(connection=connection, target_metadata=target_metadata)
+            with context.begin_transaction():
+                context.run_migrations()
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,146 @@
+"""Baseline schema
+
+The schema as the old startup-time create_all() left it. A database created that way already
+has all of this: mark it with `alembic stamp 0001`, then `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "sessions",
+        sa.Column("sid", sa.String(), primary_key=True),
+        sa.Column("sess", sa.JSON(), nullable=False),
+        sa.Column("expire", sa.DateTime(), nullable=False),
+    )
+    op.create_index("IDX_session_expire", "sessions", ["expire"])
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("email", sa.String(), unique=True),
+        sa.Column("first_name", sa.String()),
+        sa.Column("last_name", sa.String()),
+        sa.Column("profile_image_url", sa.String()),
+        sa.Column("employee_id", sa.String(), unique=True),
+        sa.Column("department", sa.String()),
+        sa.Column("designation", sa.String()),
+        sa.Column("joining_date", sa.Date()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "leave_types",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("max_days", sa.Integer(), nullable=False),
+        sa.Column("carry_forward", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "leave_balances",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("leave_type_id", sa.String(), sa.ForeignKey("leave_types.id"), nullable=False),
+        sa.Column("total_days", sa.Integer(), nullable=False),
+        sa.Column("used_days", sa.Integer()),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "leaves",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("leave_type_id", sa.String(), sa.ForeignKey("leave_types.id"), nullable=False),
+        sa.Column("from_date", sa.Date(), nullable=False),
+        sa.Column("to_date", sa.Date(), nullable=False),
+        sa.Column("days", sa.DECIMAL(precision=3, scale=1), nullable=False),
+        sa.Column("reason", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("contact_number", sa.String()),
+        sa.Column("attachment_path", sa.String()),
+        sa.Column("applied_at", sa.DateTime()),
+        sa.Column("reviewed_at", sa.DateTime()),
+        sa.Column("reviewed_by", sa.String(), sa.ForeignKey("users.id")),
+        sa.Column("review_comments", sa.Text()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "attendance_records",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("check_in", sa.DateTime()),
+        sa.Column("check_out", sa.DateTime()),
+        sa.Column("working_hours", sa.DECIMAL(precision=4, scale=2)),
+        sa.Column("regularized_at", sa.DateTime()),
+        sa.Column("regularization_reason", sa.Text()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "salary_slips",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("basic_salary", sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column("allowances", sa.JSON()),
+        sa.Column("deductions", sa.JSON()),
+        sa.Column("gross_salary", sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column("net_salary", sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column("payment_date", sa.Date()),
+        sa.Column("file_path", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "hr_documents",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("file_size", sa.Integer()),
+        sa.Column("mime_type", sa.String()),
+        sa.Column("uploaded_by", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("vector_count", sa.Integer()),
+        sa.Column("processed_at", sa.DateTime()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "ai_conversations",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("question", sa.Text(), nullable=False),
+        sa.Column("answer", sa.Text(), nullable=False),
+        sa.Column("documents_used", sa.ARRAY(sa.Text())),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+
+def downgrade():
+    for table in (
+        "ai_conversations", "hr_documents", "salary_slips", "attendance_records",
+        "leaves", "leave_balances", "leave_types", "users", "sessions",
+    ):
+        op.drop_table(table)
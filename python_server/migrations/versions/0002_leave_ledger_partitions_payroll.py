@@ -0,0 +1,250 @@
+"""Leave ledger, monthly attendance partitions, JSONB slip components
+
+Adds the manager hierarchy and holiday calendars, the leave ledger (reserved and
+carried-forward days, the per-day table and the no-overlap exclusion constraint), delta-sync
+tombstones and indexes, payroll component totals, and moves attendance_records into monthly
+range partitions.
+
+Balances are rebuilt from the leaves table: used days from approved leaves and reserved days
+from pending ones, with any missing year's balance created at the leave type's allowance.
+
+The unique constraint on leave_balances fails if a user already has two balances for one leave
+type and year, and the exclusion constraint fails on overlapping pending/approved leaves; merge
+those rows first.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# One partition per month from the oldest attendance row to three months ahead (the default
+# ATTENDANCE_PARTITIONS_AHEAD); the server's partition maintenance takes over from there
+CREATE_ATTENDANCE_PARTITIONS = """
+DO $$
+DECLARE
+    first_day date;
+    last_day date;
+BEGIN
+    SELECT date_trunc('month', least(min(date), current_date))::date,
+           date_trunc('month', greatest(max(date), current_date + interval '3 months'))::date
+      INTO first_day, last_day
+      FROM attendance_records_legacy;
+    WHILE first_day <= last_day LOOP
+        EXECUTE 'CREATE TABLE attendance_records_y' || to_char(first_day, 'YYYY') || 'm' || to_char(first_day, 'MM')
+            || ' PARTITION OF attendance_records FOR VALUES FROM (' || quote_literal(first_day)
+            || ') TO (' || quote_literal((first_day + interval '1 month')::date) || ')';
+        first_day := (first_day + interval '1 month')::date;
+    END LOOP;
+END $$
+"""
+
+
+def upgrade():
+    op.add_column("users", sa.Column("location", sa.String()))
+    op.add_column("users", sa.Column("manager_id", sa.String(), sa.ForeignKey("users.id")))
+    op.add_column("users", sa.Column("is_admin", sa.Boolean(), nullable=False, server_default="false"))
+    op.create_index("IDX_users_manager", "users", ["manager_id"])
+
+    op.alter_column(
+        "leave_balances", "used_days",
+        type_=sa.DECIMAL(precision=4, scale=1), existing_type=sa.Integer(),
+        postgresql_using="used_days::numeric(4,1)",
+    )
+    op.add_column("leave_balances", sa.Column("reserved_days", sa.DECIMAL(precision=4, scale=1), nullable=False, server_default="0"))
+    op.add_column("leave_balances", sa.Column("carried_forward_days", sa.Integer(), nullable=False, server_default="0"))
+    # Every year someone has pending or approved leave in gets a balance, at the full allowance
+    op.execute(
+        "INSERT INTO leave_balances (user_id, leave_type_id, total_days, used_days, year, created_at, updated_at) "
+        "SELECT DISTINCT l.user_id, l.leave_type_id, lt.max_days, 0, extract(year FROM l.from_date)::integer, now(), now() "
+        "FROM leaves l JOIN leave_types lt ON lt.id = l.leave_type_id "
+        "WHERE l.status IN ('pending', 'approved') AND NOT EXISTS ("
+        "SELECT 1 FROM leave_balances b WHERE b.user_id = l.user_id AND b.leave_type_id = l.leave_type_id "
+        "AND b.year = extract(year FROM l.from_date)::integer)"
+    )
+    # Approved leaves are used, leaves still awaiting review are held back from the balance
+    op.execute(
+        "UPDATE leave_balances b SET used_days = COALESCE(l.used, 0), reserved_days = COALESCE(l.reserved, 0) "
+        "FROM leave_balances b2 LEFT JOIN ("
+        "SELECT user_id, leave_type_id, extract(year FROM from_date)::integer AS year, "
+        "sum(days) FILTER (WHERE status = 'approved') AS used, sum(days) FILTER (WHERE status = 'pending') AS reserved "
+        "FROM leaves GROUP BY 1, 2, 3"
+        ") l ON b2.user_id = l.user_id AND b2.leave_type_id = l.leave_type_id AND b2.year = l.year "
+        "WHERE b.id = b2.id"
+    )
+    op.create_unique_constraint("UQ_leave_balance_user_type_year", "leave_balances", ["user_id", "leave_type_id", "year"])
+    op.create_index("IDX_leave_balances_user_updated", "leave_balances", ["user_id", "updated_at"])
+
+    op.create_table(
+        "leave_ledger_entries",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("balance_id", sa.String(), sa.ForeignKey("leave_balances.id"), nullable=False),
+        sa.Column("leave_id", sa.String(), nullable=False),
+        sa.Column("from_status", sa.String()),
+        sa.Column("to_status", sa.String()),
+        sa.Column("reserved_delta", sa.DECIMAL(precision=4, scale=1), nullable=False),
+        sa.Column("used_delta", sa.DECIMAL(precision=4, scale=1), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("IDX_leave_ledger_balance", "leave_ledger_entries", ["balance_id"])
+    op.create_index("IDX_leave_ledger_leave", "leave_ledger_entries", ["leave_id"])
+
+    # The exclusion constraint compares user_id with `=` inside a GiST index
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute(
+        'ALTER TABLE leaves ADD CONSTRAINT "EX_leave_no_overlap" EXCLUDE USING gist '
+        "(user_id WITH =, daterange(from_date, to_date, '[]') WITH &&) "
+        "WHERE (status IN ('pending', 'approved'))"
+    )
+    op.create_index(
+        "IDX_leaves_pending_user_applied", "leaves", ["user_id", "applied_at", "id"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    op.create_index("IDX_leaves_user_updated", "leaves", ["user_id", "updated_at"])
+
+    op.create_table(
+        "leave_days",
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("leave_id", sa.String(), sa.ForeignKey("leaves.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("leave_type_id", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+    )
+    op.create_index("IDX_leave_days_leave", "leave_days", ["leave_id"])
+    # Existing pending/approved leaves, one row per calendar day
+    op.execute(
+        "INSERT INTO leave_days (user_id, day, leave_id, leave_type_id, status) "
+        "SELECT l.user_id, d::date, l.id, l.leave_type_id, l.status FROM leaves l "
+        "CROSS JOIN generate_series(l.from_date, l.to_date, interval '1 day') d "
+        "WHERE l.status IN ('pending', 'approved')"
+    )
+
+    op.create_table(
+        "deleted_records",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("table_name", sa.String(), nullable=False),
+        sa.Column("record_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("IDX_deleted_records_user_table_deleted", "deleted_records", ["user_id", "table_name", "deleted_at"])
+
+    op.create_table(
+        "holidays",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("calendar", sa.String(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("is_half_day", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.UniqueConstraint("calendar", "date", name="UQ_holiday_calendar_date"),
+    )
+
+    # The partition key has to be part of the primary key, so the table is rebuilt
+    op.rename_table("attendance_records", "attendance_records_legacy")
+    op.execute('ALTER INDEX "attendance_records_pkey" RENAME TO "attendance_records_legacy_pkey"')
+    op.create_table(
+        "attendance_records",
+        sa.Column("id", sa.String(), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("date", sa.Date(), primary_key=True, nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("check_in", sa.DateTime()),
+        sa.Column("check_out", sa.DateTime()),
+        sa.Column("working_hours", sa.DECIMAL(precision=4, scale=2)),
+        sa.Column("regularized_at", sa.DateTime()),
+        sa.Column("regularization_reason", sa.Text()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        postgresql_partition_by="RANGE (date)",
+    )
+    op.create_index("IDX_attendance_user_date", "attendance_records", ["user_id", "date"])
+    op.create_index("IDX_attendance_user_updated", "attendance_records", ["user_id", "updated_at"])
+    op.execute(CREATE_ATTENDANCE_PARTITIONS)
+    op.execute("INSERT INTO attendance_records SELECT * FROM attendance_records_legacy")
+    op.drop_table("attendance_records_legacy")
+
+    op.alter_column(
+        "salary_slips", "allowances",
+        type_=postgresql.JSONB(), existing_type=sa.JSON(), postgresql_using="allowances::jsonb",
+    )
+    op.alter_column(
+        "salary_slips", "deductions",
+        type_=postgresql.JSONB(), existing_type=sa.JSON(), postgresql_using="deductions::jsonb",
+    )
+    op.create_index("IDX_salary_slips_period", "salary_slips", ["year", "month"])
+    op.create_index("IDX_salary_slips_allowances", "salary_slips", ["allowances"], postgresql_using="gin")
+    op.create_index("IDX_salary_slips_deductions", "salary_slips", ["deductions"], postgresql_using="gin")
+
+    op.create_table(
+        "payroll_component_totals",
+        sa.Column("year", sa.Integer(), primary_key=True),
+        sa.Column("month", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(), primary_key=True),
+        sa.Column("component", sa.String(), primary_key=True),
+        sa.Column("total", sa.DECIMAL(precision=16, scale=2), nullable=False),
+        sa.Column("slip_count", sa.Integer(), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime()),
+    )
+
+
+def downgrade():
+    op.drop_table("payroll_component_totals")
+
+    op.drop_index("IDX_salary_slips_deductions", table_name="salary_slips")
+    op.drop_index("IDX_salary_slips_allowances", table_name="salary_slips")
+    op.drop_index("IDX_salary_slips_period", table_name="salary_slips")
+    op.alter_column(
+        "salary_slips", "deductions",
+        type_=sa.JSON(), existing_type=postgresql.JSONB(), postgresql_using="deductions::json",
+    )
+    op.alter_column(
+        "salary_slips", "allowances",
+        type_=sa.JSON(), existing_type=postgresql.JSONB(), postgresql_using="allowances::json",
+    )
+
+    # Back to a single plain table; dropping the parent drops every partition with it
+    op.execute("CREATE TABLE attendance_records_plain (LIKE attendance_records INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO attendance_records_plain SELECT * FROM attendance_records")
+    op.drop_table("attendance_records")
+    op.rename_table("attendance_records_plain", "attendance_records")
+    op.create_primary_key("attendance_records_pkey", "attendance_records", ["id"])
+    op.create_foreign_key("attendance_records_user_id_fkey", "attendance_records", "users", ["user_id"], ["id"])
+
+    op.drop_table("holidays")
+    op.drop_index("IDX_deleted_records_user_table_deleted", table_name="deleted_records")
+    op.drop_table("deleted_records")
+    op.drop_index("IDX_leave_days_leave", table_name="leave_days")
+    op.drop_table("leave_days")
+
+    op.drop_index("IDX_leaves_user_updated", table_name="leaves")
+    op.drop_index("IDX_leaves_pending_user_applied", table_name="leaves")
+    op.drop_constraint("EX_leave_no_overlap", "leaves")
+    # btree_gist stays installed: other objects in the database may use it
+
+    op.drop_index("IDX_leave_ledger_leave", table_name="leave_ledger_entries")
+    op.drop_index("IDX_leave_ledger_balance", table_name="leave_ledger_entries")
+    op.drop_table("leave_ledger_entries")
+
+    op.drop_index("IDX_leave_balances_user_updated", table_name="leave_balances")
+    op.drop_constraint("UQ_leave_balance_user_type_year", "leave_balances", type_="unique")
+    op.drop_column("leave_balances", "carried_forward_days")
+    op.drop_column("leave_balances", "reserved_days")
+    # Half days round to whole ones
+    op.alter_column(
+        "leave_balances", "used_days",
+        type_=sa.Integer(), existing_type=sa.DECIMAL(precision=4, scale=1),
+        postgresql_using="round(used_days)::integer",
+    )
+
+    op.drop_index("IDX_users_manager", table_name="users")
+    op.drop_column("users", "is_admin")
+    op.drop_column("users", "manager_id")
+    op.drop_column("users", "location")
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, String, Integer, Text, Boolean, Date, DateTime, DECIMAL, ForeignKey, Index, ARRAY, JSON
+from sqlalchemy import Column, String, Integer, Text, Boolean, Date, DateTime, DECIMAL, ForeignKey, Index, UniqueConstraint, ARRAY, JSON, DDL, event, literal_column, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint, JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Literal, Optional, List
 from decimal import Decimal
 
 Base = declarative_base()
@@ -29,10 +30,17 @@ class User(Base):
     profile_image_url = Column("profile_image_url", String)
     employee_id = Column("employee_id", String, unique=True)
     department = Column(String)
+    location = Column(String)
     designation = Column(String)
     joining_date = Column("joining_date", Date)
+    manager_id = Column("manager_id", String, ForeignKey("users.id"))
+    is_admin = Column("is_admin", Boolean, nullable=False, default=False, server_default="false")
     created_at = Column("created_at", DateTime, default=datetime.utcnow)
     updated_at = Column("updated_at", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('IDX_users_manager', 'manager_id'),
+    )
 
 class LeaveType(Base):
     __tablename__ = "leave_types"
@@ -50,10 +58,34 @@ class LeaveBalance(Base):
     user_id = Column("user_id", String, ForeignKey("users.id"), nullable=False)
     leave_type_id = Column("leave_type_id", String, ForeignKey("leave_types.id"), nullable=False)
     total_days = Column("total_days", Integer, nullable=False)
-    used_days = Column("used_days", Integer, default=0)
+    used_days = Column("used_days", DECIMAL(precision=4, scale=1), default=0)
+    reserved_days = Column("reserved_days", DECIMAL(precision=4, scale=1), nullable=False, default=0, server_default="0")
+    carried_forward_days = Column("carried_forward_days", Integer, nullable=False, default=0, server_default="0")
     year = Column(Integer, nullable=False)
     created_at = Column("created_at", DateTime, default=datetime.utcnow)
     updated_at = Column("updated_at", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('user_id', 'leave_type_id', 'year', name='UQ_leave_balance_user_type_year'),
+        Index('IDX_leave_balances_user_updated', 'user_id', 'updated_at'),
+    )
+
+class LeaveLedgerEntry(Base):
+    __tablename__ = "leave_ledger_entries"
+    
+    id = Column(String, primary_key=True, server_default=func.gen_random_uuid())
+    balance_id = Column("balance_id", String, ForeignKey("leave_balances.id"), nullable=False)
+    leave_id = Column("leave_id", String, nullable=False)
+    from_status = Column("from_status", String)
+    to_status = Column("to_status", String)
+    reserved_delta = Column("reserved_delta", DECIMAL(precision=4, scale=1), nullable=False, default=0)
+    used_delta = Column("used_delta", DECIMAL(precision=4, scale=1), nullable=False, default=0)
+    created_at = Column("created_at", DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('IDX_leave_ledger_balance', 'balance_id'),
+        Index('IDX_leave_ledger_leave', 'leave_id'),
+    )
 
 class Leave(Base):
     __tablename__ = "leaves"
@@ -74,13 +106,74 @@ class Leave(Base):
     review_comments = Column("review_comments", Text)
     created_at = Column("created_at", DateTime, default=datetime.utcnow)
     updated_at = Column("updated_at", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Pending and approved leaves of one user may not overlap; backed by a GiST index on the date range
+    __table_args__ = (
+        ExcludeConstraint(
+            (user_id, '='),
+            (func.daterange(from_date, to_date, literal_column("'[]'")), '&&'),
+            name='EX_leave_no_overlap',
+            using='gist',
+            where=text("status IN ('pending', 'approved')"),
+        ),
+        # Approver inbox: pending leaves per employee in keyset order
+        Index('IDX_leaves_pending_user_applied', 'user_id', 'applied_at', 'id', postgresql_where=text("status = 'pending'")),
+        # Delta sync: rows of one user changed since a sync token
+        Index('IDX_leaves_user_updated', 'user_id', 'updated_at'),
+    )
+
+# The exclusion constraint compares user_id with `=` inside a GiST index
+event.listen(Leave.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+
+# One row per calendar day of every pending/approved leave, for team availability lookups
+class LeaveDay(Base):
+    __tablename__ = "leave_days"
+    
+    user_id = Column("user_id", String, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    leave_id = Column("leave_id", String, ForeignKey("leaves.id", ondelete="CASCADE"), primary_key=True)
+    leave_type_id = Column("leave_type_id", String, nullable=False)
+    status = Column(String, nullable=False)
+    
+    __table_args__ = (
+        Index('IDX_leave_days_leave', 'leave_id'),
+    )
+
+# Tombstones for deleted rows, so delta sync can tell clients to drop them
+class DeletedRecord(Base):
+    __tablename__ = "deleted_records"
+    
+    id = Column(String, primary_key=True, server_default=func.gen_random_uuid())
+    table_name = Column("table_name", String, nullable=False)
+    record_id = Column("record_id", String, nullable=False)
+    user_id = Column("user_id", String, nullable=False)
+    deleted_at = Column("deleted_at", DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('IDX_deleted_records_user_table_deleted', 'user_id', 'table_name', 'deleted_at'),
+    )
+
+class Holiday(Base):
+    __tablename__ = "holidays"
+    
+    id = Column(String, primary_key=True, server_default=func.gen_random_uuid())
+    calendar = Column(String, nullable=False, default="default")
+    date = Column(Date, nullable=False)
+    name = Column(String, nullable=False)
+    is_half_day = Column("is_half_day", Boolean, default=False)
+    created_at = Column("created_at", DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('calendar', 'date', name='UQ_holiday_calendar_date'),
+    )
 
 class AttendanceRecord(Base):
     __tablename__ = "attendance_records"
     
+    # Range-partitioned by month on `date`, so the partition key has to be part of the primary key.
     id = Column(String, primary_key=True, server_default=func.gen_random_uuid())
     user_id = Column("user_id", String, ForeignKey("users.id"), nullable=False)
-    date = Column(Date, nullable=False)
+    date = Column(Date, primary_key=True, nullable=False)
     status = Column(String, nullable=False)
     check_in = Column("check_in", DateTime)
     check_out = Column("check_out", DateTime)
@@ -89,6 +182,12 @@ class AttendanceRecord(Base):
     regularization_reason = Column("regularization_reason", Text)
     created_at = Column("created_at", DateTime, default=datetime.utcnow)
     updated_at = Column("updated_at", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('IDX_attendance_user_date', 'user_id', 'date'),
+        Index('IDX_attendance_user_updated', 'user_id', 'updated_at'),
+        {'postgresql_partition_by': 'RANGE (date)'},
+    )
 
 class SalarySlip(Base):
     __tablename__ = "salary_slips"
@@ -98,13 +197,31 @@ class SalarySlip(Base):
     month = Column(Integer, nullable=False)
     year = Column(Integer, nullable=False)
     basic_salary = Column("basic_salary", DECIMAL(precision=10, scale=2), nullable=False)
-    allowances = Column(JSON)
-    deductions = Column(JSON)
+    allowances = Column(JSONB)
+    deductions = Column(JSONB)
     gross_salary = Column("gross_salary", DECIMAL(precision=10, scale=2), nullable=False)
     net_salary = Column("net_salary", DECIMAL(precision=10, scale=2), nullable=False)
     payment_date = Column("payment_date", Date)
     file_path = Column("file_path", String)
     created_at = Column("created_at", DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('IDX_salary_slips_period', 'year', 'month'),
+        # Component lookups such as "everyone with a Loan deduction" (`deductions ? 'Loan'`)
+        Index('IDX_salary_slips_allowances', 'allowances', postgresql_using='gin'),
+        Index('IDX_salary_slips_deductions', 'deductions', postgresql_using='gin'),
+    )
+
+class PayrollComponentTotal(Base):
+    __tablename__ = "payroll_component_totals"
+    
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    kind = Column(String, primary_key=True)
+    component = Column(String, primary_key=True)
+    total = Column(DECIMAL(precision=16, scale=2), nullable=False)
+    slip_count = Column("slip_count", Integer, nullable=False)
+    refreshed_at = Column("refreshed_at", DateTime, default=datetime.utcnow)
 
 class HrDocument(Base):
     __tablename__ = "hr_documents"
@@ -140,6 +257,7 @@ class UpsertUserSchema(BaseModel):
     profile_image_url: Optional[str] = Field(None, alias="profileImageUrl")
     employee_id: Optional[str] = Field(None, alias="employeeId")
     department: Optional[str] = None
+    location: Optional[str] = None
     designation: Optional[str] = None
     joining_date: Optional[str] = Field(None, alias="joiningDate")
     
@@ -155,11 +273,40 @@ class InsertLeaveSchema(BaseModel):
     contact_number: Optional[str] = Field(None, alias="contactNumber")
     attachment_path: Optional[str] = Field(None, alias="attachmentPath")
     days: Optional[str] = None
-    status: Optional[str] = "pending"
+    # No status: a new leave is always pending until its reviewer decides
+    half_day_start: bool = Field(False, alias="halfDayStart")
+    half_day_end: bool = Field(False, alias="halfDayEnd")
+    
+    class Config:
+        populate_by_name = True
+
+class UpdateLeaveSchema(BaseModel):
+    # The only leave fields a client may change; days is recomputed from the dates
+    leave_type_id: Optional[str] = Field(None, alias="leaveTypeId")
+    from_date: Optional[date] = Field(None, alias="fromDate")
+    to_date: Optional[date] = Field(None, alias="toDate")
+    reason: Optional[str] = None
+    contact_number: Optional[str] = Field(None, alias="contactNumber")
+    attachment_path: Optional[str] = Field(None, alias="attachmentPath")
+    status: Optional[Literal["pending", "approved", "rejected", "cancelled"]] = None
+    review_comments: Optional[str] = Field(None, alias="reviewComments")
+    half_day_start: bool = Field(False, alias="halfDayStart")
+    half_day_end: bool = Field(False, alias="halfDayEnd")
     
     class Config:
         populate_by_name = True
 
+class LeaveDecisionSchema(BaseModel):
+    leave_id: str = Field(..., alias="leaveId")
+    status: Literal["approved", "rejected"]
+    
+    class Config:
+        populate_by_name = True
+
+class ReviewLeavesSchema(BaseModel):
+    decisions: List[LeaveDecisionSchema] = Field(..., max_length=1000)
+    comments: Optional[str] = None
+
 class InsertAttendanceSchema(BaseModel):
     user_id: str = Field(..., alias="userId")
     date: str
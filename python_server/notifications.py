@@ -0,0 +1,184 @@
+"""
+Notifications
+Pushes leave and attendance changes to connected clients over WebSocket / SSE.
+
+Storage writes publish events with pg_notify inside their own transaction, so an event goes
+out only if the write commits. Every worker process LISTENs on the channel with one dedicated
+connection and fans events out to the subscriptions of the users it holds connections for.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import psycopg2
+import psycopg2.extensions
+from sqlalchemy import ARRAY, String, bindparam, text
+from sqlalchemy.orm import Session
+
+CHANNEL = "hr_events"
+SUBSCRIPTION_QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 25
+RECONNECT_MAX_SECONDS = 30
+
+Event = Tuple[str, str, Dict[str, Any]]  # (user id, event type, data)
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def event_payload(user_id: str, event_type: str, data: Dict[str, Any]) -> str:
+    # NOTIFY payloads are capped at 8000 bytes, so events carry ids and statuses, not records
+    return json.dumps({"userId": user_id, "type": event_type, "data": data}, default=_json_default, separators=(",", ":"))
+
+
+def publish(db: Session, user_id: str, event_type: str, data: Dict[str, Any]):
+    """Queue an event on the caller's transaction; it is delivered when the transaction commits."""
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {
+        "channel": CHANNEL, "payload": event_payload(user_id, event_type, data)
+    })
+
+
+def publish_many(db: Session, events: Iterable[Event]):
+    payloads = [event_payload(user_id, event_type, data) for user_id, event_type, data in events]
+    if payloads:
+        db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(:payloads) AS payload").bindparams(
+                bindparam("payloads", type_=ARRAY(String))
+            ),
+            {"channel": CHANNEL, "payloads": payloads},
+        )
+
+
+def publish_to_manager(db: Session, user_id: str, event_type: str, data: Dict[str, Any]):
+    """Notify the user's manager, looked up in the same statement."""
+    db.execute(text(
+        "SELECT pg_notify(:channel, json_build_object('userId', manager_id, 'type', :event_type, 'data', CAST(:data AS json))::text) "
+        "FROM users WHERE id = :user_id AND manager_id IS NOT NULL"
+    ), {
+        "channel": CHANNEL,
+        "event_type": event_type,
+        "data": json.dumps(data, default=_json_default),
+        "user_id": user_id,
+    })
+
+
+class Subscription:
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+
+    def deliver(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A client this far behind refetches everything instead of replaying a backlog
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(json.dumps({"type": "resync"}))
+
+    async def next(self, timeout: float = HEARTBEAT_SECONDS) -> Optional[str]:
+        """The next event, or None after `timeout` seconds of silence (time for a heartbeat)."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class NotificationHub:
+    """Per-process registry of subscriptions, fed by one LISTEN connection."""
+
+    def __init__(self):
+        self.subscriptions: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._dsn: Optional[str] = None
+        self._conn = None
+        self._fd: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id)
+        self.subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self.subscriptions.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[subscription.user_id]
+
+    def dispatch(self, payload: str):
+        try:
+            user_id = json.loads(payload)["userId"]
+        except (ValueError, KeyError, TypeError):
+            return
+        for subscription in self.subscriptions.get(user_id, ()):
+            subscription.deliver(payload)
+
+    async def start(self, dsn: str):
+        self._dsn = dsn
+        self._loop = asyncio.get_running_loop()
+        await self._connect()
+
+    async def stop(self):
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+        self._close()
+
+    async def _connect(self):
+        conn = await asyncio.to_thread(psycopg2.connect, self._dsn)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        self._conn, self._fd = conn, conn.fileno()
+        # Notifications arrive on the socket; the event loop wakes us instead of a polling thread
+        self._loop.add_reader(self._fd, self._on_readable)
+
+    def _on_readable(self):
+        try:
+            self._conn.poll()
+        except psycopg2.Error as e:
+            print(f"✗ Notification listener lost its connection: {e}")
+            self._close()
+            self._reconnect_task = self._loop.create_task(self._reconnect())
+            return
+        while self._conn.notifies:
+            self.dispatch(self._conn.notifies.pop(0).payload)
+
+    async def _reconnect(self):
+        delay = 1
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self._connect()
+                # Anything published while we were away is lost; tell every client to refetch
+                for subscriptions in self.subscriptions.values():
+                    for subscription in subscriptions:
+                        subscription.deliver(json.dumps({"type": "resync"}))
+                print("✓ Notification listener reconnected")
+                return
+            except psycopg2.Error as e:
+                print(f"✗ Notification listener reconnect failed: {e}")
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    def _close(self):
+        if self._conn is not None:
+            self._loop.remove_reader(self._fd)
+            self._conn.close()
+            self._conn, self._fd = None, None
+
+
+notification_hub = NotificationHub()
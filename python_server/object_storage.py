@@ -1,10 +1,15 @@
 import os
 import json
+import shutil
 import tempfile
-from google.cloud import storage
-from google.auth import external_account
-from typing import Optional, List
-import httpx
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, List
+
+if TYPE_CHECKING:
+    from google.cloud import storage
+
+from metrics import timed_object_storage
 
 REPLIT_SIDECAR_ENDPOINT = "http://127.0.0.1:1106"
 
@@ -16,6 +21,10 @@ class ObjectStorageService:
     
     def _get_client(self):
         if self._client is None:
+            # The Google SDKs are imported on first use rather than at API startup
+            from google.auth import external_account
+            from google.cloud import storage
+            
             credentials_config = {
                 "type": "external_account",
                 "audience": "replit",
@@ -73,7 +82,8 @@ class ObjectStorageService:
             )
         return dir_path
     
-    async def search_public_object(self, file_path: str) -> Optional[storage.Blob]:
+    @timed_object_storage("search_public")
+    async def search_public_object(self, file_path: str) -> Optional["storage.Blob"]:
         for search_path in self.get_public_object_search_paths():
             full_path = f"{search_path}/{file_path}"
             
@@ -95,7 +105,8 @@ class ObjectStorageService:
         
         return None
     
-    async def get_object(self, full_path: str) -> Optional[storage.Blob]:
+    @timed_object_storage("get")
+    async def get_object(self, full_path: str) -> Optional["storage.Blob"]:
         parts = full_path.split("/", 1)
         if len(parts) != 2:
             return None
@@ -114,6 +125,50 @@ class ObjectStorageService:
         
         return None
     
+    def _private_blob(self, object_path: str) -> "storage.Blob":
+        full_path = f"{self.get_private_object_dir()}/{object_path}"
+        
+        parts = full_path.split("/", 1)
+        if len(parts) != 2:
+            raise ValueError("Invalid file path")
+        
+        bucket_name = parts[0].lstrip("/")
+        object_name = parts[1]
+        if not bucket_name:
+            bucket_name, _, object_name = object_name.partition("/")
+        
+        return self.client.bucket(bucket_name).blob(object_name)
+    
+    @timed_object_storage("upload")
+    def upload_private_file(self, object_path: str, local_path: str, content_type: str = "application/octet-stream") -> str:
+        blob = self._private_blob(object_path)
+        blob.upload_from_filename(local_path, content_type=content_type)
+        return f"{self.get_private_object_dir()}/{object_path}"
+    
+    @timed_object_storage("download")
+    def download_private_file(self, object_path: str, local_path: str):
+        blob = self._private_blob(object_path)
+        if not blob.exists():
+            raise ValueError(f"Object {object_path} not found")
+        blob.download_to_filename(local_path)
+    
+    @timed_object_storage("upload")
+    def upload_private_bytes(self, object_path: str, data: bytes, content_type: str = "application/octet-stream") -> str:
+        blob = self._private_blob(object_path)
+        blob.upload_from_string(data, content_type=content_type)
+        return f"{self.get_private_object_dir()}/{object_path}"
+    
+    @timed_object_storage("download")
+    def download_private_bytes(self, object_path: str) -> Optional[bytes]:
+        from google.api_core.exceptions import NotFound
+        
+        blob = self._private_blob(object_path)
+        try:
+            return blob.download_as_bytes()
+        except NotFound:
+            return None
+    
+    @timed_object_storage("sign_upload")
     async def get_signed_upload_url(self, file_path: str, content_type: str, owner: str) -> str:
         private_dir = self.get_private_object_dir()
         full_path = f"{private_dir}/{file_path}"
@@ -139,6 +194,8 @@ class ObjectStorageService:
             }
         }
         
+        import httpx
+        
         async with httpx.AsyncClient() as client:
             response = await client.post(
                 f"{REPLIT_SIDECAR_ENDPOINT}/sign",
@@ -154,3 +211,61 @@ class ObjectStorageService:
             
             result = response.json()
             return result.get("signed_url", "")
+
+
+class LocalObjectStorageService:
+    """
+    Private objects on the local filesystem, for development and load tests away from Replit.
+    Implements the private-object methods of ObjectStorageService; there are no public objects
+    or signed URLs.
+    """
+    
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or os.getenv("LOCAL_OBJECT_STORAGE_DIR", ".local_object_storage")).resolve()
+    
+    def get_private_object_dir(self) -> str:
+        return str(self.root / "private")
+    
+    def _private_path(self, object_path: str) -> Path:
+        private_dir = self.root / "private"
+        path = (private_dir / object_path).resolve()
+        if private_dir not in path.parents:
+            raise ValueError("Invalid file path")
+        return path
+    
+    @timed_object_storage("upload")
+    def upload_private_file(self, object_path: str, local_path: str, content_type: str = "application/octet-stream") -> str:
+        path = self._private_path(object_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(local_path, path)
+        return str(path)
+    
+    @timed_object_storage("download")
+    def download_private_file(self, object_path: str, local_path: str):
+        path = self._private_path(object_path)
+        if not path.is_file():
+            raise ValueError(f"Object {object_path} not found")
+        shutil.copyfile(path, local_path)
+    
+    @timed_object_storage("upload")
+    def upload_private_bytes(self, object_path: str, data: bytes, content_type: str = "application/octet-stream") -> str:
+        path = self._private_path(object_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return str(path)
+    
+    @timed_object_storage("download")
+    def download_private_bytes(self, object_path: str) -> Optional[bytes]:
+        path = self._private_path(object_path)
+        return path.read_bytes() if path.is_file() else None
+
+
+@lru_cache(maxsize=None)
+def get_object_storage_service():
+    """
+    OBJECT_STORAGE_DRIVER=local selects the filesystem driver; the default is Replit's GCS.
+    One instance per process, created on first use so its client is shared across requests.
+    """
+    if os.getenv("OBJECT_STORAGE_DRIVER", "gcs") == "local":
+        return LocalObjectStorageService()
+    return ObjectStorageService()
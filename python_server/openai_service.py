@@ -1,26 +1,13 @@
+import asyncio
 import os
-from openai import OpenAI
 from typing import List, Dict, Optional
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", ""))
+from llm_gateway import LLMUnavailable, llm_gateway
+from prompt_builder import MODEL, prompt_builder
 
-class DocumentContext:
-    def __init__(self, name: str, content: str, category: str):
-        self.name = name
-        self.content = content
-        self.category = category
+ASSISTANT_MAX_TOKENS = 1000
 
-async def ask_hr_assistant(question: str, documents: List[DocumentContext]) -> Dict[str, any]:
-    try:
-        if not os.getenv("OPENAI_API_KEY"):
-            raise ValueError("OpenAI API key is not configured. Please add your OPENAI_API_KEY to use the AI Assistant.")
-        
-        context = "\n\n---\n\n".join([
-            f"Document: {doc.name} ({doc.category})\nContent: {doc.content}"
-            for doc in documents
-        ])
-        
-        system_prompt = f"""You are an AI HR Assistant for an employee self-service portal. Your role is to answer HR-related questions based on the provided company documents and policies.
+ASSISTANT_PROMPT_HEADER = """You are an AI HR Assistant for an employee self-service portal. Your role is to answer HR-related questions based on the provided company documents and policies.
 
 Guidelines:
 - Always be helpful, professional, and accurate
@@ -31,15 +18,35 @@ Guidelines:
 - Format your response clearly with bullet points or sections when appropriate
 
 Available Documents:
-{context}"""
+"""
+
+class DocumentContext:
+    def __init__(self, name: str, content: str, category: str):
+        self.name = name
+        self.content = content
+        self.category = category
+
+async def ask_hr_assistant(question: str, documents: List[DocumentContext]) -> Dict[str, any]:
+    try:
+        if not os.getenv("OPENAI_API_KEY"):
+            raise ValueError("OpenAI API key is not configured. Please add your OPENAI_API_KEY to use the AI Assistant.")
         
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        sections = [f"Document: {doc.name} ({doc.category})\nContent: {doc.content}" for doc in documents]
+        # Documents arrive newest first; whatever doesn't fit the context budget is left out.
+        # Tokenizing (and loading the tokenizer on first use) is CPU work, so it stays off the event loop.
+        system_prompt, included = await asyncio.to_thread(
+            prompt_builder.build, ASSISTANT_PROMPT_HEADER, sections, question, ASSISTANT_MAX_TOKENS
+        )
+        documents = [documents[i] for i in included]
+        
+        response = await llm_gateway.chat(
+            "ask",
+            model=MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": question}
             ],
-            max_tokens=1000,
+            max_tokens=ASSISTANT_MAX_TOKENS,
         )
         
         answer = response.choices[0].message.content or "I apologize, but I couldn't generate a response to your question."
@@ -57,6 +64,9 @@ Available Documents:
             "documentsUsed": documents_used
         }
     
+    except LLMUnavailable:
+        # The route answers 503 with Retry-After; retrying immediately would only add load
+        raise
     except Exception as error:
         print(f"Error calling OpenAI API: {error}")
         if "OpenAI API key is not configured" in str(error):
@@ -76,7 +86,8 @@ Instructions:
 
 Return format: {"chunks": ["chunk1", "chunk2", ...]}"""
         
-        response = client.chat.completions.create(
+        response = await llm_gateway.chat(
+            "vectorize",
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": system_prompt},
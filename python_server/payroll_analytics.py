@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Payroll Analytics
+Component-level payroll reporting over the JSONB allowances/deductions columns, computed in
+Postgres. Monthly per-component totals are pre-aggregated into payroll_component_totals.
+"""
+
+import argparse
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from payroll_export import Period, parse_period
+
+COMPONENT_KINDS = {"allowance": "allowances", "deduction": "deductions"}
+GROUPINGS = ("month", "quarter", "year", "department")
+
+# Component values are numbers or numeric strings; anything else is left out of the sums
+NUMERIC_VALUE = r"(e.value #>> '{}') ~ '^-?[0-9]+(\.[0-9]+)?$'"
+
+
+def _live_monthly_totals_sql(slip_filter: str = "") -> str:
+    """Per-month component sums straight from salary_slips, shaped like payroll_component_totals."""
+    return f"""
+        SELECT s.year, s.month, c.kind, e.key AS component,
+               sum((e.value #>> '{{}}')::numeric) AS total, count(*) AS slip_count
+        FROM salary_slips s
+        CROSS JOIN LATERAL (VALUES ('allowance', s.allowances), ('deduction', s.deductions)) AS c(kind, components)
+        CROSS JOIN LATERAL jsonb_each(c.components) AS e
+        WHERE (s.year, s.month) BETWEEN (:start_year, :start_month) AND (:end_year, :end_month)
+          AND {NUMERIC_VALUE} {slip_filter}
+        GROUP BY s.year, s.month, c.kind, e.key
+    """
+
+
+REFRESH_SQL = f"""
+    INSERT INTO payroll_component_totals (year, month, kind, component, total, slip_count, refreshed_at)
+    SELECT year, month, kind, component, total, slip_count, now() FROM ({_live_monthly_totals_sql()}) AS live
+    ON CONFLICT (year, month, kind, component)
+    DO UPDATE SET total = EXCLUDED.total, slip_count = EXCLUDED.slip_count, refreshed_at = EXCLUDED.refreshed_at
+"""
+
+# Months that were never refreshed are summed live, so a payroll run shows up before the next refresh
+MONTHLY_TOTALS_SQL = f"""
+    SELECT year, month, kind, component, total, slip_count
+    FROM payroll_component_totals
+    WHERE (year, month) BETWEEN (:start_year, :start_month) AND (:end_year, :end_month)
+    UNION ALL
+    {_live_monthly_totals_sql(
+        "AND NOT EXISTS (SELECT 1 FROM payroll_component_totals t WHERE t.year = s.year AND t.month = s.month)"
+    )}
+"""
+
+
+def _period_params(start: Period, end: Period) -> Dict:
+    return {"start_year": start[0], "start_month": start[1], "end_year": end[0], "end_month": end[1]}
+
+
+def refresh_component_totals(db: Session, start: Period, end: Period) -> int:
+    """Recompute the pre-aggregated totals for every month in the range in one statement."""
+    params = _period_params(start, end)
+    db.execute(text(
+        "DELETE FROM payroll_component_totals "
+        "WHERE (year, month) BETWEEN (:start_year, :start_month) AND (:end_year, :end_month)"
+    ), params)
+    count = db.execute(text(REFRESH_SQL), params).rowcount
+    db.commit()
+    return count
+
+
+def refresh_recent_component_totals(db: Session, today: Optional[date] = None) -> int:
+    """Refresh the previous and current payroll months, where late slips and corrections land."""
+    today = today or date.today()
+    previous = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+    return refresh_component_totals(db, previous, (today.year, today.month))
+
+
+def component_totals(
+    db: Session,
+    start: Period,
+    end: Period,
+    kind: Optional[str] = None,
+    component: Optional[str] = None,
+    group_by: str = "month",
+) -> List[Dict]:
+    """
+    Sums per component, grouped by month/quarter/year from the pre-aggregated table (months
+    without totals yet are summed live), or by department straight from salary_slips.
+    """
+    params = _period_params(start, end)
+    params.update(kind=kind, component=component)
+
+    if group_by == "department":
+        # Live aggregation; with a single component the GIN index narrows the slips first
+        slip_filter = ""
+        if component:
+            columns = [COMPONENT_KINDS[kind]] if kind else list(COMPONENT_KINDS.values())
+            slip_filter = "AND (" + " OR ".join(f"s.{column} ? :component" for column in columns) + ")"
+        sql = f"""
+            SELECT COALESCE(u.department, 'Unassigned') AS "group", c.kind, e.key AS component,
+                   sum((e.value #>> '{{}}')::numeric) AS total, count(*) AS slip_count
+            FROM salary_slips s
+            LEFT JOIN users u ON u.id = s.user_id
+            CROSS JOIN LATERAL (VALUES ('allowance', s.allowances), ('deduction', s.deductions)) AS c(kind, components)
+            CROSS JOIN LATERAL jsonb_each(c.components) AS e
+            WHERE (s.year, s.month) BETWEEN (:start_year, :start_month) AND (:end_year, :end_month)
+              AND {NUMERIC_VALUE} {slip_filter}
+              AND (CAST(:kind AS varchar) IS NULL OR c.kind = :kind)
+              AND (CAST(:component AS varchar) IS NULL OR e.key = :component)
+            GROUP BY 1, 2, 3
+            ORDER BY 1, 2, 3
+        """
+    else:
+        group_expression = {
+            "month": "format('%s-%s', year, lpad(month::text, 2, '0'))",
+            "quarter": "format('%s-Q%s', year, (month - 1) / 3 + 1)",
+            "year": "year::text",
+        }[group_by]
+        sql = f"""
+            SELECT {group_expression} AS "group", kind, component, sum(total) AS total, sum(slip_count) AS slip_count
+            FROM ({MONTHLY_TOTALS_SQL}) AS totals
+            WHERE (CAST(:kind AS varchar) IS NULL OR kind = :kind)
+              AND (CAST(:component AS varchar) IS NULL OR component = :component)
+            GROUP BY 1, 2, 3
+            ORDER BY 1, 2, 3
+        """
+
+    return [dict(row._mapping) for row in db.execute(text(sql), params)]
+
+
+def slips_with_component(
+    db: Session,
+    kind: str,
+    component: str,
+    start: Optional[Period] = None,
+    end: Optional[Period] = None,
+    limit: int = 1000,
+) -> List[Dict]:
+    """Slips carrying a given component, found through the GIN index with the `?` operator."""
+    column = COMPONENT_KINDS[kind]
+    params = {"component": component, "limit": limit}
+    period_filter = ""
+    if start and end:
+        period_filter = "AND (s.year, s.month) BETWEEN (:start_year, :start_month) AND (:end_year, :end_month)"
+        params.update(_period_params(start, end))
+
+    rows = db.execute(text(f"""
+        SELECT s.id, s.user_id, u.employee_id, u.first_name, u.last_name, u.department,
+               s.year, s.month, s.{column} ->> :component AS amount
+        FROM salary_slips s
+        LEFT JOIN users u ON u.id = s.user_id
+        WHERE s.{column} ? :component {period_filter}
+        ORDER BY s.year DESC, s.month DESC, u.employee_id
+        LIMIT :limit
+    """), params)
+    return [dict(row._mapping) for row in rows]
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Payroll analytics maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    refresh_parser = subparsers.add_parser("refresh", help="rebuild monthly component totals")
+    refresh_parser.add_argument("start", help="first payroll month, YYYY-MM")
+    refresh_parser.add_argument("end", help="last payroll month, YYYY-MM")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        count = refresh_component_totals(db, parse_period(args.start), parse_period(args.end))
+        print(f"✓ Refreshed {count} component totals")
+    finally:
+        db.close()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Payroll Export
+Exports company-wide salary slips for a range of payroll months as CSV or XLSX, with the
+allowances/deductions JSON flattened into one column per component.
+
+Rows come through a server-side cursor in fixed-size batches, so memory stays flat no matter
+how many slips the range covers. CSV is streamed to the client as rows are read; an XLSX
+workbook is written to a temporary file and only sent once it is complete. A workbook
+continues on a new sheet every XLSX_MAX_ROWS rows.
+"""
+
+import argparse
+import csv
+import io
+import os
+import tempfile
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from models import SalarySlip, User
+
+STREAM_BATCH_SIZE = 2000
+CSV_FLUSH_ROWS = 500
+# Excel's hard limit per worksheet, header row included; xlsxwriter drops rows past it silently
+XLSX_MAX_ROWS = 1_048_576
+
+Period = Tuple[int, int]  # (year, month)
+
+
+def parse_period(value: str) -> Period:
+    year, month = value.split("-")
+    return int(year), int(month)
+
+
+def _in_period(start: Period, end: Period):
+    return tuple_(SalarySlip.year, SalarySlip.month).between(tuple_(*start), tuple_(*end))
+
+
+def component_names(db: Session, start: Period, end: Period) -> Tuple[List[str], List[str]]:
+    """Distinct allowance and deduction names in the range, which become the export's columns."""
+    names = {}
+    for kind, column in (("allowances", SalarySlip.allowances), ("deductions", SalarySlip.deductions)):
+        keys = select(func.jsonb_object_keys(column).label("name")).where(_in_period(start, end), column.isnot(None))
+        names[kind] = sorted(db.execute(select(keys.subquery().c.name).distinct()).scalars())
+    return names["allowances"], names["deductions"]
+
+
+def export_header(allowance_names: List[str], deduction_names: List[str]) -> List[str]:
+    return (
+        ["Employee ID", "Name", "Department", "Year", "Month", "Basic Salary"]
+        + [f"Allowance: {name}" for name in allowance_names]
+        + [f"Deduction: {name}" for name in deduction_names]
+        + ["Gross Salary", "Net Salary", "Payment Date"]
+    )
+
+
+def iter_payroll_rows(db: Session, start: Period, end: Period, allowance_names: List[str], deduction_names: List[str]) -> Iterator[list]:
+    query = db.query(
+        User.employee_id,
+        User.first_name,
+        User.last_name,
+        User.department,
+        SalarySlip.year,
+        SalarySlip.month,
+        SalarySlip.basic_salary,
+        SalarySlip.allowances,
+        SalarySlip.deductions,
+        SalarySlip.gross_salary,
+        SalarySlip.net_salary,
+        SalarySlip.payment_date,
+    ).outerjoin(User, SalarySlip.user_id == User.id).filter(
+        _in_period(start, end)
+    ).order_by(SalarySlip.year, SalarySlip.month, User.employee_id).execution_options(
+        stream_results=True, yield_per=STREAM_BATCH_SIZE
+    )
+
+    for row in query:
+        allowances = row.allowances or {}
+        deductions = row.deductions or {}
+        yield (
+            [
+                row.employee_id,
+                " ".join(part for part in [row.first_name, row.last_name] if part),
+                row.department,
+                row.year,
+                row.month,
+                row.basic_salary,
+            ]
+            + [allowances.get(name) for name in allowance_names]
+            + [deductions.get(name) for name in deduction_names]
+            + [row.gross_salary, row.net_salary, row.payment_date]
+        )
+
+
+def stream_payroll_csv(db: Session, start: Period, end: Period) -> Iterator[bytes]:
+    allowance_names, deduction_names = component_names(db, start, end)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(export_header(allowance_names, deduction_names))
+
+    for i, row in enumerate(iter_payroll_rows(db, start, end, allowance_names, deduction_names), start=1):
+        writer.writerow(row)
+        if i % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def write_payroll_xlsx(db: Session, start: Period, end: Period, path: str):
+    import xlsxwriter
+
+    allowance_names, deduction_names = component_names(db, start, end)
+    # constant_memory flushes each row to disk as soon as the next one starts
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "default_date_format": "yyyy-mm-dd"})
+    try:
+        header = export_header(allowance_names, deduction_names)
+        sheet, sheet_row, sheet_count = None, XLSX_MAX_ROWS, 0
+        for row in iter_payroll_rows(db, start, end, allowance_names, deduction_names):
+            if sheet_row == XLSX_MAX_ROWS:
+                sheet_count += 1
+                sheet = workbook.add_worksheet("Payroll" if sheet_count == 1 else f"Payroll ({sheet_count})")
+                sheet.write_row(0, 0, header)
+                sheet_row = 1
+            sheet.write_row(sheet_row, 0, [float(value) if hasattr(value, "as_tuple") else value for value in row])
+            sheet_row += 1
+        if sheet is None:
+            workbook.add_worksheet("Payroll").write_row(0, 0, header)
+    finally:
+        workbook.close()
+
+
+def stream_file(path: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+def buffered_payroll_xlsx(db: Session, start: Period, end: Period) -> Iterator[bytes]:
+    """The finished workbook in chunks; nothing is yielded until every row has been written."""
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        write_payroll_xlsx(db, start, end, path)
+    except Exception:
+        os.unlink(path)
+        raise
+    yield from stream_file(path)
+
+
+def stream_payroll_export(start: Period, end: Period, export_format: str = "csv") -> Iterator[bytes]:
+    """Export generator that owns its session, for use as an HTTP response body."""
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if export_format == "xlsx":
+            yield from buffered_payroll_xlsx(db, start, end)
+        else:
+            yield from stream_payroll_csv(db, start, end)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Export company-wide payroll for a range of months")
+    parser.add_argument("start", help="first payroll month, YYYY-MM")
+    parser.add_argument("end", help="last payroll month, YYYY-MM")
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("-o", "--output", required=True, help="output file")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        start, end = parse_period(args.start), parse_period(args.end)
+        if args.format == "xlsx":
+            write_payroll_xlsx(db, start, end, args.output)
+        else:
+            with open(args.output, "wb") as output:
+                for chunk in stream_payroll_csv(db, start, end):
+                    output.write(chunk)
+        print(f"✓ Payroll {args.start} – {args.end} exported to {args.output}")
+    finally:
+        db.close()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Salary Slip Rendering
+Renders payslip PDFs ahead of payday in a process pool and stores them in object storage,
+keyed by slip id and a hash of the slip's content, so downloads are plain file reads.
+"""
+
+import argparse
+import calendar
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+# Bump when the layout changes so every cached PDF gets a new key and is re-rendered
+PAYSLIP_TEMPLATE_VERSION = "1"
+PAYSLIP_PREFIX = "payslips"
+RENDER_BATCH_SIZE = 200
+
+
+def _amount(value) -> str:
+    return f"{Decimal(str(value or 0)):,.2f}"
+
+
+def slip_payload(slip, user) -> Dict:
+    """Everything that appears on the rendered slip, in a stable JSON-friendly shape."""
+    return {
+        "template": PAYSLIP_TEMPLATE_VERSION,
+        "id": slip.id,
+        "month": slip.month,
+        "year": slip.year,
+        "employeeName": " ".join(part for part in [user.first_name, user.last_name] if part) if user else "",
+        "employeeId": user.employee_id if user else None,
+        "department": user.department if user else None,
+        "designation": user.designation if user else None,
+        "basicSalary": _amount(slip.basic_salary),
+        "allowances": {name: _amount(value) for name, value in sorted((slip.allowances or {}).items())},
+        "deductions": {name: _amount(value) for name, value in sorted((slip.deductions or {}).items())},
+        "grossSalary": _amount(slip.gross_salary),
+        "netSalary": _amount(slip.net_salary),
+        "paymentDate": str(slip.payment_date) if slip.payment_date else None,
+    }
+
+
+def content_hash(payload: Dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def payslip_object_path(payload: Dict) -> str:
+    return f"{PAYSLIP_PREFIX}/{payload['id']}/{content_hash(payload)}.pdf"
+
+
+def render_payslip_pdf(payload: Dict) -> bytes:
+    # reportlab is only needed where PDFs are rendered; importing it lazily keeps API startup fast
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    buffer = io.BytesIO()
+    styles = getSampleStyleSheet()
+    document = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=18 * mm, rightMargin=18 * mm, topMargin=18 * mm)
+
+    period = f"{calendar.month_name[payload['month']]} {payload['year']}"
+    employee_rows = [
+        ["Employee", payload["employeeName"] or "-", "Employee ID", payload["employeeId"] or "-"],
+        ["Department", payload["department"] or "-", "Designation", payload["designation"] or "-"],
+        ["Pay period", period, "Payment date", payload["paymentDate"] or "-"],
+    ]
+
+    earnings = [["Basic salary", payload["basicSalary"]]] + [[name, value] for name, value in payload["allowances"].items()]
+    deductions = [[name, value] for name, value in payload["deductions"].items()]
+    line_count = max(len(earnings), len(deductions))
+    earnings += [["", ""]] * (line_count - len(earnings))
+    deductions += [["", ""]] * (line_count - len(deductions))
+
+    component_rows = [["Earnings", "Amount", "Deductions", "Amount"]]
+    component_rows += [earning + deduction for earning, deduction in zip(earnings, deductions)]
+    component_rows.append(["Gross salary", payload["grossSalary"], "Net salary", payload["netSalary"]])
+
+    grid = TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("ALIGN", (1, 1), (1, -1), "RIGHT"),
+        ("ALIGN", (3, 1), (3, -1), "RIGHT"),
+    ])
+    components_table = Table(component_rows, colWidths=[52 * mm, 33 * mm, 52 * mm, 33 * mm])
+    components_table.setStyle(grid)
+    components_table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+    ]))
+    employee_table = Table(employee_rows, colWidths=[30 * mm, 55 * mm, 30 * mm, 55 * mm])
+    employee_table.setStyle(TableStyle([("FONTSIZE", (0, 0), (-1, -1), 9), ("GRID", (0, 0), (-1, -1), 0.5, colors.grey)]))
+
+    document.build([
+        Paragraph(f"Salary Slip — {period}", styles["Title"]),
+        employee_table,
+        Spacer(1, 8 * mm),
+        components_table,
+    ])
+    return buffer.getvalue()
+
+
+_object_storage = None
+
+
+def _get_object_storage():
+    # One storage client per worker process rather than per slip
+    global _object_storage
+    if _object_storage is None:
+        from object_storage import get_object_storage_service
+        _object_storage = get_object_storage_service()
+    return _object_storage
+
+
+def render_and_store(payload: Dict) -> Tuple[str, str]:
+    """Process-pool entry point: render one slip and upload it. Returns (slip id, stored path)."""
+    object_path = payslip_object_path(payload)
+    location = _get_object_storage().upload_private_bytes(object_path, render_payslip_pdf(payload), "application/pdf")
+    return payload["id"], location
+
+
+def is_cached(slip, payload: Dict) -> bool:
+    return bool(slip.file_path) and slip.file_path.endswith(payslip_object_path(payload))
+
+
+def render_payroll_month(month: int, year: int, workers: Optional[int] = None, force: bool = False) -> int:
+    """Render every slip of a payroll month that is not already cached under its current content hash."""
+    from database import SessionLocal
+    from models import SalarySlip, User
+
+    db = SessionLocal()
+    try:
+        rows = db.query(SalarySlip, User).outerjoin(User, SalarySlip.user_id == User.id).filter(
+            SalarySlip.month == month, SalarySlip.year == year
+        ).all()
+        payloads: List[Dict] = []
+        for slip, user in rows:
+            payload = slip_payload(slip, user)
+            if force or not is_cached(slip, payload):
+                payloads.append(payload)
+        print(f"{len(rows)} slips for {month:02d}/{year}, {len(payloads)} to render")
+
+        rendered = 0
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            for start in range(0, len(payloads), RENDER_BATCH_SIZE):
+                batch = payloads[start:start + RENDER_BATCH_SIZE]
+                results = list(pool.map(render_and_store, batch, chunksize=16))
+                db.bulk_update_mappings(SalarySlip, [{"id": slip_id, "file_path": location} for slip_id, location in results])
+                db.commit()
+                rendered += len(results)
+                print(f"  … {rendered}/{len(payloads)} rendered")
+        return rendered
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render salary slip PDFs for a payroll month")
+    parser.add_argument("month", help="payroll month as YYYY-MM")
+    parser.add_argument("--workers", type=int, help="render processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="re-render slips that are already cached")
+    args = parser.parse_args()
+
+    year, month = (int(part) for part in args.month.split("-"))
+    count = render_payroll_month(month, year, workers=args.workers, force=args.force)
+    print(f"✓ Rendered {count} salary slips")
@@ -0,0 +1,138 @@
+"""
+Profiler
+An on-demand sampling profiler and an event-loop lag watchdog for live workers.
+
+The sampler runs in its own thread and reads every other thread's stack with
+sys._current_frames() at a fixed interval, so the worker being profiled runs unmodified code;
+the cost is one stack walk per thread per sample. Output is the collapsed-stack format
+("thread;outer;inner count" per line) read by flamegraph.pl, speedscope and inferno.
+
+The watchdog notices when the event loop has not ticked for LOOP_LAG_THRESHOLD_MS and logs
+what the loop thread is doing at that moment - typically a sync call made from async code.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+
+from metrics import EVENT_LOOP_LAG
+
+MAX_PROFILE_SECONDS = 60
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "200"))
+LOOP_TICK_SECONDS = 0.05
+
+logger = logging.getLogger("hr.profiler")
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def _thread_names(loop_thread_id: Optional[int]):
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    if loop_thread_id is not None:
+        names[loop_thread_id] = "event-loop"
+    return names
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, loop_thread_id: Optional[int] = None) -> str:
+    """Sample every thread for `seconds`; returns collapsed stacks. Blocks the calling thread."""
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this worker")
+    try:
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        names = _thread_names(loop_thread_id)
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = _thread_names(loop_thread_id)
+                thread_name = names.get(thread_id, str(thread_id))
+                # Thread-pool workers share one bucket so their stacks merge in the flamegraph
+                if thread_name.startswith(("AnyIO worker thread", "asyncio_")):
+                    thread_name = "thread-pool"
+                stacks[f"{thread_name};{_collapse(frame)}"] += 1
+            time.sleep(interval)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    finally:
+        _profile_lock.release()
+
+
+class LoopLagMonitor:
+    """
+    A loop task records a heartbeat every LOOP_TICK_SECONDS and its own scheduling lag; a
+    watchdog thread logs the loop thread's stack once per stall longer than the threshold.
+    """
+
+    def __init__(self, threshold_ms: float = LOOP_LAG_THRESHOLD_MS):
+        self.threshold = threshold_ms / 1000
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    @property
+    def loop_thread_id(self) -> Optional[int]:
+        return self._loop_thread_id
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        if self.threshold > 0:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + LOOP_TICK_SECONDS
+            await asyncio.sleep(LOOP_TICK_SECONDS)
+            now = time.monotonic()
+            EVENT_LOOP_LAG.observe(max(now - expected, 0))
+            self._last_beat = now
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._last_beat
+            stalled = time.monotonic() - beat
+            if stalled < self.threshold + LOOP_TICK_SECONDS or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "(no frame)\n"
+            logger.warning("Event loop blocked for %.0fms so far; loop thread stack:\n%s", stalled * 1000, stack)
+
+
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,78 @@
+"""
+Prompt Builder
+Assembles the assistant's system prompt from document context under a fixed token budget,
+so the prompt's size (and so its cost and latency) stays the same however many HR documents
+exist.
+
+Tokens are counted with the model's own tokenizer (tiktoken, loaded on first use) and each
+distinct context section is counted once per process. Sections are packed greedily in the
+order given - newest documents first - skipping any that no longer fit, within the smaller of
+LLM_CONTEXT_BUDGET_TOKENS and what the context window leaves after the header, the question
+and the reply's max_tokens.
+"""
+
+from functools import lru_cache
+from typing import List, Tuple
+
+from config import settings
+
+MODEL = "gpt-4o"
+SECTION_SEPARATOR = "\n\n---\n\n"
+# Each chat message carries a few tokens of framing on top of its content
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+MAX_CACHED_SECTIONS = 10000
+
+
+@lru_cache(maxsize=None)
+def encoding(model: str = MODEL):
+    # tiktoken loads (and on first run downloads) the BPE ranks, so it stays off the startup path
+    import tiktoken
+    return tiktoken.encoding_for_model(model)
+
+
+def count_tokens(text: str) -> int:
+    return len(encoding().encode(text))
+
+
+@lru_cache(maxsize=MAX_CACHED_SECTIONS)
+def count_section_tokens(text: str) -> int:
+    """count_tokens() memoized, for text that recurs across requests: context sections and headers."""
+    return count_tokens(text)
+
+
+class PromptBuilder:
+    def __init__(
+        self,
+        context_window: int = settings.llm_context_window_tokens,
+        context_budget: int = settings.llm_context_budget_tokens,
+    ):
+        self.context_window = context_window
+        self.context_budget = context_budget
+
+    def context_allowance(self, header: str, question: str, max_tokens: int) -> int:
+        """Tokens left for context once everything else in the request is accounted for."""
+        fixed = (
+            count_section_tokens(header) + count_tokens(question)
+            + 2 * MESSAGE_OVERHEAD_TOKENS + REPLY_PRIMING_TOKENS + max_tokens
+        )
+        return max(0, min(self.context_budget, self.context_window - fixed))
+
+    def pack(self, sections: List[str], allowance: int) -> List[int]:
+        """Indexes of the sections that fit, in order; later sections may fill gaps left by big ones."""
+        separator = count_section_tokens(SECTION_SEPARATOR)
+        used, chosen = 0, []
+        for index, section in enumerate(sections):
+            cost = count_section_tokens(section) + (separator if chosen else 0)
+            if used + cost <= allowance:
+                used += cost
+                chosen.append(index)
+        return chosen
+
+    def build(self, header: str, sections: List[str], question: str, max_tokens: int) -> Tuple[str, List[int]]:
+        """The system prompt - header, then as much context as fits - and the sections it includes."""
+        chosen = self.pack(sections, self.context_allowance(header, question, max_tokens))
+        return header + SECTION_SEPARATOR.join(sections[i] for i in chosen), chosen
+
+
+prompt_builder = PromptBuilder()
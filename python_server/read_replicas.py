@@ -0,0 +1,141 @@
+"""
+Read Replicas
+Routes DatabaseStorage's read-only get_* methods to streaming replicas listed in
+DATABASE_REPLICA_URLS, round-robin over the ones whose replay lag is within
+REPLICA_MAX_LAG_SECONDS. Writes, and reads inside write paths, always use the primary.
+
+Read-your-writes: a successful POST/PUT/PATCH/DELETE stamps the (cookie) session, and that
+client's reads go to the primary for REPLICA_STICKY_SECONDS afterwards, whichever worker
+serves them. With no healthy replica everything reads from the primary, as before.
+"""
+
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.orm import Session, sessionmaker
+
+from config import settings
+from database import make_engine
+from metrics import REPLICA_HEALTHY, REPLICA_LAG
+
+LAST_WRITE_KEY = "lastWriteAt"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Lag is zero while everything received has been replayed; an idle primary otherwise makes
+# the last replay timestamp look old. That only holds while the WAL receiver is streaming: a
+# replica cut off from the primary has replayed everything it received and would look current
+# forever, so it reports NULL instead. Without pg_read_all_stats the receiver's status reads as
+# NULL, and a running receiver is the best that can be checked. A server that is not in
+# recovery has no lag at all.
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE COALESCE(status, 'streaming') = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = make_engine(
+            url, name=name, pool_size=settings.replica_pool_size, max_overflow=settings.db_max_overflow
+        )
+        self.sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.healthy = False
+        self.lag: Optional[float] = None
+
+
+class ReplicaSet:
+    def __init__(self, urls: List[str], max_lag: float):
+        self.replicas = [Replica(f"replica{i}", url) for i, url in enumerate(urls)]
+        self.max_lag = max_lag
+        self._healthy: List[Replica] = []
+        self._cycle = itertools.cycle([])
+        self._lock = threading.Lock()
+
+    def check(self) -> Dict[str, Optional[float]]:
+        """Measure each replica's lag and drop the ones that are unreachable, not streaming or too far behind."""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    lag = conn.execute(text(LAG_SQL)).scalar()
+                replica.lag = None if lag is None else float(lag)
+                healthy = replica.lag is not None and replica.lag <= self.max_lag
+                if replica.lag is None and replica.healthy:
+                    print(f"✗ {replica.name} is not streaming from the primary")
+            except Exception as e:
+                replica.lag, healthy = None, False
+                if replica.healthy:
+                    print(f"✗ {replica.name} unreachable: {e}")
+            if healthy != replica.healthy:
+                print(f"{'✓' if healthy else '✗'} {replica.name} {'back in' if healthy else 'out of'} rotation (lag {replica.lag}s)")
+            replica.healthy = healthy
+            REPLICA_HEALTHY.labels(replica.name).set(1 if healthy else 0)
+            if replica.lag is not None:
+                REPLICA_LAG.labels(replica.name).set(replica.lag)
+
+        with self._lock:
+            self._healthy = [replica for replica in self.replicas if replica.healthy]
+            self._cycle = itertools.cycle(self._healthy)
+        return {replica.name: replica.lag for replica in self.replicas}
+
+    def session(self) -> Optional[Session]:
+        with self._lock:
+            if not self._healthy:
+                return None
+            return next(self._cycle).sessionmaker()
+
+
+replica_set = ReplicaSet(
+    [url.strip() for url in settings.database_replica_urls.split(",") if url.strip()],
+    settings.replica_max_lag_seconds,
+)
+
+
+def mark_write(session: dict):
+    session[LAST_WRITE_KEY] = time.time()
+
+
+def recently_wrote(session: dict) -> bool:
+    return time.time() - session.get(LAST_WRITE_KEY, 0) < settings.replica_sticky_seconds
+
+
+def get_read_db(request: Request):
+    """A replica session for this request's reads, or None to read from the primary."""
+    db = None if recently_wrote(request.session) else replica_set.session()
+    try:
+        yield db
+    finally:
+        if db is not None:
+            db.close()
+
+
+class ReadYourWritesMiddleware:
+    """
+    Stamps the session after a successful write. Must sit inside SessionMiddleware so the
+    stamp is in the session before the cookie is serialized.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS or "session" not in scope:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                mark_write(scope["session"])
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,31 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime, date
 from pydantic import BaseModel
+import asyncio
+import base64
+import logging
 import os
 
-from database import get_db
+from database import SessionLocal, get_db
+from read_replicas import get_read_db, recently_wrote, replica_set
 from storage import DatabaseStorage
-from auth import get_user_id
+from attendance_partitions import AttendanceDateOutOfRange
+from leave_ledger import InsufficientLeaveBalanceError, available_days
+from leave_overlap import LeaveOverlapError
+from work_calendar import month_bounds
+from team_calendar import MAX_RANGE_DAYS, team_calendar
+from sync import InvalidSyncToken, changed_since, delta_response, issue_token
+from auth import get_admin_user_id, get_user_id, get_websocket_user_id
+from notifications import notification_hub
+from profiler import MAX_PROFILE_SECONDS, ProfilerBusy, loop_lag_monitor, sample_stacks
 from openai_service import ask_hr_assistant, process_document_for_vectorization, DocumentContext
-from object_storage import ObjectStorageService
+from llm_gateway import LLMUnavailable
+from object_storage import get_object_storage_service
+from payslips import is_cached, payslip_object_path, render_payslip_pdf, slip_payload
+from payroll_export import parse_period, stream_payroll_export
+from payroll_analytics import component_totals, refresh_component_totals, slips_with_component
+import serializers
+import sql_profiler
+from serializers import (
+    AbsentDateOut, AiConversationOut, AttendanceMonthOut, AttendanceOut, HrDocumentOut, LeaveBalanceOut,
+    LeaveOut, LeaveTypeOut, ORJSONResponse, Projection, SalarySlipOut, json_response, row_dicts
+)
 from models import (
-    InsertLeaveSchema, InsertAttendanceSchema, InsertHrDocumentSchema,
-    InsertAiConversationSchema, UpsertUserSchema
+    InsertLeaveSchema, UpdateLeaveSchema, InsertAttendanceSchema, InsertHrDocumentSchema,
+    InsertAiConversationSchema, UpsertUserSchema, ReviewLeavesSchema, Leave
 )
 
-router = APIRouter(prefix="/api")
+router = APIRouter(prefix="/api", default_response_class=ORJSONResponse)
+logger = logging.getLogger("hr.api")
 
-object_storage = ObjectStorageService()
 
-@router.get("/auth/user")
-async def get_auth_user(request: Request, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
-    storage = DatabaseStorage(db)
-    user = storage.get_user(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
+def user_payload(user) -> dict:
     return {
         "id": user.id,
         "email": user.email,
@@ -38,23 +55,32 @@ async def get_auth_user(request: Request, user_id: str = Depends(get_user_id), d
         "joiningDate": str(user.joining_date) if user.joining_date else None,
     }
 
-@router.get("/dashboard/stats")
-async def get_dashboard_stats(user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
-    storage = DatabaseStorage(db)
+@router.get("/auth/user")
+async def get_auth_user(request: Request, user_id: str = Depends(get_user_id), db: Session = Depends(get_db), read_db: Optional[Session] = Depends(get_read_db)):
+    storage = DatabaseStorage(db, read_db)
+    user = storage.get_user(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    current_year = datetime.now().year
-    current_month = datetime.now().month
+    return user_payload(user)
+
+def dashboard_stats(storage: DatabaseStorage, user_id: str) -> dict:
+    today = date.today()
+    current_year = today.year
+    current_month = today.month
     
     leave_balances = storage.get_leave_balances(user_id, current_year)
     leaves = storage.get_user_leaves(user_id)
     attendance_records = storage.get_attendance_records(user_id, current_month, current_year)
+    calendar = storage.get_working_calendar(storage.get_user(user_id))
     
     total_leaves_used = sum(balance.used_days or 0 for balance in leave_balances)
-    total_leaves_remaining = sum(balance.total_days - (balance.used_days or 0) for balance in leave_balances)
+    total_leaves_remaining = sum(available_days(balance) for balance in leave_balances)
     
     present_days = len([r for r in attendance_records if r.status in ['present', 'wfh']])
-    total_working_days = len(attendance_records)
-    attendance_rate = (present_days / total_working_days * 100) if total_working_days > 0 else 0.0
+    month_start, _ = month_bounds(current_year, current_month)
+    total_working_days = float(calendar.working_days(month_start, today))
+    attendance_rate = min(present_days / total_working_days * 100, 100.0) if total_working_days > 0 else 0.0
     
     pending_leaves = len([leave for leave in leaves if leave.status == 'pending'])
     
@@ -67,43 +93,176 @@ async def get_dashboard_stats(user_id: str = Depends(get_user_id), db: Session =
             {
                 "type": balance.leave_type_id,
                 "used": balance.used_days or 0,
+                "reserved": balance.reserved_days or 0,
                 "total": balance.total_days,
-                "remaining": balance.total_days - (balance.used_days or 0)
+                "remaining": available_days(balance)
             }
             for balance in leave_balances
         ]
     }
 
-@router.get("/leave-types")
-async def get_leave_types(user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
-    storage = DatabaseStorage(db)
-    leave_types = storage.get_leave_types()
-    return [
-        {
-            "id": lt.id,
-            "name": lt.name,
-            "maxDays": lt.max_days,
-            "carryForward": lt.carry_forward
-        }
-        for lt in leave_types
-    ]
+@router.get("/dashboard/stats")
+async def get_dashboard_stats(user_id: str = Depends(get_user_id), db: Session = Depends(get_db), read_db: Optional[Session] = Depends(get_read_db)):
+    return dashboard_stats(DatabaseStorage(db, read_db), user_id)
 
-@router.get("/leave-balances")
-async def get_leave_balances(year: Optional[int] = None, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
-    storage = DatabaseStorage(db)
+def _user_section(storage: DatabaseStorage, user_id: str) -> bytes:
+    user = storage.get_user(user_id)
+    return serializers.dumps(user_payload(user) if user else None)
+
+# Each section renders its own JSON so the composite body is assembled without re-encoding
+BOOTSTRAP_SECTIONS = {
+    "user": _user_section,
+    "dashboard": lambda storage, user_id: serializers.dumps(dashboard_stats(storage, user_id)),
+    "leaveTypes": lambda storage, user_id: serializers.dump_json(serializers.LEAVE_TYPES, storage.get_leave_types()),
+    "leaveBalances": lambda storage, user_id: serializers.dump_json(
+        serializers.LEAVE_BALANCES, storage.get_leave_balances(user_id, date.today().year)
+    ),
+    "leaves": lambda storage, user_id: Projection(LeaveOut).dump_json(
+        storage.get_user_leave_rows(user_id, list(LeaveOut.model_fields))
+    ),
+}
+
+def _render_section(name: str, user_id: str, use_replica: bool) -> bytes:
+    # Runs in a worker thread with its own pooled connection
+    db = SessionLocal()
+    read_db = replica_set.session() if use_replica else None
+    try:
+        return BOOTSTRAP_SECTIONS[name](DatabaseStorage(db, read_db), user_id)
+    finally:
+        if read_db is not None:
+            read_db.close()
+        db.close()
+
+@router.get("/bootstrap")
+async def get_bootstrap(
+    request: Request,
+    include: Optional[str] = Query(None, description=f"Comma-separated sections (default all): {', '.join(BOOTSTRAP_SECTIONS)}"),
+    user_id: str = Depends(get_user_id)
+):
+    sections = [name.strip() for name in include.split(",") if name.strip()] if include else list(BOOTSTRAP_SECTIONS)
+    unknown = [name for name in sections if name not in BOOTSTRAP_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+    
+    use_replica = not recently_wrote(request.session)
+    results = await asyncio.gather(
+        *(asyncio.to_thread(_render_section, name, user_id, use_replica) for name in sections),
+        return_exceptions=True
+    )
+    
+    # A failing section comes back as null, so the rest of the page still loads; the cause is
+    # logged here rather than sent to the client
+    parts, errors = [], {}
+    for name, result in zip(sections, results):
+        if isinstance(result, BaseException):
+            logger.error("Bootstrap section %s failed for user %s", name, user_id, exc_info=result)
+            errors[name] = "unavailable"
+            result = b"null"
+        parts.append(serializers.dumps(name) + b":" + result)
+    if errors:
+        parts.append(b'"errors":' + serializers.dumps(errors))
+    return Response(content=b"{" + b",".join(parts) + b"}", media_type="application/json")
+
+@router.websocket("/ws/notifications")
+async def notifications_socket(websocket: WebSocket):
+    user_id = get_websocket_user_id(websocket)
+    if not user_id:
+        await websocket.close(code=4401)
+        return
+    
+    await websocket.accept()
+    subscription = notification_hub.subscribe(user_id)
+    
+    async def drain_client():
+        # Nothing is expected from the client; this only notices when it goes away
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+    
+    receiver = asyncio.create_task(drain_client())
+    try:
+        while not receiver.done():
+            next_event = asyncio.create_task(subscription.next())
+            await asyncio.wait({next_event, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_event.done():
+                next_event.cancel()
+                break
+            await websocket.send_text(next_event.result() or '{"type":"ping"}')
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        receiver.cancel()
+        notification_hub.unsubscribe(subscription)
+
+@router.get("/notifications/stream")
+async def notifications_stream(user_id: str = Depends(get_user_id)):
+    """Server-sent events fallback for clients that cannot hold a WebSocket."""
+    subscription = notification_hub.subscribe(user_id)
+    
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                message = await subscription.next()
+                yield f"data: {message}\n\n" if message else ": keepalive\n\n"
+        finally:
+            notification_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/calendar/working-days")
+async def get_working_days(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db)
+):
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    
+    storage = DatabaseStorage(db, read_db)
+    calendar = storage.get_working_calendar(storage.get_user(user_id))
+    return {
+        "from": str(from_date),
+        "to": str(to_date),
+        "workingDays": float(calendar.working_days(from_date, to_date)),
+    }
+
+@router.get("/leave-types", response_model=List[LeaveTypeOut])
+async def get_leave_types(user_id: str = Depends(get_user_id), db: Session = Depends(get_db), read_db: Optional[Session] = Depends(get_read_db)):
+    storage = DatabaseStorage(db, read_db)
+    return json_response(serializers.LEAVE_TYPES, storage.get_leave_types())
+
+def _sync_watermark(since: Optional[str], read_at: datetime) -> Optional[datetime]:
+    try:
+        return changed_since(since, read_at)
+    except InvalidSyncToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _with_sync_token(response: Response, read_at: datetime) -> Response:
+    response.headers["X-Sync-Token"] = issue_token(read_at)
+    return response
+
+@router.get("/leave-balances", response_model=List[LeaveBalanceOut])
+async def get_leave_balances(
+    year: Optional[int] = None,
+    since: Optional[str] = Query(None, description="Sync token from a previous response; returns only changes"),
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db)
+):
+    storage = DatabaseStorage(db, read_db)
     year = year or datetime.now().year
-    balances = storage.get_leave_balances(user_id, year)
-    return [
-        {
-            "id": b.id,
-            "userId": b.user_id,
-            "leaveTypeId": b.leave_type_id,
-            "totalDays": b.total_days,
-            "usedDays": b.used_days,
-            "year": b.year
-        }
-        for b in balances
-    ]
+    read_at = datetime.utcnow()
+    watermark = _sync_watermark(since, read_at)
+    balances = storage.get_leave_balances(user_id, year, since=watermark)
+    
+    if since is None:
+        return _with_sync_token(json_response(serializers.LEAVE_BALANCES, balances), read_at)
+    # Balances are never deleted, only updated
+    return delta_response(serializers.dump_json(serializers.LEAVE_BALANCES, balances), [], read_at, reset=watermark is None)
 
 @router.post("/leaves")
 async def create_leave(leave_data: InsertLeaveSchema, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
@@ -113,11 +272,22 @@ async def create_leave(leave_data: InsertLeaveSchema, user_id: str = Depends(get
     
     from_date = datetime.strptime(leave_data.from_date, "%Y-%m-%d").date()
     to_date = datetime.strptime(leave_data.to_date, "%Y-%m-%d").date()
-    days_diff = (to_date - from_date).days + 1
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="Leave end date is before its start date")
+    
+    calendar = storage.get_working_calendar(storage.get_user(user_id))
+    leave_days = calendar.leave_days(from_date, to_date, leave_data.half_day_start, leave_data.half_day_end)
+    if leave_days <= 0:
+        raise HTTPException(status_code=400, detail="The selected dates contain no working days")
     
-    leave_data.days = str(days_diff)
+    leave_data.days = str(leave_days)
     
-    leave = storage.create_leave(leave_data)
+    try:
+        leave = storage.create_leave(leave_data)
+    except InsufficientLeaveBalanceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LeaveOverlapError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
     return {
         "id": leave.id,
@@ -132,87 +302,182 @@ async def create_leave(leave_data: InsertLeaveSchema, user_id: str = Depends(get
         "attachmentPath": leave.attachment_path,
     }
 
-@router.get("/leaves")
-async def get_leaves(user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
-    storage = DatabaseStorage(db)
-    leaves = storage.get_user_leaves(user_id)
-    return [
-        {
-            "id": leave.id,
-            "userId": leave.user_id,
-            "leaveTypeId": leave.leave_type_id,
-            "fromDate": str(leave.from_date),
-            "toDate": str(leave.to_date),
-            "days": float(leave.days),
-            "reason": leave.reason,
-            "status": leave.status,
-            "contactNumber": leave.contact_number,
-            "attachmentPath": leave.attachment_path,
-            "appliedAt": leave.applied_at.isoformat() if leave.applied_at else None,
-        }
-        for leave in leaves
-    ]
+def _projection(model, fields: Optional[str]) -> Projection:
+    try:
+        return Projection(model, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/leaves", response_model=List[LeaveOut])
+async def get_leaves(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. fromDate,toDate,status"),
+    since: Optional[str] = Query(None, description="Sync token from a previous response; returns only changes"),
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db)
+):
+    storage = DatabaseStorage(db, read_db)
+    projection = _projection(LeaveOut, fields)
+    read_at = datetime.utcnow()
+    watermark = _sync_watermark(since, read_at)
+    rows = storage.get_user_leave_rows(user_id, projection.columns, since=watermark)
+    
+    if since is None:
+        return _with_sync_token(projection.response(rows), read_at)
+    deleted = storage.get_deleted_ids(user_id, Leave.__tablename__, watermark) if watermark else []
+    return delta_response(projection.dump_json(rows), deleted, read_at, reset=watermark is None)
 
 @router.put("/leaves/{leave_id}")
-async def update_leave(leave_id: str, updates: dict, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
+async def update_leave(leave_id: str, updates: UpdateLeaveSchema, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
     storage = DatabaseStorage(db)
-    updated_leave = storage.update_leave(leave_id, updates)
+    try:
+        updated_leave = storage.update_leave(leave_id, updates, actor_id=user_id)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Leave not found")
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except LeaveOverlapError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        # InsufficientLeaveBalanceError, or dates with no working days
+        raise HTTPException(status_code=400, detail=str(e))
     return {
         "id": updated_leave.id,
         "userId": updated_leave.user_id,
         "status": updated_leave.status,
     }
 
-@router.delete("/leaves/{leave_id}")
-async def delete_leave(leave_id: str, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
-    storage = DatabaseStorage(db)
-    storage.delete_leave(leave_id)
-    return {"message": "Leave deleted successfully"}
+def encode_cursor(applied_at: datetime, leave_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{applied_at.isoformat()}|{leave_id}".encode()).decode()
 
-@router.get("/attendance")
-async def get_attendance(month: Optional[int] = None, year: Optional[int] = None, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
-    storage = DatabaseStorage(db)
+def decode_cursor(cursor: str):
+    try:
+        applied_at, leave_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(applied_at), leave_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/team/calendar")
+async def get_team_calendar(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (to_date - from_date).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range may span at most {MAX_RANGE_DAYS} days")
     
-    month = month or datetime.now().month
-    year = year or datetime.now().year
+    return team_calendar(db, user_id, from_date, to_date)
+
+@router.get("/approvals/leaves")
+async def get_pending_approvals(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db)
+):
+    storage = DatabaseStorage(db, read_db)
+    rows = storage.get_pending_approvals(user_id, limit, decode_cursor(cursor) if cursor else None)
     
-    records = storage.get_attendance_records(user_id, month, year)
+    next_cursor = None
+    if len(rows) == limit:
+        last_leave = rows[-1][0]
+        next_cursor = encode_cursor(last_leave.applied_at, last_leave.id)
     
-    stats = {
-        "present": len([r for r in records if r.status == 'present']),
-        "absent": len([r for r in records if r.status == 'absent']),
-        "leave": len([r for r in records if r.status == 'leave']),
-        "wfh": len([r for r in records if r.status == 'wfh'])
+    return {
+        "items": [
+            {
+                "id": leave.id,
+                "userId": leave.user_id,
+                "employeeName": " ".join(part for part in [employee.first_name, employee.last_name] if part),
+                "employeeId": employee.employee_id,
+                "leaveTypeId": leave.leave_type_id,
+                "fromDate": str(leave.from_date),
+                "toDate": str(leave.to_date),
+                "days": float(leave.days),
+                "reason": leave.reason,
+                "appliedAt": leave.applied_at.isoformat() if leave.applied_at else None,
+            }
+            for leave, employee in rows
+        ],
+        "nextCursor": next_cursor,
     }
+
+@router.post("/approvals/leaves/decisions")
+async def review_leaves(data: ReviewLeavesSchema, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
+    storage = DatabaseStorage(db)
+    
+    decisions = {}
+    for decision in data.decisions:
+        decisions.setdefault(decision.status, []).append(decision.leave_id)
+    
+    try:
+        reviewed = storage.review_leaves(user_id, decisions, data.comments)
+    except InsufficientLeaveBalanceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
+    reviewed_ids = {row.id for row in reviewed}
     return {
-        "records": [
+        "reviewed": [
             {
-                "id": r.id,
-                "userId": r.user_id,
-                "date": str(r.date),
-                "status": r.status,
-                "checkIn": r.check_in.isoformat() if r.check_in else None,
-                "checkOut": r.check_out.isoformat() if r.check_out else None,
-                "workingHours": float(r.working_hours) if r.working_hours else None,
+                "id": row.id,
+                "userId": row.user_id,
+                "status": row.status,
             }
-            for r in records
+            for row in reviewed
         ],
-        "stats": stats
+        "skipped": [decision.leave_id for decision in data.decisions if decision.leave_id not in reviewed_ids],
     }
 
-@router.get("/attendance/absent-dates")
-async def get_absent_dates(days: int = 7, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
+@router.delete("/leaves/{leave_id}")
+async def delete_leave(leave_id: str, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
     storage = DatabaseStorage(db)
-    absent_dates = storage.get_absent_dates(user_id, days)
-    return [
-        {
-            "id": r.id,
-            "date": str(r.date),
-            "status": r.status,
-        }
-        for r in absent_dates
-    ]
+    try:
+        storage.delete_leave(leave_id, actor_id=user_id)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Leave not found")
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    return {"message": "Leave deleted successfully"}
+
+@router.get("/attendance", response_model=AttendanceMonthOut)
+async def get_attendance(
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    since: Optional[str] = Query(None, description="Sync token from a previous response; returns only changed records"),
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db)
+):
+    storage = DatabaseStorage(db, read_db)
+    
+    month = month or datetime.now().month
+    year = year or datetime.now().year
+    read_at = datetime.utcnow()
+    watermark = _sync_watermark(since, read_at)
+    
+    records = storage.get_attendance_rows(user_id, month, year, since=watermark)
+    if since is not None:
+        # Attendance rows leave the API only with their whole partition, so there are no tombstones
+        changes = serializers.dump_json(serializers.list_adapter(AttendanceOut), row_dicts(records))
+        return delta_response(changes, [], read_at, reset=watermark is None)
+    
+    stats = {"present": 0, "absent": 0, "leave": 0, "wfh": 0}
+    for r in records:
+        if r.status in stats:
+            stats[r.status] += 1
+    
+    return _with_sync_token(
+        json_response(serializers.ATTENDANCE_MONTH, {"records": row_dicts(records), "stats": stats}), read_at
+    )
+
+@router.get("/attendance/absent-dates", response_model=List[AbsentDateOut])
+async def get_absent_dates(days: int = 7, user_id: str = Depends(get_user_id), db: Session = Depends(get_db), read_db: Optional[Session] = Depends(get_read_db)):
+    storage = DatabaseStorage(db, read_db)
+    return json_response(serializers.ABSENT_DATES, storage.get_absent_dates(user_id, days))
 
 @router.post("/attendance/regularize")
 async def regularize_attendance(
@@ -224,6 +489,11 @@ async def regularize_attendance(
 ):
     storage = DatabaseStorage(db)
     
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+    
     record_data = InsertAttendanceSchema(
         userId=user_id,
         date=date,
@@ -232,7 +502,10 @@ async def regularize_attendance(
         regularizedAt=datetime.now()
     )
     
-    record = storage.create_attendance_record(record_data)
+    try:
+        record = storage.create_attendance_record(record_data)
+    except AttendanceDateOutOfRange as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "id": record.id,
@@ -241,69 +514,177 @@ async def regularize_attendance(
         "status": record.status,
     }
 
-@router.get("/salary-slips")
-async def get_salary_slips(user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
-    storage = DatabaseStorage(db)
-    slips = storage.get_salary_slips(user_id)
-    return [
-        {
-            "id": slip.id,
-            "userId": slip.user_id,
-            "month": slip.month,
-            "year": slip.year,
-            "basicSalary": float(slip.basic_salary),
-            "allowances": slip.allowances,
-            "deductions": slip.deductions,
-            "grossSalary": float(slip.gross_salary),
-            "netSalary": float(slip.net_salary),
-            "paymentDate": str(slip.payment_date) if slip.payment_date else None,
-            "filePath": slip.file_path,
-        }
-        for slip in slips
-    ]
+@router.get("/salary-slips", response_model=List[SalarySlipOut])
+async def get_salary_slips(user_id: str = Depends(get_user_id), db: Session = Depends(get_db), read_db: Optional[Session] = Depends(get_read_db)):
+    storage = DatabaseStorage(db, read_db)
+    return json_response(serializers.SALARY_SLIPS, storage.get_salary_slips(user_id))
 
-@router.get("/salary-slips/{month}/{year}")
-async def get_salary_slip(month: int, year: int, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
-    storage = DatabaseStorage(db)
+@router.get("/salary-slips/{month}/{year}", response_model=SalarySlipOut)
+async def get_salary_slip(month: int, year: int, user_id: str = Depends(get_user_id), db: Session = Depends(get_db), read_db: Optional[Session] = Depends(get_read_db)):
+    storage = DatabaseStorage(db, read_db)
     slip = storage.get_salary_slip(user_id, month, year)
     
     if not slip:
         raise HTTPException(status_code=404, detail="Salary slip not found")
     
-    return {
-        "id": slip.id,
-        "userId": slip.user_id,
-        "month": slip.month,
-        "year": slip.year,
-        "basicSalary": float(slip.basic_salary),
-        "allowances": slip.allowances,
-        "deductions": slip.deductions,
-        "grossSalary": float(slip.gross_salary),
-        "netSalary": float(slip.net_salary),
-        "paymentDate": str(slip.payment_date) if slip.payment_date else None,
-        "filePath": slip.file_path,
-    }
+    return json_response(serializers.SALARY_SLIP, slip)
 
-@router.get("/hr-documents")
-async def get_hr_documents(user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
+@router.get("/salary-slips/{month}/{year}/download")
+async def download_salary_slip(month: int, year: int, user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
     storage = DatabaseStorage(db)
-    documents = storage.get_hr_documents()
+    slip = storage.get_salary_slip(user_id, month, year)
+    
+    if not slip:
+        raise HTTPException(status_code=404, detail="Salary slip not found")
+    
+    payload = slip_payload(slip, storage.get_user(user_id))
+    object_path = payslip_object_path(payload)
+    
+    pdf = None
+    if is_cached(slip, payload):
+        pdf = await asyncio.to_thread(get_object_storage_service().download_private_bytes, object_path)
+    if pdf is None:
+        # Not pre-rendered (or the slip changed since): render once and cache it for next time
+        pdf = await asyncio.to_thread(render_payslip_pdf, payload)
+        location = await asyncio.to_thread(get_object_storage_service().upload_private_bytes, object_path, pdf, "application/pdf")
+        storage.update_salary_slip_file(slip.id, location)
+    
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="salary-slip-{year}-{month:02d}.pdf"',
+            "Cache-Control": "private, max-age=86400",
+            "ETag": f'"{object_path.rsplit("/", 1)[-1][:-4]}"',
+        },
+    )
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+@router.get("/admin/payroll/export")
+async def export_payroll(
+    from_period: str = Query(..., alias="from", description="First payroll month, YYYY-MM"),
+    to_period: str = Query(..., alias="to", description="Last payroll month, YYYY-MM"),
+    format: Literal["csv", "xlsx"] = "csv",
+    user_id: str = Depends(get_admin_user_id)
+):
+    try:
+        start, end = parse_period(from_period), parse_period(to_period)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Periods must be formatted as YYYY-MM")
+    
+    return StreamingResponse(
+        stream_payroll_export(start, end, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="payroll-{from_period}-to-{to_period}.{format}"'},
+    )
+
+def _parse_period_range(from_period: str, to_period: str):
+    try:
+        return parse_period(from_period), parse_period(to_period)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Periods must be formatted as YYYY-MM")
+
+@router.get("/admin/payroll/analytics/components")
+async def get_payroll_component_totals(
+    from_period: str = Query(..., alias="from", description="First payroll month, YYYY-MM"),
+    to_period: str = Query(..., alias="to", description="Last payroll month, YYYY-MM"),
+    kind: Optional[Literal["allowance", "deduction"]] = None,
+    component: Optional[str] = None,
+    group_by: Literal["month", "quarter", "year", "department"] = Query("month", alias="groupBy"),
+    user_id: str = Depends(get_admin_user_id),
+    db: Session = Depends(get_db)
+):
+    start, end = _parse_period_range(from_period, to_period)
+    rows = component_totals(db, start, end, kind=kind, component=component, group_by=group_by)
     return [
         {
-            "id": doc.id,
-            "name": doc.name,
-            "category": doc.category,
-            "filePath": doc.file_path,
-            "fileSize": doc.file_size,
-            "mimeType": doc.mime_type,
-            "uploadedBy": doc.uploaded_by,
-            "isActive": doc.is_active,
-            "vectorCount": doc.vector_count,
-            "createdAt": doc.created_at.isoformat() if doc.created_at else None,
+            "group": row["group"],
+            "kind": row["kind"],
+            "component": row["component"],
+            "total": float(row["total"]),
+            "slipCount": row["slip_count"],
         }
-        for doc in documents
+        for row in rows
+    ]
+
+@router.get("/admin/payroll/analytics/slips")
+async def get_slips_with_component(
+    kind: Literal["allowance", "deduction"],
+    component: str,
+    from_period: Optional[str] = Query(None, alias="from"),
+    to_period: Optional[str] = Query(None, alias="to"),
+    limit: int = Query(1000, ge=1, le=10000),
+    user_id: str = Depends(get_admin_user_id),
+    db: Session = Depends(get_db)
+):
+    start = end = None
+    if from_period and to_period:
+        start, end = _parse_period_range(from_period, to_period)
+    rows = slips_with_component(db, kind, component, start, end, limit)
+    return [
+        {
+            "id": row["id"],
+            "userId": row["user_id"],
+            "employeeId": row["employee_id"],
+            "name": " ".join(part for part in [row["first_name"], row["last_name"]] if part),
+            "department": row["department"],
+            "month": row["month"],
+            "year": row["year"],
+            "amount": row["amount"],
+        }
+        for row in rows
     ]
 
+@router.post("/admin/payroll/analytics/refresh")
+async def refresh_payroll_component_totals(
+    from_period: str = Query(..., alias="from"),
+    to_period: str = Query(..., alias="to"),
+    user_id: str = Depends(get_admin_user_id),
+    db: Session = Depends(get_db)
+):
+    start, end = _parse_period_range(from_period, to_period)
+    count = refresh_component_totals(db, start, end)
+    return {"refreshed": count}
+
+@router.get("/admin/sql-profile")
+async def get_sql_profile(user_id: str = Depends(get_admin_user_id)):
+    """Recent slow queries with their plans and requests flagged for repeated statements."""
+    return sql_profiler.report()
+
+@router.get("/admin/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    user_id: str = Depends(get_admin_user_id)
+):
+    """Sample this worker's stacks for `seconds`; collapsed-stack output for flamegraph tools."""
+    try:
+        collapsed = await asyncio.to_thread(
+            sample_stacks, seconds, interval_ms / 1000, loop_lag_monitor.loop_thread_id
+        )
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(
+        content=collapsed,
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="profile-{os.getpid()}.collapsed"'},
+    )
+
+@router.get("/hr-documents", response_model=List[HrDocumentOut])
+async def get_hr_documents(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db)
+):
+    storage = DatabaseStorage(db, read_db)
+    projection = _projection(HrDocumentOut, fields)
+    return projection.response(storage.get_hr_document_rows(projection.columns))
+
 @router.post("/hr-documents/upload")
 async def upload_hr_document(
     file: UploadFile = File(...),
@@ -381,7 +762,12 @@ async def ask_ai_assistant(
         for doc in documents
     ]
     
-    result = await ask_hr_assistant(question, document_context)
+    try:
+        result = await ask_hr_assistant(question, document_context)
+    except LLMUnavailable as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
     
     conversation_data = InsertAiConversationSchema(
         userId=user_id,
@@ -397,18 +783,13 @@ async def ask_ai_assistant(
         "documentsUsed": result["documentsUsed"]
     }
 
-@router.get("/ai/conversations")
-async def get_ai_conversations(user_id: str = Depends(get_user_id), db: Session = Depends(get_db)):
-    storage = DatabaseStorage(db)
-    conversations = storage.get_user_conversations(user_id)
-    return [
-        {
-            "id": conv.id,
-            "userId": conv.user_id,
-            "question": conv.question,
-            "answer": conv.answer,
-            "documentsUsed": conv.documents_used,
-            "createdAt": conv.created_at.isoformat() if conv.created_at else None,
-        }
-        for conv in conversations
-    ]
+@router.get("/ai/conversations", response_model=List[AiConversationOut])
+async def get_ai_conversations(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. question,createdAt"),
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db)
+):
+    storage = DatabaseStorage(db, read_db)
+    projection = _projection(AiConversationOut, fields)
+    return projection.response(storage.get_user_conversation_rows(user_id, projection.columns))
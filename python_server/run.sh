@@ -3,5 +3,8 @@
 # Navigate to python_server directory
 cd "$(dirname "$0")"
 
+# Bring the schema up to date (the server only checks the revision)
+alembic upgrade head
+
 # Run the Python server
 python main.py
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Production Runner
+A pre-forking server: the master imports the app and loads reference data once, then forks
+one uvicorn worker per CPU onto a shared listening socket. Workers start with the app, the
+SDKs, the tokenizer and the holiday calendars already in memory, shared copy-on-write with
+the master.
+
+Signals to the master:
+- SIGTERM / SIGINT: every worker drains (see below), then the master exits.
+- SIGHUP: rolling restart. Reference data is reloaded, then workers are replaced one at a
+  time; each old worker is stopped only after its replacement reports ready.
+- SIGTTIN / SIGTTOU: add or remove a worker.
+
+A worker that receives SIGTERM fails /readyz for SHUTDOWN_DRAIN_SECONDS so load balancers
+stop sending it traffic, then stops accepting connections and gives in-flight requests up to
+SHUTDOWN_TIMEOUT_SECONDS to finish. Workers that die unexpectedly are replaced.
+
+For a new release, start a second runner with --reuse-port on the same port, wait for its
+/readyz, then SIGTERM the old master.
+
+Run from python_server/ after `alembic upgrade head`:
+
+    python runner.py --port 5000 [--workers 8] [--reuse-port]
+"""
+
+import argparse
+import gc
+import os
+import select
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional
+
+# Metrics are aggregated across workers through files, so this has to be set before
+# prometheus_client is imported (by main, below)
+if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="hr-metrics-")
+
+import uvicorn
+from prometheus_client import multiprocess
+from sqlalchemy import text
+
+from config import settings
+from database import SessionLocal, engine
+from read_replicas import replica_set
+from storage import DatabaseStorage
+from work_calendar import calendar_codes, get_working_calendar, invalidate_working_calendars
+import main
+
+WORKER_BOOT_TIMEOUT = 60
+RESPAWN_DELAY = 1
+
+
+def worker_count() -> int:
+    if settings.web_concurrency > 0:
+        return settings.web_concurrency
+    # Honour CPU affinity / container limits where the platform reports them
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def preload_reference_data() -> int:
+    """Build every employee's working calendar in the master so workers inherit them."""
+    invalidate_working_calendars()
+    db = SessionLocal()
+    try:
+        storage = DatabaseStorage(db)
+        rows = db.execute(text("SELECT DISTINCT location, department FROM users")).all()
+        codes = {calendar_codes(row.location, row.department) for row in rows} | {calendar_codes()}
+        for calendar in codes:
+            get_working_calendar(calendar, storage.get_holidays)
+        return len(codes)
+    finally:
+        db.close()
+
+
+def check_pool_budget(workers: int):
+    per_worker = settings.db_pool_size + settings.db_max_overflow
+    with engine.connect() as conn:
+        max_connections = int(conn.execute(text("SHOW max_connections")).scalar())
+    if per_worker * workers > max_connections and not settings.db_pgbouncer:
+        print(
+            f"⚠ {workers} workers × {per_worker} pooled connections exceeds max_connections "
+            f"({max_connections}); lower DB_POOL_SIZE / DB_MAX_OVERFLOW or use pgbouncer"
+        )
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn.Server that drains on SIGTERM and tells the master once it is serving."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if self.started:
+            os.write(self.ready_fd, b"1")
+        os.close(self.ready_fd)
+
+    def handle_exit(self, sig, frame):
+        if sig != signal.SIGTERM or main.app.state.draining or settings.shutdown_drain_seconds <= 0:
+            super().handle_exit(sig, frame)
+            return
+        main.app.state.draining = True
+        timer = threading.Timer(settings.shutdown_drain_seconds, super().handle_exit, (sig, frame))
+        timer.daemon = True
+        timer.start()
+
+
+class Master:
+    def __init__(self, sock: socket.socket, workers: int, log_level: str):
+        self.sock = sock
+        self.target = workers
+        self.log_level = log_level
+        self.workers: Dict[int, float] = {}
+        self.signals: List[int] = []
+        self.stopping = False
+
+    def spawn(self) -> Optional[int]:
+        """Fork a worker and wait until it is serving; returns its pid, or None if it failed."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            self._run_worker(write_fd)
+        os.close(write_fd)
+        try:
+            ready, _, _ = select.select([read_fd], [], [], WORKER_BOOT_TIMEOUT)
+            ok = bool(ready) and os.read(read_fd, 1) == b"1"
+        finally:
+            os.close(read_fd)
+        if not ok:
+            print(f"✗ Worker {pid} failed to start")
+            self._kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            multiprocess.mark_process_dead(pid)
+            return None
+        self.workers[pid] = time.time()
+        print(f"✓ Worker {pid} ready")
+        return pid
+
+    def _run_worker(self, ready_fd: int):
+        # SIGTERM is handled by uvicorn; leave SIGTERM ignored afterwards so the worker exits
+        # with its own status instead of uvicorn re-raising the signal on the way out
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(sig, signal.SIG_IGN)
+        # Connections opened by the master must never be shared with a child
+        engine.dispose(close=False)
+        for replica in replica_set.replicas:
+            replica.engine.dispose(close=False)
+        config = uvicorn.Config(
+            main.app,
+            log_level=self.log_level,
+            access_log=False,  # MetricsMiddleware writes the access log
+            proxy_headers=True,
+            timeout_graceful_shutdown=settings.shutdown_timeout_seconds,
+        )
+        code = 0
+        try:
+            DrainingServer(config, ready_fd).run(sockets=[self.sock])
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        os._exit(code)
+
+    def _kill(self, pid: int, sig: int):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _on_signal(self, sig, frame):
+        self.signals.append(sig)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            multiprocess.mark_process_dead(pid)
+            if self.workers.pop(pid, None) is not None and not self.stopping:
+                print(f"✗ Worker {pid} exited unexpectedly (status {status}); replacing it")
+
+    def rolling_restart(self):
+        print(f"✓ Reloaded reference data ({preload_reference_data()} calendars)")
+        engine.dispose()
+        for old_pid in list(self.workers):
+            if self.spawn() is None:
+                print("✗ Rolling restart stopped; the remaining workers keep running")
+                return
+            self.workers.pop(old_pid, None)
+            self._kill(old_pid, signal.SIGTERM)
+        print("✓ Rolling restart complete")
+
+    def stop(self):
+        self.stopping = True
+        for pid in self.workers:
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.time() + settings.shutdown_drain_seconds + settings.shutdown_timeout_seconds + 5
+        while self.workers and time.time() < deadline:
+            for pid in list(self.workers):
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    multiprocess.mark_process_dead(pid)
+                    self.workers.pop(pid)
+            time.sleep(0.1)
+        for pid in self.workers:
+            print(f"✗ Worker {pid} did not stop in time; killing it")
+            self._kill(pid, signal.SIGKILL)
+
+    def run(self):
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(sig, self._on_signal)
+
+        for _ in range(self.target):
+            if self.spawn() is None:
+                # Usually the schema check or configuration; replacing it would only crash-loop
+                self.stop()
+                sys.exit(1)
+
+        while True:
+            while self.signals:
+                sig = self.signals.pop(0)
+                if sig in (signal.SIGTERM, signal.SIGINT):
+                    print(f"Received {signal.Signals(sig).name}, draining {len(self.workers)} workers")
+                    self.stop()
+                    return
+                if sig == signal.SIGHUP:
+                    self.rolling_restart()
+                elif sig == signal.SIGTTIN:
+                    self.target += 1
+                elif sig == signal.SIGTTOU and self.target > 1:
+                    self.target -= 1
+                    newest = max(self.workers, key=self.workers.get)
+                    self.workers.pop(newest)
+                    self._kill(newest, signal.SIGTERM)
+            self.reap()
+            if len(self.workers) < self.target and not self.signals:
+                time.sleep(RESPAWN_DELAY)
+                self.spawn()
+            time.sleep(0.2)
+
+
+def bind_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-forking production server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 5000)))
+    parser.add_argument("--workers", type=int, help="defaults to WEB_CONCURRENCY, else one per CPU")
+    parser.add_argument("--reuse-port", action="store_true", help="let a second runner bind the same port during a deploy")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    workers = args.workers or worker_count()
+    check_pool_budget(workers)
+    print(f"✓ Preloaded reference data ({preload_reference_data()} calendars)")
+    for module in main.LAZY_SDK_MODULES:
+        __import__(module)
+    main.tokenizer_encoding()
+    engine.dispose()
+    # Everything loaded so far lives as long as the master; keeping it out of the cyclic GC
+    # stops collections in the workers from touching (and so copying) those pages
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port, args.reuse_port)
+    print(f"✓ Listening on {args.host}:{args.port} with {workers} workers (master {os.getpid()})")
+    Master(sock, workers, args.log_level).run()
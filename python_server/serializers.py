@@ -0,0 +1,217 @@
+"""
+Response Serialization
+Precompiled pydantic response models and TypeAdapters for the API's list endpoints.
+
+Handlers pass ORM objects or SQLAlchemy Row tuples straight to `json_response`, which validates
+them by attribute and dumps JSON bytes in pydantic-core, skipping FastAPI's jsonable_encoder
+and the stdlib json module. Decimals come out as floats and dates as ISO strings, matching the
+hand-built responses these replace.
+"""
+
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, TypeAdapter, create_model
+from sqlalchemy import Row
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; Decimals are emitted as floats."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _orjson_default(value: Any):
+    if hasattr(value, "as_tuple"):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ResponseModel(BaseModel):
+    class Config:
+        from_attributes = True
+        populate_by_name = True
+
+
+class LeaveTypeOut(ResponseModel):
+    id: str
+    name: str
+    max_days: int = Field(..., alias="maxDays")
+    carry_forward: Optional[bool] = Field(None, alias="carryForward")
+
+
+class LeaveBalanceOut(ResponseModel):
+    id: str
+    user_id: str = Field(..., alias="userId")
+    leave_type_id: str = Field(..., alias="leaveTypeId")
+    total_days: int = Field(..., alias="totalDays")
+    used_days: Optional[float] = Field(None, alias="usedDays")
+    reserved_days: Optional[float] = Field(None, alias="reservedDays")
+    year: int
+
+
+class LeaveOut(ResponseModel):
+    id: str
+    user_id: str = Field(..., alias="userId")
+    leave_type_id: str = Field(..., alias="leaveTypeId")
+    from_date: date = Field(..., alias="fromDate")
+    to_date: date = Field(..., alias="toDate")
+    days: float
+    reason: str
+    status: Optional[str] = None
+    contact_number: Optional[str] = Field(None, alias="contactNumber")
+    attachment_path: Optional[str] = Field(None, alias="attachmentPath")
+    applied_at: Optional[datetime] = Field(None, alias="appliedAt")
+
+
+class AttendanceOut(ResponseModel):
+    id: str
+    user_id: str = Field(..., alias="userId")
+    date: date
+    status: str
+    check_in: Optional[datetime] = Field(None, alias="checkIn")
+    check_out: Optional[datetime] = Field(None, alias="checkOut")
+    working_hours: Optional[float] = Field(None, alias="workingHours")
+
+
+class AttendanceMonthOut(ResponseModel):
+    records: List[AttendanceOut]
+    stats: Dict[str, int]
+
+
+class AbsentDateOut(ResponseModel):
+    id: str
+    date: date
+    status: str
+
+
+class SalarySlipOut(ResponseModel):
+    id: str
+    user_id: str = Field(..., alias="userId")
+    month: int
+    year: int
+    basic_salary: float = Field(..., alias="basicSalary")
+    allowances: Optional[Dict[str, Any]] = None
+    deductions: Optional[Dict[str, Any]] = None
+    gross_salary: float = Field(..., alias="grossSalary")
+    net_salary: float = Field(..., alias="netSalary")
+    payment_date: Optional[date] = Field(None, alias="paymentDate")
+    file_path: Optional[str] = Field(None, alias="filePath")
+
+
+class HrDocumentOut(ResponseModel):
+    id: str
+    name: str
+    category: str
+    file_path: str = Field(..., alias="filePath")
+    file_size: Optional[int] = Field(None, alias="fileSize")
+    mime_type: Optional[str] = Field(None, alias="mimeType")
+    uploaded_by: str = Field(..., alias="uploadedBy")
+    is_active: Optional[bool] = Field(None, alias="isActive")
+    vector_count: Optional[int] = Field(None, alias="vectorCount")
+    created_at: Optional[datetime] = Field(None, alias="createdAt")
+
+
+class AiConversationOut(ResponseModel):
+    id: str
+    user_id: str = Field(..., alias="userId")
+    question: str
+    answer: str
+    documents_used: Optional[List[str]] = Field(None, alias="documentsUsed")
+    created_at: Optional[datetime] = Field(None, alias="createdAt")
+
+
+class Projection:
+    """
+    A `fields=` sparse fieldset resolved against a response model: the ORM columns to select
+    and the adapter that serializes exactly those keys.
+    """
+
+    def __init__(self, model: Type[ResponseModel], fields: Optional[str] = None):
+        self.model = model
+        self.sparse = bool(fields)
+        self.columns = parse_fields(model, fields) if fields else list(model.model_fields)
+        self.adapter = _sparse_list_adapter(model) if self.sparse else list_adapter(model)
+
+    def dump_json(self, rows: Sequence[Row]) -> bytes:
+        return self.adapter.dump_json(self.adapter.validate_python(row_dicts(rows)), by_alias=True, exclude_unset=self.sparse)
+
+    def response(self, rows: Sequence[Row]) -> Response:
+        return Response(content=self.dump_json(rows), media_type="application/json")
+
+
+def parse_fields(model: Type[ResponseModel], fields: str) -> List[str]:
+    """Map a comma-separated list of response keys (camelCase) to column names; `id` is always kept."""
+    names = {field.alias or name: name for name, field in model.model_fields.items()}
+    names.update({name: name for name in model.model_fields})
+    columns = ["id"]
+    for key in (part.strip() for part in fields.split(",")):
+        if not key:
+            continue
+        if key not in names:
+            raise ValueError(f"Unknown field '{key}'. Available: {', '.join(sorted(f.alias or n for n, f in model.model_fields.items()))}")
+        if names[key] not in columns:
+            columns.append(names[key])
+    return columns
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[ResponseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+@lru_cache(maxsize=None)
+def _sparse_list_adapter(model: Type[ResponseModel]) -> TypeAdapter:
+    # Same fields and aliases with every field optional; dumped with exclude_unset so only
+    # the projected keys appear
+    partial = create_model(
+        f"Sparse{model.__name__}",
+        __base__=ResponseModel,
+        **{
+            name: (Optional[field.annotation], Field(None, alias=field.alias))
+            for name, field in model.model_fields.items()
+        },
+    )
+    return TypeAdapter(List[partial])
+
+
+def row_dicts(rows: Sequence[Row]) -> List[Dict[str, Any]]:
+    # Attribute lookups on Row are slow from pydantic-core; zipping against the shared field
+    # names once per row is several times faster than from_attributes or Row._asdict()
+    if not rows:
+        return []
+    fields = rows[0]._fields
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def dump_json(adapter: TypeAdapter, data: Any) -> bytes:
+    """Validate ORM objects, Row tuples or dicts and serialize them to camelCase JSON."""
+    if isinstance(data, list) and data and isinstance(data[0], Row):
+        data = row_dicts(data)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True), by_alias=True)
+
+
+def json_response(adapter: TypeAdapter, data: Any, status_code: int = 200) -> Response:
+    return Response(content=dump_json(adapter, data), status_code=status_code, media_type="application/json")
+
+
+# Built once at import; building an adapter compiles its validator and serializer
+LEAVE_TYPES = list_adapter(LeaveTypeOut)
+LEAVE_BALANCES = list_adapter(LeaveBalanceOut)
+LEAVES = list_adapter(LeaveOut)
+ATTENDANCE_MONTH = TypeAdapter(AttendanceMonthOut)
+ABSENT_DATES = list_adapter(AbsentDateOut)
+SALARY_SLIP = TypeAdapter(SalarySlipOut)
+SALARY_SLIPS = list_adapter(SalarySlipOut)
+HR_DOCUMENTS = list_adapter(HrDocumentOut)
+AI_CONVERSATIONS = list_adapter(AiConversationOut)
@@ -0,0 +1,199 @@
+"""
+SQL Profiler
+Opt-in (SQL_PROFILING=1) per-request SQL accounting built on SQLAlchemy engine events.
+
+Every statement executed while a request is being served is counted and timed against that
+request. Statements that repeat with the same shape (same SQL, different parameters) at least
+N_PLUS_ONE_THRESHOLD times in one request are flagged as likely N+1 loops, and SELECTs slower
+than SLOW_QUERY_MS are re-run under EXPLAIN (ANALYZE, BUFFERS) and kept in a ring buffer for
+/api/admin/sql-profile. A SELECT that writes, locks rows or calls a function with side effects
+(pg_notify, nextval, advisory locks) only gets a plain EXPLAIN, which does not run it.
+
+EXPLAIN ANALYZE executes the query a second time, so this is for development and short
+diagnostic windows, not for leaving on in production.
+"""
+
+import logging
+import os
+import re
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_PROFILING = os.getenv("SQL_PROFILING", "").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+RING_BUFFER_SIZE = 100
+
+logger = logging.getLogger("hr.sql")
+
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE = re.compile(r"\s+")
+_VALUE_LIST = re.compile(r"\((?:\s*%\([^)]+\)s\s*,?)+\)")
+_READ_STATEMENT = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+# Running these again under EXPLAIN ANALYZE would repeat their effect (or take row locks)
+_SIDE_EFFECTS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|INTO|FOR\s+(?:KEY\s+)?SHARE|pg_notify|nextval|setval|"
+    r"pg_(?:try_)?advisory_\w+|lo_\w+)\b",
+    re.IGNORECASE,
+)
+
+
+def statement_shape(statement: str) -> str:
+    """The statement with literals and expanded IN lists collapsed, for grouping repeats."""
+    shape = _STRING.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _VALUE_LIST.sub("(…)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration_ms: float):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self) -> List[Dict]:
+        return [
+            {"statement": shape, "count": count}
+            for shape, count in self.shapes.most_common()
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+
+    def summary(self) -> Dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "queries": self.count,
+            "totalMs": round(self.total_ms, 2),
+            "repeated": self.repeated(),
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+slow_queries: deque = deque(maxlen=RING_BUFFER_SIZE)
+n_plus_one_requests: deque = deque(maxlen=RING_BUFFER_SIZE)
+
+
+def _explain(cursor, statement: str, parameters) -> Optional[str]:
+    options = "(COSTS)" if _SIDE_EFFECTS.search(statement) else "(ANALYZE, BUFFERS)"
+    # A savepoint keeps a failing EXPLAIN from aborting the request's own transaction
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute("SAVEPOINT sql_profiler_explain")
+        try:
+            explain_cursor.execute(f"EXPLAIN {options} {statement}", parameters)
+            plan = "\n".join(row[0] for row in explain_cursor.fetchall())
+            explain_cursor.execute("RELEASE SAVEPOINT sql_profiler_explain")
+            return plan
+        except Exception as e:
+            explain_cursor.execute("ROLLBACK TO SAVEPOINT sql_profiler_explain")
+            return f"EXPLAIN failed: {e}"
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        explain_cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_profiler_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["sql_profiler_started"].pop()
+    duration_ms = (time.perf_counter() - started) * 1000
+
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, duration_ms)
+
+    if duration_ms >= SLOW_QUERY_MS and not executemany and _READ_STATEMENT.match(statement):
+        slow_queries.append({
+            "statement": _WHITESPACE.sub(" ", statement).strip(),
+            "durationMs": round(duration_ms, 2),
+            "route": profile.route if profile else None,
+            "plan": _explain(cursor, statement, parameters),
+            "at": datetime.now(timezone.utc).isoformat(),
+        })
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for a failed statement; drop its start time
+    started = exception_context.connection.info.get("sql_profiler_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def install(engine: Engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def report() -> Dict:
+    return {
+        "enabled": SQL_PROFILING,
+        "slowQueryMs": SLOW_QUERY_MS,
+        "nPlusOneThreshold": N_PLUS_ONE_THRESHOLD,
+        "slowQueries": list(reversed(slow_queries)),
+        "nPlusOneRequests": list(reversed(n_plus_one_requests)),
+    }
+
+
+class SqlProfilerMiddleware:
+    """
+    ASGI middleware that scopes a RequestProfile to each request. With `headers=True`
+    (development) responses carry X-SQL-Count, X-SQL-Time-Ms and X-SQL-Repeated.
+    """
+
+    def __init__(self, app, headers: bool = False):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api"):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.headers:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-sql-count", str(profile.count).encode()),
+                    (b"x-sql-time-ms", f"{profile.total_ms:.1f}".encode()),
+                    (b"x-sql-repeated", str(len(profile.repeated())).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            route = scope.get("route")
+            profile.route = getattr(route, "path", None)
+            repeated = profile.repeated()
+            if repeated:
+                n_plus_one_requests.append(profile.summary())
+                logger.warning(
+                    "Possible N+1 on %s %s: %s",
+                    profile.method, profile.route or profile.path,
+                    "; ".join(f"{r['count']}× {r['statement'][:120]}" for r in repeated),
+                )
@@ -1,19 +1,34 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, asc, extract
-from typing import List, Optional
-from datetime import datetime, timedelta
+from sqlalchemy import ARRAY, Row, String, and_, any_, asc, bindparam, desc, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional, Sequence, Tuple
+from dataclasses import replace
+from datetime import date, datetime, timedelta
 from models import (
-    User, Leave, LeaveType, LeaveBalance, AttendanceRecord, SalarySlip,
-    HrDocument, AiConversation, UpsertUserSchema, InsertLeaveSchema,
+    User, Leave, LeaveType, LeaveBalance, AttendanceRecord, SalarySlip, Holiday, DeletedRecord,
+    HrDocument, AiConversation, UpsertUserSchema, InsertLeaveSchema, UpdateLeaveSchema,
     InsertAttendanceSchema, InsertHrDocumentSchema, InsertAiConversationSchema
 )
+from attendance_partitions import raise_if_no_partition
+from leave_ledger import REVIEW_STATUSES, LeaveLedger, LeaveState
+from leave_overlap import ACTIVE_LEAVE_STATUSES, LeaveOverlapError, leave_overlaps, overlap_message, raise_if_overlap_violation
+from notifications import publish, publish_many, publish_to_manager
+from sync import record_deletion
+from team_calendar import refresh_leave_days
+from work_calendar import WorkingCalendar, calendar_codes, get_working_calendar
 
 class DatabaseStorage:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, read_db: Optional[Session] = None):
         self.db = db
+        # Read-only lookups may be served by a replica; anything feeding a write uses self.db
+        self.read_db = read_db or db
+    
+    @staticmethod
+    def _columns(entity, columns: Sequence[str]):
+        return [getattr(entity, column) for column in columns]
     
     def get_user(self, user_id: str) -> Optional[User]:
-        return self.db.query(User).filter(User.id == user_id).first()
+        return self.read_db.query(User).filter(User.id == user_id).first()
     
     def upsert_user(self, user_data: UpsertUserSchema) -> User:
         user_dict = user_data.model_dump(exclude_none=True, by_alias=False)
@@ -36,58 +51,286 @@ class DatabaseStorage:
             return new_user
     
     def get_leave_types(self) -> List[LeaveType]:
-        return self.db.query(LeaveType).all()
+        return self.read_db.query(LeaveType).all()
     
-    def get_leave_balances(self, user_id: str, year: int) -> List[LeaveBalance]:
-        return self.db.query(LeaveBalance).filter(
+    def get_leave_balances(self, user_id: str, year: int, since: Optional[datetime] = None) -> List[LeaveBalance]:
+        query = self.read_db.query(LeaveBalance).filter(
             and_(LeaveBalance.user_id == user_id, LeaveBalance.year == year)
+        )
+        if since is not None:
+            query = query.filter(LeaveBalance.updated_at > since)
+        return query.all()
+    
+    def get_holidays(self, calendars: Tuple[str, ...]) -> List[Tuple[date, bool]]:
+        rows = self.read_db.query(Holiday.date, Holiday.is_half_day).filter(Holiday.calendar.in_(calendars)).all()
+        return [(row.date, bool(row.is_half_day)) for row in rows]
+    
+    def get_working_calendar(self, user: Optional[User]) -> WorkingCalendar:
+        codes = calendar_codes(user.location, user.department) if user else calendar_codes()
+        return get_working_calendar(codes, self.get_holidays)
+    
+    def get_active_leave_intervals(self, user_id: str) -> List[Tuple[date, date, str]]:
+        rows = self.db.query(Leave.from_date, Leave.to_date, Leave.id).filter(
+            and_(Leave.user_id == user_id, Leave.status.in_(ACTIVE_LEAVE_STATUSES))
         ).all()
+        return [(row.from_date, row.to_date, row.id) for row in rows]
+    
+    def check_leave_overlap(self, state: LeaveState, leave_id: Optional[str] = None):
+        if state.status not in ACTIVE_LEAVE_STATUSES:
+            return
+        
+        index = leave_overlaps.get(state.user_id, self.get_active_leave_intervals)
+        conflict = index.find_overlap(state.from_date, state.to_date, ignore_leave_id=leave_id)
+        if conflict is None:
+            return
+        
+        # The cached index may be stale if another worker changed this leave; confirm before rejecting
+        still_active = self.db.query(Leave.id).filter(
+            and_(
+                Leave.id == conflict[2],
+                Leave.status.in_(ACTIVE_LEAVE_STATUSES),
+                Leave.from_date <= state.to_date,
+                Leave.to_date >= state.from_date
+            )
+        ).first()
+        if still_active:
+            raise LeaveOverlapError(overlap_message(conflict), conflict[2])
+        leave_overlaps.invalidate(state.user_id)
+    
+    def _record_leave_interval(self, leave_id: str, state: Optional[LeaveState], user_id: str):
+        active = state is not None and state.status in ACTIVE_LEAVE_STATUSES
+        leave_overlaps.update(user_id, leave_id, (state.from_date, state.to_date) if active else None)
     
     def create_leave(self, leave_data: InsertLeaveSchema) -> Leave:
-        leave_dict = leave_data.model_dump(exclude_none=True, by_alias=False)
+        leave_dict = leave_data.model_dump(exclude_none=True, by_alias=False, exclude={"half_day_start", "half_day_end"})
         new_leave = Leave(**leave_dict)
-        self.db.add(new_leave)
-        self.db.commit()
+        state = LeaveState.of(new_leave)
+        self.check_leave_overlap(state)
+        try:
+            self.db.add(new_leave)
+            self.db.flush()
+            LeaveLedger(self.db).move(new_leave.id, None, state)
+            refresh_leave_days(self.db, [new_leave.id])
+            publish_to_manager(self.db, state.user_id, "approval.requested", {"leaveId": new_leave.id})
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            raise_if_overlap_violation(e)
+            raise
+        except Exception:
+            self.db.rollback()
+            raise
+        self._record_leave_interval(new_leave.id, state, state.user_id)
         self.db.refresh(new_leave)
         return new_leave
     
     def get_user_leaves(self, user_id: str) -> List[Leave]:
-        return self.db.query(Leave).filter(Leave.user_id == user_id).order_by(desc(Leave.created_at)).all()
+        return self.read_db.query(Leave).filter(Leave.user_id == user_id).order_by(desc(Leave.created_at)).all()
+    
+    def get_user_leave_rows(self, user_id: str, columns: Sequence[str], since: Optional[datetime] = None) -> List[Row]:
+        # Plain Row tuples of just the requested columns; unrequested ones are never fetched
+        query = self.read_db.query(*self._columns(Leave, columns)).filter(Leave.user_id == user_id)
+        if since is not None:
+            query = query.filter(Leave.updated_at > since)
+        return query.order_by(desc(Leave.created_at)).all()
     
-    def update_leave(self, leave_id: str, updates: dict) -> Leave:
-        leave = self.db.query(Leave).filter(Leave.id == leave_id).first()
+    def _authorize_leave_update(self, leave: Leave, fields: dict, actor_id: str):
+        """
+        The employee may edit their own pending leave or cancel it; approving or rejecting takes
+        the employee's manager, as in review_leaves(). Checked under the row lock, so the status
+        can't change in between.
+        """
+        status = fields.get("status")
+        if status in REVIEW_STATUSES:
+            manager_id = self.db.query(User.manager_id).filter(User.id == leave.user_id).scalar()
+            if manager_id != actor_id:
+                raise PermissionError("Only the employee's manager can approve or reject this leave")
+            if leave.status != "pending":
+                raise PermissionError(f"This leave is already {leave.status}")
+            if fields.keys() - {"status", "review_comments"}:
+                raise PermissionError("A reviewer can only set the status and comments")
+            return
+        if leave.user_id != actor_id:
+            raise PermissionError("You can only change your own leaves")
+        if status not in (None, "cancelled", leave.status) or "review_comments" in fields:
+            raise PermissionError("You can only cancel your own leave")
+        if fields.keys() - {"status"} and leave.status != "pending":
+            raise PermissionError(f"This leave is already {leave.status} and can no longer be edited")
+    
+    def update_leave(self, leave_id: str, updates: UpdateLeaveSchema, actor_id: str) -> Leave:
+        leave = self.db.query(Leave).filter(Leave.id == leave_id).with_for_update().first()
         if not leave:
-            raise ValueError(f"Leave with id {leave_id} not found")
+            self.db.rollback()
+            raise LookupError(f"Leave with id {leave_id} not found")
         
-        for key, value in updates.items():
-            if hasattr(leave, key):
+        try:
+            old_state = LeaveState.of(leave)
+            fields = updates.model_dump(exclude_none=True, by_alias=False, exclude={"half_day_start", "half_day_end"})
+            self._authorize_leave_update(leave, fields, actor_id)
+            for key, value in fields.items():
                 setattr(leave, key, value)
-        
-        leave.updated_at = datetime.utcnow()
-        self.db.commit()
+            
+            # days is never taken from the client; count it again with the employee's calendar
+            if fields.keys() & {"from_date", "to_date"} or updates.half_day_start or updates.half_day_end:
+                from_date = fields.get("from_date", old_state.from_date)
+                to_date = fields.get("to_date", old_state.to_date)
+                if to_date < from_date:
+                    raise ValueError("Leave end date is before its start date")
+                calendar = self.get_working_calendar(self.db.query(User).filter(User.id == leave.user_id).first())
+                leave.days = calendar.leave_days(from_date, to_date, updates.half_day_start, updates.half_day_end)
+                if leave.days <= 0:
+                    raise ValueError("The selected dates contain no working days")
+            
+            leave.updated_at = datetime.utcnow()
+            if leave.status != old_state.status and leave.status in REVIEW_STATUSES:
+                leave.reviewed_by = actor_id
+                leave.reviewed_at = leave.updated_at
+            new_state = LeaveState.of(leave)
+            if (new_state.from_date, new_state.to_date, new_state.status) != (old_state.from_date, old_state.to_date, old_state.status):
+                self.check_leave_overlap(new_state, leave.id)
+            LeaveLedger(self.db).move(leave.id, old_state, new_state)
+            if new_state != old_state:
+                self.db.flush()
+                refresh_leave_days(self.db, [leave.id])
+            if new_state.status != old_state.status:
+                publish(self.db, leave.user_id, "leave.status", {"leaveId": leave.id, "status": leave.status})
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            raise_if_overlap_violation(e)
+            raise
+        except Exception:
+            self.db.rollback()
+            raise
+        self._record_leave_interval(leave.id, new_state, old_state.user_id)
         self.db.refresh(leave)
         return leave
     
-    def delete_leave(self, leave_id: str):
-        leave = self.db.query(Leave).filter(Leave.id == leave_id).first()
-        if leave:
+    def get_pending_approvals(
+        self, manager_id: str, limit: int = 50, after: Optional[Tuple[datetime, str]] = None
+    ) -> List[Tuple[Leave, User]]:
+        query = self.read_db.query(Leave, User).join(User, Leave.user_id == User.id).filter(
+            and_(User.manager_id == manager_id, Leave.status == "pending")
+        )
+        if after:
+            query = query.filter(tuple_(Leave.applied_at, Leave.id) > tuple_(*after))
+        return query.order_by(asc(Leave.applied_at), asc(Leave.id)).limit(limit).all()
+    
+    def review_leaves(self, reviewer_id: str, decisions: Dict[str, List[str]], comments: Optional[str] = None) -> list:
+        """
+        Apply approve/reject decisions for the reviewer's direct reports in one transaction:
+        one UPDATE ... WHERE id = ANY(...) RETURNING per decision, then one balance update for the batch.
+        Leaves that are not pending or not the reviewer's reports are left untouched.
+        """
+        now = datetime.utcnow()
+        reports = select(User.id).where(User.manager_id == reviewer_id)
+        reviewed = []
+        try:
+            for status, leave_ids in decisions.items():
+                if not leave_ids:
+                    continue
+                stmt = update(Leave).where(
+                    and_(
+                        Leave.id == any_(bindparam("leave_ids", leave_ids, type_=ARRAY(String))),
+                        Leave.status == "pending",
+                        Leave.user_id.in_(reports)
+                    )
+                ).values(
+                    status=status,
+                    reviewed_by=reviewer_id,
+                    reviewed_at=now,
+                    review_comments=comments,
+                    updated_at=now
+                ).returning(
+                    Leave.id, Leave.user_id, Leave.leave_type_id, Leave.from_date, Leave.to_date, Leave.days, Leave.status
+                ).execution_options(synchronize_session=False)
+                reviewed.extend(self.db.execute(stmt).all())
+            
+            moves = []
+            for row in reviewed:
+                old_state = LeaveState(row.user_id, row.leave_type_id, row.from_date, row.to_date, "pending", row.days)
+                moves.append((row.id, old_state, replace(old_state, status=row.status)))
+            LeaveLedger(self.db).move_many(moves)
+            refresh_leave_days(self.db, [row.id for row in reviewed])
+            publish_many(self.db, [
+                (row.user_id, "leave.status", {"leaveId": row.id, "status": row.status}) for row in reviewed
+            ])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        
+        for leave_id, _, new_state in moves:
+            self._record_leave_interval(leave_id, new_state, new_state.user_id)
+        return reviewed
+    
+    def delete_leave(self, leave_id: str, actor_id: str):
+        """
+        Withdraw a pending leave; only its owner may. Reviewed leaves stay on record and are
+        cancelled through update_leave() instead.
+        """
+        leave = self.db.query(Leave).filter(Leave.id == leave_id).with_for_update().first()
+        if not leave or leave.user_id != actor_id:
+            self.db.rollback()
+            raise LookupError(f"Leave with id {leave_id} not found")
+        if leave.status != "pending":
+            self.db.rollback()
+            raise PermissionError(f"This leave is already {leave.status}; cancel it instead of deleting it")
+        
+        old_state = LeaveState.of(leave)
+        try:
+            LeaveLedger(self.db).move(leave.id, old_state, None)
             self.db.delete(leave)
+            record_deletion(self.db, Leave.__tablename__, leave.id, leave.user_id)
             self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self._record_leave_interval(leave_id, None, old_state.user_id)
     
     def get_attendance_records(self, user_id: str, month: int, year: int) -> List[AttendanceRecord]:
-        return self.db.query(AttendanceRecord).filter(
+        # A plain date range (rather than extract()) lets Postgres prune to a single monthly partition
+        month_start = date(year, month, 1)
+        next_month_start = date(year + month // 12, month % 12 + 1, 1)
+        return self.read_db.query(AttendanceRecord).filter(
             and_(
                 AttendanceRecord.user_id == user_id,
-                extract('month', AttendanceRecord.date) == month,
-                extract('year', AttendanceRecord.date) == year
+                AttendanceRecord.date >= month_start,
+                AttendanceRecord.date < next_month_start
             )
         ).order_by(asc(AttendanceRecord.date)).all()
     
+    def get_attendance_rows(self, user_id: str, month: int, year: int, since: Optional[datetime] = None) -> List[Row]:
+        month_start = date(year, month, 1)
+        next_month_start = date(year + month // 12, month % 12 + 1, 1)
+        query = self.read_db.query(
+            AttendanceRecord.id, AttendanceRecord.user_id, AttendanceRecord.date, AttendanceRecord.status,
+            AttendanceRecord.check_in, AttendanceRecord.check_out, AttendanceRecord.working_hours
+        ).filter(
+            and_(
+                AttendanceRecord.user_id == user_id,
+                AttendanceRecord.date >= month_start,
+                AttendanceRecord.date < next_month_start
+            )
+        )
+        if since is not None:
+            query = query.filter(AttendanceRecord.updated_at > since)
+        return query.order_by(asc(AttendanceRecord.date)).all()
+    
     def create_attendance_record(self, record_data: InsertAttendanceSchema) -> AttendanceRecord:
         record_dict = record_data.model_dump(exclude_none=True, by_alias=False)
         new_record = AttendanceRecord(**record_dict)
-        self.db.add(new_record)
-        self.db.commit()
+        try:
+            self.db.add(new_record)
+            self.db.flush()
+            publish(self.db, new_record.user_id, "attendance.updated", {
+                "recordId": new_record.id, "date": new_record.date, "status": new_record.status
+            })
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            raise_if_no_partition(e, record_data.date)
+            raise
         self.db.refresh(new_record)
         return new_record
     
@@ -101,13 +344,22 @@ class DatabaseStorage:
                 setattr(record, key, value)
         
         record.updated_at = datetime.utcnow()
-        self.db.commit()
+        try:
+            publish(self.db, record.user_id, "attendance.updated", {
+                "recordId": record.id, "date": record.date, "status": record.status
+            })
+            self.db.commit()
+        except IntegrityError as e:
+            # Changing the date moves the row to another month's partition
+            self.db.rollback()
+            raise_if_no_partition(e, record.date)
+            raise
         self.db.refresh(record)
         return record
     
     def get_absent_dates(self, user_id: str, days: int) -> List[AttendanceRecord]:
         cutoff_date = datetime.utcnow() - timedelta(days=days)
-        return self.db.query(AttendanceRecord).filter(
+        return self.read_db.query(AttendanceRecord).filter(
             and_(
                 AttendanceRecord.user_id == user_id,
                 AttendanceRecord.status == 'absent',
@@ -115,13 +367,23 @@ class DatabaseStorage:
             )
         ).order_by(desc(AttendanceRecord.date)).all()
     
+    def get_deleted_ids(self, user_id: str, table_name: str, since: datetime) -> List[str]:
+        rows = self.read_db.query(DeletedRecord.record_id).filter(
+            and_(
+                DeletedRecord.user_id == user_id,
+                DeletedRecord.table_name == table_name,
+                DeletedRecord.deleted_at > since
+            )
+        ).all()
+        return [row.record_id for row in rows]
+    
     def get_salary_slips(self, user_id: str) -> List[SalarySlip]:
-        return self.db.query(SalarySlip).filter(
+        return self.read_db.query(SalarySlip).filter(
             SalarySlip.user_id == user_id
         ).order_by(desc(SalarySlip.year), desc(SalarySlip.month)).all()
     
     def get_salary_slip(self, user_id: str, month: int, year: int) -> Optional[SalarySlip]:
-        return self.db.query(SalarySlip).filter(
+        return self.read_db.query(SalarySlip).filter(
             and_(
                 SalarySlip.user_id == user_id,
                 SalarySlip.month == month,
@@ -129,6 +391,12 @@ class DatabaseStorage:
             )
         ).first()
     
+    def update_salary_slip_file(self, slip_id: str, file_path: str):
+        self.db.query(SalarySlip).filter(SalarySlip.id == slip_id).update(
+            {SalarySlip.file_path: file_path}, synchronize_session=False
+        )
+        self.db.commit()
+    
     def create_hr_document(self, document_data: InsertHrDocumentSchema) -> HrDocument:
         document_dict = document_data.model_dump(exclude_none=True, by_alias=False)
         new_document = HrDocument(**document_dict)
@@ -138,7 +406,12 @@ class DatabaseStorage:
         return new_document
     
     def get_hr_documents(self) -> List[HrDocument]:
-        return self.db.query(HrDocument).filter(
+        return self.read_db.query(HrDocument).filter(
+            HrDocument.is_active == True
+        ).order_by(desc(HrDocument.created_at)).all()
+    
+    def get_hr_document_rows(self, columns: Sequence[str]) -> List[Row]:
+        return self.read_db.query(*self._columns(HrDocument, columns)).filter(
             HrDocument.is_active == True
         ).order_by(desc(HrDocument.created_at)).all()
     
@@ -170,6 +443,11 @@ class DatabaseStorage:
         return new_conversation
     
     def get_user_conversations(self, user_id: str) -> List[AiConversation]:
-        return self.db.query(AiConversation).filter(
+        return self.read_db.query(AiConversation).filter(
+            AiConversation.user_id == user_id
+        ).order_by(desc(AiConversation.created_at)).limit(50).all()
+    
+    def get_user_conversation_rows(self, user_id: str, columns: Sequence[str]) -> List[Row]:
+        return self.read_db.query(*self._columns(AiConversation, columns)).filter(
             AiConversation.user_id == user_id
         ).order_by(desc(AiConversation.created_at)).limit(50).all()
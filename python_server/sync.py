@@ -0,0 +1,76 @@
+"""
+Delta Sync
+`?since=<token>` incremental reads for the leave, attendance and balance lists.
+
+A sync token carries the time its response was read. The next request returns rows whose
+updated_at is past that time (minus SYNC_OVERLAP, which covers transactions that were still
+in flight and app-server clock skew), plus tombstones of rows deleted since. Overlapping rows
+are simply sent again; clients upsert by id.
+"""
+
+import base64
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+import serializers
+from models import DeletedRecord
+
+SYNC_OVERLAP = timedelta(seconds=60)
+# Tokens older than this may have missed pruned tombstones and get a full reset instead
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def issue_token(read_at: datetime) -> str:
+    return base64.urlsafe_b64encode(f"v1|{read_at.isoformat()}".encode()).decode()
+
+
+def parse_token(token: str) -> datetime:
+    try:
+        version, read_at = base64.urlsafe_b64decode(token.encode()).decode().split("|", 1)
+        if version != "v1":
+            raise ValueError(version)
+        return datetime.fromisoformat(read_at)
+    except ValueError:
+        raise InvalidSyncToken("Invalid sync token")
+
+
+def changed_since(token: Optional[str], now: datetime) -> Optional[datetime]:
+    """The updated_at watermark for a token, or None when the client needs a full snapshot."""
+    if not token:
+        return None
+    read_at = parse_token(token)
+    if now - read_at > TOMBSTONE_RETENTION:
+        return None
+    return read_at - SYNC_OVERLAP
+
+
+def delta_response(changes: bytes, deleted: List[str], read_at: datetime, reset: bool) -> Response:
+    """
+    {"changes": [...], "deleted": [ids], "reset": bool, "syncToken": "..."}; on reset, `changes`
+    is the full set and replaces whatever the client holds.
+    """
+    body = (
+        b'{"changes":' + changes
+        + b',"deleted":' + serializers.dumps(deleted)
+        + b',"reset":' + (b"true" if reset else b"false")
+        + b',"syncToken":' + serializers.dumps(issue_token(read_at)) + b"}"
+    )
+    return Response(content=body, media_type="application/json")
+
+
+def record_deletion(db: Session, table_name: str, record_id: str, user_id: str):
+    db.add(DeletedRecord(table_name=table_name, record_id=record_id, user_id=user_id))
+
+
+def prune_tombstones(db: Session, now: Optional[datetime] = None) -> int:
+    cutoff = (now or datetime.utcnow()) - TOMBSTONE_RETENTION - SYNC_OVERLAP
+    count = db.query(DeletedRecord).filter(DeletedRecord.deleted_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return count
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Team Calendar
+Maintains leave_days, one row per (user, day, leave) for pending and approved leaves, and
+answers "who on my team is out" for a date range with a single indexed read of it.
+
+leave_days is rewritten for the touched leaves inside the same transaction as the leave
+write; deleting a leave cascades to its days.
+"""
+
+import argparse
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Sequence
+
+from sqlalchemy import ARRAY, String, bindparam, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from leave_overlap import ACTIVE_LEAVE_STATUSES
+
+MAX_RANGE_DAYS = 366
+
+EXPAND_LEAVES = """
+    INSERT INTO leave_days (user_id, day, leave_id, leave_type_id, status)
+    SELECT l.user_id, d::date, l.id, l.leave_type_id, l.status
+    FROM leaves l
+    CROSS JOIN LATERAL generate_series(l.from_date, l.to_date, interval '1 day') AS d
+    WHERE {where} AND l.status = ANY(:active_statuses)
+"""
+
+
+def refresh_leave_days(db: Session, leave_ids: Sequence[str]):
+    """Re-expand the given leaves from their current rows; call before the write commits."""
+    if not leave_ids:
+        return
+    params = {"leave_ids": list(leave_ids), "active_statuses": list(ACTIVE_LEAVE_STATUSES)}
+    db.execute(
+        text("DELETE FROM leave_days WHERE leave_id = ANY(:leave_ids)").bindparams(
+            bindparam("leave_ids", type_=ARRAY(String))
+        ),
+        params,
+    )
+    db.execute(
+        text(EXPAND_LEAVES.format(where="l.id = ANY(:leave_ids)")).bindparams(
+            bindparam("leave_ids", type_=ARRAY(String)), bindparam("active_statuses", type_=ARRAY(String))
+        ),
+        params,
+    )
+
+
+def rebuild_leave_days(engine: Engine) -> int:
+    """Backfill the whole table from leaves, e.g. after it is first created."""
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE leave_days"))
+        return conn.execute(
+            text(EXPAND_LEAVES.format(where="TRUE")).bindparams(bindparam("active_statuses", type_=ARRAY(String))),
+            {"active_statuses": list(ACTIVE_LEAVE_STATUSES)},
+        ).rowcount
+
+
+def team_calendar(db: Session, manager_id: str, start: date, end: date) -> Dict:
+    """The manager's direct reports and, per day, who is out; one query over (user_id, day)."""
+    rows = db.execute(text("""
+        SELECT u.id AS user_id, u.first_name, u.last_name, u.employee_id,
+               ld.day, ld.leave_id, ld.leave_type_id, ld.status
+        FROM users u
+        LEFT JOIN leave_days ld ON ld.user_id = u.id AND ld.day BETWEEN :start AND :end
+        WHERE u.manager_id = :manager_id
+        ORDER BY u.first_name, u.last_name, u.id, ld.day
+    """), {"manager_id": manager_id, "start": start, "end": end})
+
+    members: Dict[str, Dict] = {}
+    days: Dict[str, List[Dict]] = defaultdict(list)
+    for row in rows:
+        if row.user_id not in members:
+            members[row.user_id] = {
+                "userId": row.user_id,
+                "name": " ".join(part for part in [row.first_name, row.last_name] if part),
+                "employeeId": row.employee_id,
+            }
+        if row.day is not None:
+            days[row.day.isoformat()].append({
+                "userId": row.user_id,
+                "leaveId": row.leave_id,
+                "leaveTypeId": row.leave_type_id,
+                "status": row.status,
+            })
+
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "members": list(members.values()),
+        "days": dict(sorted(days.items())),
+    }
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Team calendar maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild", help="rebuild leave_days from all pending and approved leaves")
+    args = parser.parse_args()
+
+    count = rebuild_leave_days(engine)
+    print(f"✓ Rebuilt leave_days ({count} rows)")
@@ -0,0 +1,135 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+DEFAULT_CALENDAR = "default"
+WEEKEND_DAYS = (5, 6)  # Saturday, Sunday
+
+# Each day is stored as a number of working half-days: 2 for a normal working day,
+# 1 for a half-day holiday and 0 for weekends and full holidays.
+FULL_DAY = 2
+HALF_DAY = 1
+
+HolidayLoader = Callable[[Tuple[str, ...]], Iterable[Tuple[date, bool]]]
+
+
+def calendar_codes(location: Optional[str] = None, department: Optional[str] = None) -> Tuple[str, ...]:
+    """The calendars that apply to an employee; their holidays are combined."""
+    codes = [DEFAULT_CALENDAR]
+    if location:
+        codes.append(f"location:{location}")
+    if department:
+        codes.append(f"department:{department}")
+    return tuple(codes)
+
+
+class WorkingCalendar:
+    """
+    Per-year arrays of working half-days with prefix sums, so the working days between
+    any two dates is a couple of array lookups regardless of the range length.
+    """
+
+    def __init__(self, holidays: Iterable[Tuple[date, bool]]):
+        self._holidays: Dict[int, Tuple[List[int], List[int]]] = {}
+        for holiday_date, is_half_day in holidays:
+            full, half = self._holidays.setdefault(holiday_date.year, ([], []))
+            offset = holiday_date.timetuple().tm_yday - 1
+            (half if is_half_day else full).append(offset)
+        self._years: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = Lock()
+
+    def _year(self, year: int) -> Tuple[np.ndarray, np.ndarray]:
+        cached = self._years.get(year)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            if year not in self._years:
+                days = np.arange(
+                    np.datetime64(f"{year:04d}-01-01"),
+                    np.datetime64(f"{year + 1:04d}-01-01"),
+                    dtype="datetime64[D]",
+                )
+                # 1970-01-01 was a Thursday (weekday 3)
+                weekdays = (days.astype(np.int64) + 3) % 7
+                units = np.where(np.isin(weekdays, WEEKEND_DAYS), 0, FULL_DAY).astype(np.int8)
+
+                full, half = self._holidays.get(year, ([], []))
+                if half:
+                    half_index = np.array(half, dtype=np.int64)
+                    units[half_index] = np.minimum(units[half_index], HALF_DAY)
+                if full:
+                    units[np.array(full, dtype=np.int64)] = 0
+
+                prefix = np.concatenate(([0], np.cumsum(units, dtype=np.int64)))
+                units.setflags(write=False)
+                prefix.setflags(write=False)
+                self._years[year] = (units, prefix)
+        return self._years[year]
+
+    def day_units(self, day: date) -> int:
+        units, _ = self._year(day.year)
+        return int(units[day.timetuple().tm_yday - 1])
+
+    def working_units(self, start: date, end: date) -> int:
+        if end < start:
+            return 0
+
+        total = 0
+        for year in range(start.year, end.year + 1):
+            _, prefix = self._year(year)
+            first = start.timetuple().tm_yday - 1 if year == start.year else 0
+            last = end.timetuple().tm_yday if year == end.year else len(prefix) - 1
+            total += int(prefix[last] - prefix[first])
+        return total
+
+    def working_days(self, start: date, end: date) -> Decimal:
+        return Decimal(self.working_units(start, end)) / FULL_DAY
+
+    def leave_days(self, start: date, end: date, half_day_start: bool = False, half_day_end: bool = False) -> Decimal:
+        """Working days a leave consumes; a half-day flag counts that day as at most half a day."""
+        units = self.working_units(start, end)
+        if half_day_start:
+            first = self.day_units(start)
+            units -= first - min(first, HALF_DAY)
+        if half_day_end and (end != start or not half_day_start):
+            last = self.day_units(end)
+            units -= last - min(last, HALF_DAY)
+        return Decimal(units) / FULL_DAY
+
+
+# Calendar codes -> (monotonic time loaded, calendar)
+_calendars: Dict[Tuple[str, ...], Tuple[float, WorkingCalendar]] = {}
+_calendars_lock = Lock()
+
+
+def _fresh(entry: Optional[Tuple[float, WorkingCalendar]]) -> bool:
+    return entry is not None and time.monotonic() - entry[0] < settings.holiday_calendar_ttl_seconds
+
+
+def get_working_calendar(codes: Tuple[str, ...], load_holidays: HolidayLoader) -> WorkingCalendar:
+    """The cached calendar for `codes`, reloaded once it is older than HOLIDAY_CALENDAR_TTL_SECONDS."""
+    entry = _calendars.get(codes)
+    if not _fresh(entry):
+        with _calendars_lock:
+            entry = _calendars.get(codes)
+            if not _fresh(entry):
+                entry = (time.monotonic(), WorkingCalendar(load_holidays(codes)))
+                _calendars[codes] = entry
+    return entry[1]
+
+
+def invalidate_working_calendars():
+    with _calendars_lock:
+        _calendars.clear()
+
+
+def month_bounds(year: int, month: int) -> Tuple[date, date]:
+    next_month_start = date(year + month // 12, month % 12 + 1, 1)
+    return date(year, month, 1), next_month_start - timedelta(days=1)
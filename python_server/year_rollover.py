@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Leave Year Rollover
+Provisions next year's leave balances for every user and leave type, carrying forward
+unused days (capped at the leave type's max_days) for carry-forward leave types.
+
+Balances are inserted with a handful of set-based statements, one per chunk of users.
+A balance that already exists for the new year without any carry-forward - typically one the
+leave ledger created when someone applied for next year's leave early - gets its carry added
+on top. Balances that already carry days are never touched, so an interrupted run can simply
+be started again.
+"""
+
+import argparse
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+DEFAULT_CHUNK_SIZE = 25000
+
+# One candidate row per (user, leave type): the previous year's balance, the carry-forward it
+# earns, whether the target year is already provisioned and whether that balance holds its carry.
+ROLLOVER_PLAN = """
+    SELECT u.id AS user_id,
+           lt.id AS leave_type_id,
+           lt.name AS leave_type_name,
+           lt.max_days,
+           CASE WHEN lt.carry_forward AND prev.id IS NOT NULL
+                THEN LEAST(GREATEST(FLOOR(prev.total_days - COALESCE(prev.used_days, 0) - COALESCE(prev.reserved_days, 0)), 0), lt.max_days)::integer
+                ELSE 0
+           END AS carry,
+           nxt.id IS NOT NULL AS provisioned,
+           COALESCE(nxt.carried_forward_days, 0) > 0 AS carried
+    FROM users u
+    CROSS JOIN leave_types lt
+    LEFT JOIN leave_balances prev
+           ON prev.user_id = u.id AND prev.leave_type_id = lt.id AND prev.year = :from_year
+    LEFT JOIN leave_balances nxt
+           ON nxt.user_id = u.id AND nxt.leave_type_id = lt.id AND nxt.year = :to_year
+    WHERE u.id > :after_user_id AND (CAST(:upto_user_id AS varchar) IS NULL OR u.id <= :upto_user_id)
+"""
+
+REPORT_SQL = f"""
+    SELECT leave_type_name,
+           count(*) FILTER (WHERE NOT provisioned) AS to_create,
+           count(*) FILTER (WHERE provisioned) AS already_provisioned,
+           count(*) FILTER (WHERE provisioned AND NOT carried AND carry > 0) AS to_top_up,
+           COALESCE(sum(carry) FILTER (WHERE NOT carried), 0) AS carried_days,
+           count(*) FILTER (WHERE NOT carried AND carry > 0) AS users_carrying,
+           COALESCE(max(carry) FILTER (WHERE NOT carried), 0) AS max_carry
+    FROM ({ROLLOVER_PLAN}) plan
+    GROUP BY leave_type_name
+    ORDER BY leave_type_name
+"""
+
+INSERT_SQL = f"""
+    INSERT INTO leave_balances
+        (id, user_id, leave_type_id, total_days, used_days, reserved_days, carried_forward_days, year, created_at, updated_at)
+    SELECT gen_random_uuid(), user_id, leave_type_id, max_days + carry, 0, 0, carry, :to_year, :now, :now
+    FROM ({ROLLOVER_PLAN}) plan
+    WHERE NOT provisioned
+    ON CONFLICT (user_id, leave_type_id, year) DO NOTHING
+"""
+
+# Balances created before the rollover (at plain max_days) receive the carry they missed
+TOP_UP_SQL = f"""
+    UPDATE leave_balances b
+    SET total_days = b.total_days + plan.carry, carried_forward_days = plan.carry, updated_at = :now
+    FROM ({ROLLOVER_PLAN}) plan
+    WHERE plan.provisioned AND NOT plan.carried AND plan.carry > 0
+      AND b.user_id = plan.user_id AND b.leave_type_id = plan.leave_type_id AND b.year = :to_year
+"""
+
+
+def rollover_report(engine: Engine, from_year: int) -> List[Dict]:
+    params = {"from_year": from_year, "to_year": from_year + 1, "after_user_id": "", "upto_user_id": None}
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(text(REPORT_SQL), params)]
+
+
+def _user_chunk_bounds(engine: Engine, chunk_size: int) -> List[str]:
+    """Upper user id of every chunk, found with one pass over the users primary key."""
+    with engine.connect() as conn:
+        return list(conn.execute(text(
+            "SELECT id FROM (SELECT id, row_number() OVER (ORDER BY id) AS n FROM users) numbered "
+            "WHERE n % :chunk_size = 0 ORDER BY id"
+        ), {"chunk_size": chunk_size}).scalars()) + [None]
+
+
+def rollover_leave_year(engine: Engine, from_year: int, dry_run: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Dict]:
+    report = rollover_report(engine, from_year)
+    if dry_run:
+        return report
+
+    after_user_id = ""
+    created = topped_up = 0
+    now = datetime.utcnow()
+    for upto_user_id in _user_chunk_bounds(engine, chunk_size):
+        params = {
+            "from_year": from_year,
+            "to_year": from_year + 1,
+            "after_user_id": after_user_id,
+            "upto_user_id": upto_user_id,
+            "now": now,
+        }
+        # Each chunk commits on its own; a re-run skips everything already provisioned and carried
+        with engine.begin() as conn:
+            topped_up += conn.execute(text(TOP_UP_SQL), params).rowcount
+            created += conn.execute(text(INSERT_SQL), params).rowcount
+        print(f"  … {created} balances created, {topped_up} topped up (users up to {upto_user_id or 'end'})")
+        after_user_id = upto_user_id
+
+    return report
+
+
+def print_report(report: List[Dict], from_year: int, dry_run: bool):
+    print(f"\nLeave year rollover {from_year} → {from_year + 1}{' (dry run)' if dry_run else ''}")
+    print("-" * 104)
+    print(f"{'Leave type':<24}{'to create':>12}{'existing':>12}{'to top up':>12}{'carried days':>16}{'carrying':>12}{'max carry':>12}")
+    for row in report:
+        print(
+            f"{row['leave_type_name']:<24}{row['to_create']:>12}{row['already_provisioned']:>12}{row['to_top_up']:>12}"
+            f"{row['carried_days']:>16}{row['users_carrying']:>12}{row['max_carry']:>12}"
+        )
+    print("-" * 104)
+    print(f"{'Total':<24}{sum(r['to_create'] for r in report):>12}{sum(r['already_provisioned'] for r in report):>12}"
+          f"{sum(r['to_top_up'] for r in report):>12}{sum(r['carried_days'] for r in report):>16}")
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Provision next year's leave balances with carry-forward")
+    parser.add_argument("from_year", type=int, help="the year being closed, e.g. 2025 provisions 2026")
+    parser.add_argument("--dry-run", action="store_true", help="only print what would be created")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="users per transaction")
+    args = parser.parse_args()
+
+    report = rollover_leave_year(engine, args.from_year, dry_run=args.dry_run, chunk_size=args.chunk_size)
+    print_report(report, args.from_year, args.dry_run)
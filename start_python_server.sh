@@ -37,13 +37,9 @@ pip install -q --upgrade pip
 pip install -q -r requirements.txt
 echo "✓ Dependencies installed"
 
-# Check if database needs initialization
+# Apply migrations and add sample data if needed
 echo ""
-echo "Checking database..."
-python -c "from database import Base, engine; Base.metadata.create_all(bind=engine); print('✓ Database tables ready')"
-
-# Initialize database with sample data if needed
-echo "Initializing database with sample data..."
+echo "Initializing database..."
 python init_db.py
 
 echo ""